@@ -0,0 +1,112 @@
+"""대량 업로드(CSV / JSON Lines) 파싱·검증
+
+행 단위로 검증해 오류 행은 건너뛰고, 통과한 행만 저장소에 한 번에 upsert한다.
+(main.api_bulk_upsert에서 사용)
+"""
+import csv
+import json
+import math
+
+from storage import TABLES
+
+MAX_REPORTED_ERRORS = 1000
+
+
+def parse_records(lines, fmt):
+    """업로드 본문 줄 목록 → (행 번호, dict) 목록
+
+    행 번호는 데이터 행 기준 1부터 (CSV 헤더 제외). 파싱 실패 행은 dict 대신 오류 문자열
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        return [(i, row) for i, row in enumerate(reader, start=1)]
+
+    records = []
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            records.append((number, f"JSON 파싱 오류: {e}"))
+            continue
+        if not isinstance(record, dict):
+            records.append((number, "각 줄은 JSON 객체여야 합니다"))
+            continue
+        records.append((number, record))
+    return records
+
+
+def _convert(value, to_type):
+    """문자열/숫자 → int 또는 float (int 컬럼에 소수, nan·inf는 오류)"""
+    if isinstance(value, bool):
+        raise ValueError
+    if to_type is int:
+        if isinstance(value, float):
+            if not value.is_integer():
+                raise ValueError
+            return int(value)
+        return int(str(value).strip())
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError
+    return value
+
+
+def validate_records(table, records, known_materials):
+    """행 검증 - (통과한 행 목록, 오류 목록)
+
+    - 필수 컬럼 누락 / 숫자 형식 오류(nan, inf 포함) / 음수
+    - 알 수 없는 원재료 (bom, inventory: known_materials에 없는 원재료/중간재)
+    - 업로드 안의 기본키 중복 (처음 나온 행만 사용)
+    """
+    spec = TABLES[table]
+    types = spec["types"]
+    valid = []
+    errors = []
+    seen = {}
+
+    for number, record in records:
+        if isinstance(record, str):
+            errors.append({"row": number, "error": record})
+            continue
+
+        missing = [f for f in spec["fields"] if record.get(f) in (None, "")]
+        if missing:
+            errors.append({"row": number, "error": f"필수 값 누락: {', '.join(missing)}"})
+            continue
+
+        row = {}
+        error = None
+        for field in spec["fields"]:
+            value = record[field]
+            if field in types:
+                try:
+                    value = _convert(value, types[field])
+                except (TypeError, ValueError):
+                    error = f"{field} 값이 올바른 숫자가 아닙니다: {value!r}"
+                    break
+                if value < 0:
+                    error = f"{field} 값은 음수일 수 없습니다: {value}"
+                    break
+            else:
+                value = str(value).strip()
+            row[field] = value
+        if error:
+            errors.append({"row": number, "error": error})
+            continue
+
+        if table in ("bom", "inventory") and row["material_name"] not in known_materials:
+            errors.append({"row": number, "error": f"알 수 없는 원재료: {row['material_name']}"})
+            continue
+
+        key = tuple(row[k] for k in spec["key"])
+        if key in seen:
+            errors.append({"row": number, "error": f"중복된 키 (첫 번째: {seen[key]}행)"})
+            continue
+        seen[key] = number
+        valid.append(row)
+
+    return valid, errors
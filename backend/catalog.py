@@ -0,0 +1,211 @@
+"""카탈로그 검색 - 이름 색인(한글 자모·초성 포함) + 정렬·필터·페이지 나누기
+
+이름은 자모로 풀어 색인하므로 입력 중인 글자("팥비", "딹")도 접두어로 찾고, 자음만 입력하면
+초성("ㅍㅂㅅ" → 팥빙수)으로 찾는다. fuzzy 검색은 자모 2-gram 유사도(Dice)로 오타를 허용한다.
+Catalog는 한 데이터 스냅샷에 대해 한 번 만들고(main의 DerivedData) 요청마다 다시 쓰므로
+조회 비용은 일치하는 행 수와 페이지 크기에 비례한다 (정렬 순서는 필드별로 처음 쓸 때 한 번 계산).
+"""
+import bisect
+import unicodedata
+
+MODES = ("prefix", "contains", "fuzzy")
+FUZZY_THRESHOLD = 0.4  # fuzzy 검색에서 결과로 인정하는 최소 Dice 계수
+
+# 한글 호환 자모 (겹자음·겹모음은 입력 중 상태와 맞추기 위해 둘로 나눔)
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+JUNGSEONG = ["ㅏ", "ㅐ", "ㅑ", "ㅒ", "ㅓ", "ㅔ", "ㅕ", "ㅖ", "ㅗ", "ㅗㅏ", "ㅗㅐ", "ㅗㅣ", "ㅛ", "ㅜ",
+             "ㅜㅓ", "ㅜㅔ", "ㅜㅣ", "ㅠ", "ㅡ", "ㅡㅣ", "ㅣ"]
+JONGSEONG = ["", "ㄱ", "ㄲ", "ㄱㅅ", "ㄴ", "ㄴㅈ", "ㄴㅎ", "ㄷ", "ㄹ", "ㄹㄱ", "ㄹㅁ", "ㄹㅂ", "ㄹㅅ", "ㄹㅌ",
+             "ㄹㅍ", "ㄹㅎ", "ㅁ", "ㅂ", "ㅂㅅ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ"]
+COMPOUND_JAMO = {
+    "ㄳ": "ㄱㅅ", "ㄵ": "ㄴㅈ", "ㄶ": "ㄴㅎ", "ㄺ": "ㄹㄱ", "ㄻ": "ㄹㅁ", "ㄼ": "ㄹㅂ", "ㄽ": "ㄹㅅ", "ㄾ": "ㄹㅌ",
+    "ㄿ": "ㄹㅍ", "ㅀ": "ㄹㅎ", "ㅄ": "ㅂㅅ", "ㅘ": "ㅗㅏ", "ㅙ": "ㅗㅐ", "ㅚ": "ㅗㅣ", "ㅝ": "ㅜㅓ", "ㅞ": "ㅜㅔ",
+    "ㅟ": "ㅜㅣ", "ㅢ": "ㅡㅣ",
+}
+HANGUL_FIRST, HANGUL_LAST = 0xAC00, 0xD7A3
+
+
+def normalize(text):
+    """대소문자·공백·유니코드 정규형 차이를 무시하는 비교용 문자열"""
+    return "".join(unicodedata.normalize("NFC", text).casefold().split())
+
+
+def jamo(text):
+    """한글 음절을 자모로 푼 비교용 문자열 ("팥빙수" → "ㅍㅏㅌㅂㅣㅇㅅㅜ")"""
+    chars = []
+    for char in normalize(text):
+        code = ord(char)
+        if HANGUL_FIRST <= code <= HANGUL_LAST:
+            offset = code - HANGUL_FIRST
+            chars.append(CHOSEONG[offset // 588] + JUNGSEONG[offset // 28 % 21] + JONGSEONG[offset % 28])
+        else:
+            chars.append(COMPOUND_JAMO.get(char, char))
+    return "".join(chars)
+
+
+def choseong(text):
+    """한글 음절의 초성만 남긴 문자열 ("팥빙수" → "ㅍㅂㅅ")"""
+    chars = []
+    for char in normalize(text):
+        code = ord(char)
+        if HANGUL_FIRST <= code <= HANGUL_LAST:
+            chars.append(CHOSEONG[(code - HANGUL_FIRST) // 588])
+        else:
+            chars.append(char)
+    return "".join(chars)
+
+
+def is_choseong_query(text):
+    """초성 검색어 (자음이 있고 완성된 한글 음절은 없음, 예: "ㅍㅂㅅ", "ㅈㅍ09")"""
+    return any(char in CHOSEONG for char in text) and not any(
+        HANGUL_FIRST <= ord(char) <= HANGUL_LAST for char in text
+    )
+
+
+def word_starts(name):
+    """이름과 각 단어부터 시작하는 뒷부분 ("딸기 팥빙수" → "딸기 팥빙수", "팥빙수")"""
+    words = name.split()
+    return [" ".join(words[k:]) for k in range(len(words))] or [name]
+
+
+def bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)} if len(text) > 1 else {text}
+
+
+class NameIndex:
+    """이름 목록의 검색 색인 - search()는 관련도 순의 이름 위치 목록을 반환"""
+
+    def __init__(self, names):
+        self.names = list(names)
+        self._jamo = [jamo(name) for name in self.names]
+        self._choseong = [choseong(name) for name in self.names]
+        # 접두어 검색용 정렬 키 (bisect) - 이름 앞뿐 아니라 단어 시작에서도 접두어로 찾음 (k: 단어 위치)
+        self._jamo_sorted = sorted(
+            (jamo(start), k, i) for i, name in enumerate(self.names) for k, start in enumerate(word_starts(name))
+        )
+        self._choseong_sorted = sorted(
+            (choseong(start), k, i) for i, name in enumerate(self.names) for k, start in enumerate(word_starts(name))
+        )
+        self._bigrams = None  # fuzzy 검색을 처음 할 때 만듦
+
+    @staticmethod
+    def _prefixed(sorted_keys, prefix):
+        start = bisect.bisect_left(sorted_keys, (prefix,))
+        for key, k, i in sorted_keys[start:]:
+            if not key.startswith(prefix):
+                break
+            yield key, k, i
+
+    def _bigram_index(self):
+        if self._bigrams is None:
+            index = {}
+            for i, key in enumerate(self._jamo):
+                for gram in bigrams(key):
+                    index.setdefault(gram, []).append(i)
+            self._bigrams = index
+        return self._bigrams
+
+    def search(self, query, mode="prefix"):
+        """일치하는 이름 위치 (정확히 일치 → 이름 접두어 → 단어 접두어 → 포함 → 유사 순, 같은 단계는 짧은 이름 먼저)"""
+        key = jamo(query)
+        initials = choseong(query) if is_choseong_query(query) else None
+        found = {}  # 이름 위치 -> (단계, 점수)
+
+        def add(i, rank, score=0.0):
+            if i not in found or found[i] > (rank, score):
+                found[i] = (rank, score)
+
+        for name_key, k, i in self._prefixed(self._jamo_sorted, key):
+            add(i, 0 if name_key == key and k == 0 else 1 + min(k, 1))
+        if initials:
+            for _, k, i in self._prefixed(self._choseong_sorted, initials):
+                add(i, 1 + min(k, 1))
+        if mode in ("contains", "fuzzy"):
+            for i, name_key in enumerate(self._jamo):
+                if key in name_key or (initials and initials in self._choseong[i]):
+                    add(i, 3)
+        if mode == "fuzzy":
+            query_grams = bigrams(key)
+            shared = {}
+            index = self._bigram_index()
+            for gram in query_grams:
+                for i in index.get(gram, ()):
+                    shared[i] = shared.get(i, 0) + 1
+            for i, count in shared.items():
+                score = 2 * count / (len(query_grams) + len(bigrams(self._jamo[i])))
+                if score >= FUZZY_THRESHOLD:
+                    add(i, 4, -score)
+        return sorted(found, key=lambda i: (found[i], len(self.names[i]), self.names[i]))
+
+
+class Catalog:
+    """테이블 한 스냅샷의 행 목록 + 이름 색인
+
+    search_fields 값(이름)으로 검색하고, 필드 값 일치·범위로 거른 뒤 정렬해 페이지를 자른다.
+    """
+
+    def __init__(self, rows, fields, search_fields):
+        self.rows = list(rows)
+        self.fields = fields
+        self.search_fields = search_fields
+        rows_by_name = {}
+        for i, row in enumerate(self.rows):
+            for field in search_fields:
+                rows_by_name.setdefault(row[field], []).append(i)
+        self.index = NameIndex(rows_by_name)
+        self._rows_by_name = rows_by_name
+        self._orders = {}  # 정렬 필드 -> (행 위치 목록, 행 위치 -> 순위)
+
+    def _order(self, field):
+        cached = self._orders.get(field)
+        if cached is None:
+            # 이름 필드는 비교용 문자열로, 같은 값은 검색 필드 순으로 정렬 (요청마다 같은 순서)
+            def sort_key(i):
+                row = self.rows[i]
+                value = normalize(row[field]) if isinstance(row[field], str) else row[field]
+                return (value, *(row[f] for f in self.search_fields))
+            order = sorted(range(len(self.rows)), key=sort_key)
+            ranks = [0] * len(order)
+            for rank, i in enumerate(order):
+                ranks[i] = rank
+            cached = self._orders[field] = (order, ranks)
+        return cached
+
+    def query(self, q=None, mode="prefix", sort=None, descending=False, equals=None, ranges=None,
+              offset=0, limit=50):
+        """(일치하는 전체 행 수, 페이지 행 목록)
+
+        q가 있고 sort가 없으면 관련도 순, 둘 다 없으면 첫 검색 필드 순.
+        equals: {필드: 값}, ranges: {필드: (최솟값 | None, 최댓값 | None)}
+        검색 필드 값이 equals에 있으면 (예: 한 제품의 BOM) 그 이름의 행만 보고 전체 행을 훑지 않는다.
+        """
+        equals = equals or {}
+        ranges = ranges or {}
+        named = [value for field, value in equals.items() if field in self.search_fields]
+
+        if q:
+            matched = []
+            seen = set()
+            for name_position in self.index.search(q, mode):
+                for i in self._rows_by_name[self.index.names[name_position]]:
+                    if i not in seen:
+                        seen.add(i)
+                        matched.append(i)
+            if sort is not None:
+                matched.sort(key=self._order(sort)[1].__getitem__)
+        elif named:
+            ranks = self._order(sort or self.search_fields[0])[1]
+            matched = sorted(self._rows_by_name.get(named[0], ()), key=ranks.__getitem__)
+        else:
+            matched = self._order(sort or self.search_fields[0])[0]
+        if descending:
+            matched = matched[::-1]
+
+        if equals or ranges:
+            matched = [
+                i for i in matched
+                if all(self.rows[i][field] == value for field, value in equals.items())
+                and all((low is None or self.rows[i][field] >= low) and (high is None or self.rows[i][field] <= high)
+                        for field, (low, high) in ranges.items())
+            ]
+        return len(matched), [self.rows[i] for i in matched[offset:offset + limit]]
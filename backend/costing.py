@@ -0,0 +1,116 @@
+"""제품 단위 원가 상시 테이블 + 역전개(where-used) 색인
+
+마스터 데이터 스냅샷이 바뀌면 이전 스냅샷과 비교해 바뀐 BOM 행과 단가만 찾고,
+영향을 받는 제품의 원가만 다시 계산한다 (다른 워커의 쓰기나 직접 고친 CSV도 같은 방식).
+
+- where_used: 구성품(원재료·중간재) → {그것을 직접 쓰는 제품: 수량} (bom.csv 기준)
+- material_users: 원재료 → {제품: 제품 1개당 전개 소요량} (전개된 BOM 기준)
+- 단위 원가: 실제 생산 1개당 재료비 (main.PlanTemplate.unit_material_cost와 같은 계산,
+  단가 미등록 원재료는 0원)
+"""
+import threading
+
+
+def _changed_keys(old, new):
+    """값이 다르거나 한쪽에만 있는 키"""
+    changed = (old.keys() - new.keys()) | (new.keys() - old.keys())
+    changed.update(key for key in old.keys() & new.keys() if old[key] != new[key])
+    return changed
+
+
+def _reindex(index, owner, old_row, new_row):
+    """owner 행이 old_row → new_row로 바뀐 만큼 역색인 {구성품: {owner: 수량}} 갱신"""
+    for component in old_row.keys() - new_row.keys():
+        users = index[component]
+        del users[owner]
+        if not users:
+            del index[component]
+    for component, qty in new_row.items():
+        index.setdefault(component, {})[owner] = qty
+
+
+class CostTable:
+    """제품별 단위 원가 (update로 새 스냅샷을 반영, 조회는 제품당 O(1))"""
+
+    def __init__(self):
+        self._bom = {}
+        self._exploded = {}
+        self._raw_materials = {}
+        self.where_used = {}
+        self.material_users = {}
+        self._costs = {}  # 제품 -> (단위 원가, 단가 미등록 원재료 목록)
+        self._lock = threading.Lock()
+        self.updates = 0
+        self.recomputed = 0
+
+    def update(self, bom, exploded, raw_materials):
+        """새 스냅샷 반영 - 원가를 다시 계산한 제품 집합 반환 (스냅샷이 그대로면 빈 집합)
+
+        bom: get_bom(), exploded: get_exploded_bom(), raw_materials: get_raw_materials()
+        """
+        with self._lock:
+            if bom is self._bom and exploded is self._exploded and raw_materials is self._raw_materials:
+                return set()
+
+            changed_products = _changed_keys(self._bom, bom) if bom is not self._bom else set()
+            for product in changed_products:
+                _reindex(self.where_used, product, self._bom.get(product, {}), bom.get(product, {}))
+            affected = self._ancestors(changed_products)
+            for product in affected:
+                _reindex(self.material_users, product,
+                         self._exploded.get(product, {}), exploded.get(product, {}))
+
+            if raw_materials is not self._raw_materials:
+                old_prices, new_prices = self._raw_materials, raw_materials
+                for material in _changed_keys(old_prices, new_prices):
+                    if old_prices.get(material, {}).get("price") != new_prices.get(material, {}).get("price"):
+                        affected.update(self.material_users.get(material, ()))
+
+            for product in affected:
+                if product in exploded:
+                    self._costs[product] = self._cost_of(exploded[product], raw_materials)
+                else:
+                    self._costs.pop(product, None)
+
+            self._bom, self._exploded, self._raw_materials = bom, exploded, raw_materials
+            self.updates += 1
+            self.recomputed += len(affected)
+            return affected
+
+    def _ancestors(self, products):
+        """products와 그것을 (여러 단계를 거쳐) 구성품으로 쓰는 모든 제품"""
+        found = set(products)
+        stack = list(products)
+        while stack:
+            for parent in self.where_used.get(stack.pop(), ()):
+                if parent not in found:
+                    found.add(parent)
+                    stack.append(parent)
+        return found
+
+    @staticmethod
+    def _cost_of(requirements, raw_materials):
+        total = 0
+        unpriced = []
+        for material, qty in requirements.items():
+            if material in raw_materials:
+                total += qty * raw_materials[material]["price"]
+            else:
+                unpriced.append(material)
+        return total, unpriced
+
+    def cost(self, product):
+        """(단위 원가, 단가 미등록 원재료) - BOM이 없는 제품이면 None"""
+        return self._costs.get(product)
+
+    def costs(self):
+        with self._lock:
+            return dict(self._costs)
+
+    def used_by(self, component):
+        """(직접 쓰는 제품 {제품: 수량}, 전개 기준 사용 제품 {제품: 1개당 소요량})"""
+        with self._lock:
+            return dict(self.where_used.get(component, {})), dict(self.material_users.get(component, {}))
+
+    def stats(self):
+        return {"products": len(self._costs), "updates": self.updates, "recomputed": self.recomputed}
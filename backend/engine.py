@@ -0,0 +1,184 @@
+"""numpy 기반 BOM 전개 엔진
+
+원재료까지 전개한 BOM(main.get_exploded_bom)을 제품×원재료 희소 행렬(CSR)로
+컴파일해 두고, 소요량/부족량/원가를 행렬-벡터 연산으로 계산한다.
+단건 계획 결과는 main.build_plan(python 엔진)과 동일하다.
+"""
+import numpy as np
+
+
+class CompiledBom:
+    """제품×원재료 행렬 + 단가 벡터
+
+    행렬은 CSR 형태(indptr, indices, data)로 보관한다. 각 제품 행의 열 순서는
+    bom.csv 상의 순서를 그대로 유지해 응답 dict의 키 순서가 python 엔진과 같다.
+    """
+
+    def __init__(self, products, materials, indptr, indices, data, prices, priced):
+        self.products = products
+        self.product_index = {name: i for i, name in enumerate(products)}
+        self.materials = materials
+        self.material_index = {name: i for i, name in enumerate(materials)}
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.prices = prices
+        self.priced = priced
+
+    @property
+    def shape(self):
+        return (len(self.products), len(self.materials))
+
+    def row(self, product):
+        """제품 한 행의 (원재료 열 인덱스, 단위 소요량)"""
+        p = self.product_index[product]
+        start, end = self.indptr[p], self.indptr[p + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def dense(self):
+        """조밀 행렬 (제품 수 × 원재료 수)"""
+        matrix = np.zeros(self.shape)
+        rows = np.repeat(np.arange(len(self.products)), np.diff(self.indptr))
+        matrix[rows, self.indices] = self.data
+        return matrix
+
+
+def compile_bom(bom, raw_materials):
+    """get_exploded_bom() / get_raw_materials() 결과를 CompiledBom으로 변환"""
+    products = list(bom.keys())
+    materials = []
+    material_index = {}
+    indptr = [0]
+    indices = []
+    data = []
+    for product in products:
+        for material, qty in bom[product].items():
+            if material not in material_index:
+                material_index[material] = len(materials)
+                materials.append(material)
+            indices.append(material_index[material])
+            data.append(qty)
+        indptr.append(len(indices))
+
+    prices = np.array(
+        [raw_materials[m]["price"] if m in raw_materials else 0 for m in materials],
+        dtype=np.int64,
+    )
+    priced = np.array([m in raw_materials for m in materials], dtype=bool)
+    return CompiledBom(
+        products,
+        materials,
+        np.array(indptr, dtype=np.int64),
+        np.array(indices, dtype=np.int64),
+        np.array(data, dtype=np.float64),
+        prices,
+        priced,
+    )
+
+
+def inventory_vector(compiled, inventory):
+    """재고 dict를 원재료 열 순서의 벡터로 변환 (없는 원재료는 0)"""
+    return np.array([inventory.get(m, 0) for m in compiled.materials], dtype=np.int64)
+
+
+def product_vector(compiled, quantities):
+    """{제품: 생산 수량} dict를 제품 행 순서의 벡터로 변환"""
+    vec = np.zeros(len(compiled.products))
+    for product, qty in quantities.items():
+        vec[compiled.product_index[product]] += qty
+    return vec
+
+
+def demand_vector(compiled, product_qty):
+    """제품 수량 벡터 → 원재료 소요량 벡터 (q @ BOM)"""
+    counts = np.diff(compiled.indptr)
+    weights = compiled.data * np.repeat(product_qty, counts)
+    return np.bincount(compiled.indices, weights=weights, minlength=len(compiled.materials))
+
+
+def shortage_vector(demand, inventory_vec):
+    """원재료별 부족량 (부족하지 않으면 0)"""
+    return np.maximum(demand - inventory_vec, 0)
+
+
+def cost_of(compiled, demand):
+    """원재료 소요량 벡터의 총 재료비"""
+    return float(demand @ compiled.prices)
+
+
+def explode(compiled, inventory_vec, product, required_qty):
+    """main.build_plan의 (소요량, 부족, 총 재료비, 원가 내역)과 같은 형태의 결과를 벡터 연산으로 계산"""
+    cols, unit_qty = compiled.row(product)
+    names = [compiled.materials[c] for c in cols.tolist()]
+    required = unit_qty * required_qty
+    available = inventory_vec[cols]
+    prices = compiled.prices[cols]
+    priced = compiled.priced[cols]
+    costs = required * prices
+
+    required_list = required.tolist()
+    materials = dict(zip(names, required_list))
+
+    insufficient_materials = {}
+    short = np.flatnonzero(available < required)
+    if short.size:
+        available_list = available.tolist()
+        for i in short.tolist():
+            insufficient_materials[names[i]] = {
+                "required": required_list[i],
+                "available": available_list[i],
+                "shortage": required_list[i] - available_list[i],
+            }
+
+    # 합계는 python 엔진과 같은 순서로 누적해 부동소수 결과를 일치시킨다
+    cost_list = costs.tolist()
+    price_list = prices.tolist()
+    priced_list = priced.tolist()
+    total_cost = 0
+    materials_with_cost = {}
+    for i, name in enumerate(names):
+        if priced_list[i]:
+            total_cost += cost_list[i]
+            materials_with_cost[name] = {
+                "quantity": required_list[i],
+                "unit_price": price_list[i],
+                "cost": cost_list[i],
+            }
+        else:
+            materials_with_cost[name] = {
+                "quantity": required_list[i],
+                "unit_price": 0,
+                "cost": 0,
+            }
+
+    return materials, insufficient_materials, total_cost, materials_with_cost
+
+
+def sweep_grid(per_unit, unit_prices, inventory, plan_qtys, raw_rates, process_rates, rounding):
+    """계획 수량 × 원료 불량률 × 공정 불량률 격자 전체를 한 번에 계산
+
+    per_unit: 제품 1개당 원재료 소요량 (전개된 BOM 행)
+    반환 배열의 shape는 (len(plan_qtys), len(raw_rates), len(process_rates))
+    """
+    qty = np.asarray(plan_qtys, dtype=np.int64)[:, None, None]
+    raw = np.asarray(raw_rates, dtype=float)[None, :, None]
+    process = np.asarray(process_rates, dtype=float)[None, None, :]
+
+    required = qty / ((1 - raw) * (1 - process))
+    if rounding:
+        required = np.ceil(required)
+    required = np.floor(required).astype(np.int64)
+
+    # 원가와 재고 한도는 생산 수량에 선형이므로 제품 1개당 값만 구하면 된다
+    cost_per_unit = sum(q * unit_prices[m] for m, q in per_unit.items() if m in unit_prices)
+    limits = [inventory.get(m, 0) / q for m, q in per_unit.items() if q > 0]
+    limit = min(limits) if limits else np.inf
+
+    total_cost = required * cost_per_unit
+    unit_cost = np.where(qty > 0, total_cost / np.maximum(qty, 1), 0).astype(np.int64)
+    return {
+        "required_production": required,
+        "total_cost": total_cost,
+        "unit_cost": unit_cost,
+        "shortage": required > limit,
+    }
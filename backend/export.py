@@ -0,0 +1,189 @@
+"""스트리밍 내보내기 (CSV / NDJSON / Parquet / Arrow)
+
+행 생성기를 BATCH_ROWS개씩 묶어 인코딩하고 바이트 조각을 yield한다.
+StreamingResponse에 그대로 넘기면 결과 크기와 관계없이 메모리 사용량이 일정하다.
+parquet / arrow 형식은 pyarrow가 설치되어 있을 때만 지원한다.
+(main.api_export_table, main.api_export_plan_batch에서 사용)
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 미설치 시 csv / ndjson만 지원
+    pa = None
+    pq = None
+
+BATCH_ROWS = 5000
+
+# 형식 -> (Content-Type, 파일 확장자)
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+# 계획 결과를 원재료 1개당 1행으로 펼친 컬럼
+PLAN_FIELDS = [
+    "index", "product", "status", "planned_qty", "required_production",
+    "material_name", "quantity", "unit_price", "cost", "available", "shortage", "message",
+]
+PLAN_TYPES = {
+    "index": int, "planned_qty": int, "required_production": int,
+    "quantity": float, "unit_price": float, "cost": float,
+    "available": float, "shortage": float,
+}
+
+
+def available_formats():
+    """지원하는 형식 (pyarrow가 없으면 csv, ndjson만)"""
+    return [fmt for fmt in FORMATS if pa is not None or fmt in ("csv", "ndjson")]
+
+
+def _batches(rows, size=BATCH_ROWS):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def typed_rows(rows, types):
+    """숫자 컬럼을 int / float로 변환 (CSV 저장소는 모든 값이 문자열)"""
+    for row in rows:
+        for field, to_type in types.items():
+            value = row.get(field)
+            if value is None or value == "":
+                row[field] = None
+            elif to_type is int:
+                row[field] = int(float(value)) if isinstance(value, str) and "." in value else int(value)
+            else:
+                row[field] = float(value)
+        yield row
+
+
+def plan_rows(index, req, result):
+    """계획 요청과 결과(plan_response) 1건 → 원재료별 행
+
+    성공: materials_with_cost 기준 (quantity, unit_price, cost)
+    재고 부족: 부족한 원재료별 (quantity=필요량, available, shortage)
+    그 밖의 오류: 원재료 없이 message만 있는 1행
+    """
+    base = {
+        "index": index,
+        "product": req.product,
+        "status": result["status"],
+        "planned_qty": req.plan_qty,
+        "required_production": result.get("required_production"),
+    }
+    if result["status"] == "success":
+        for material_name, item in result["materials_with_cost"].items():
+            yield dict(base, material_name=material_name, quantity=item["quantity"],
+                       unit_price=item["unit_price"], cost=item["cost"])
+        return
+
+    insufficient = result.get("insufficient_materials") or {}
+    if not insufficient:
+        yield dict(base, message=result.get("message"))
+        return
+    for material_name, item in insufficient.items():
+        yield dict(base, material_name=material_name, quantity=item["required"],
+                   available=item["available"], shortage=item["shortage"],
+                   message=result.get("message"))
+
+
+def _csv_chunks(fields, rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for batch in _batches(rows):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # 행이 하나도 없으면 헤더만
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_chunks(fields, rows):
+    for batch in _batches(rows):
+        lines = [
+            json.dumps({f: row.get(f) for f in fields}, ensure_ascii=False, default=str)
+            for row in batch
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ByteSink:
+    """pyarrow writer가 쓴 바이트를 모아 두었다가 묶음마다 꺼내 가는 파일 객체"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _arrow_schema(fields, types):
+    arrow_types = {int: pa.int64(), float: pa.float64()}
+    return pa.schema([(f, arrow_types.get(types.get(f), pa.string())) for f in fields])
+
+
+def _arrow_chunks(fields, types, rows, fmt):
+    """Parquet은 묶음마다 row group 1개, Arrow는 IPC 스트림의 record batch 1개"""
+    schema = _arrow_schema(fields, types)
+    sink = _ByteSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    for batch in _batches(rows):
+        for row in batch:
+            for f in fields:
+                if f not in types and row.get(f) is not None:
+                    row[f] = str(row[f])
+        writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+def stream(fmt, fields, types, rows):
+    """rows(dict 생성기) → 인코딩된 바이트 조각 생성기
+
+    fmt가 지원되지 않으면 ValueError (응답을 시작하기 전에 확인할 수 있도록 즉시 발생)
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"지원하지 않는 형식: {fmt} (가능: {', '.join(available_formats())})")
+    if fmt not in available_formats():
+        raise ValueError(f"{fmt} 형식에는 pyarrow가 필요합니다")
+    rows = typed_rows(rows, types)
+    if fmt == "csv":
+        return _csv_chunks(fields, rows)
+    if fmt == "ndjson":
+        return _ndjson_chunks(fields, rows)
+    return _arrow_chunks(fields, types, rows, fmt)
@@ -0,0 +1,248 @@
+"""백그라운드 작업 - 오래 걸리는 계획 계산을 프로세스 풀에서 실행하고 진행률·결과를 파일로 보관
+
+작업 폴더: <사이트 데이터 폴더>/jobs/<작업 ID>/
+- status.json: 상태(queued → running → succeeded | failed | cancelled), 진행률, 시각, 오류
+- results.ndjson: 계산이 끝난 부분 결과 (배치 계획은 계획 1건당 1줄) - 실행 중에도 읽을 수 있음
+- result.json: 최종 결과
+- cancel: 취소 요청 표시 (실행 중인 작업은 다음 진행률 기록 때 멈춤)
+
+파일로 주고받으므로 여러 uvicorn 워커 중 어느 워커로 조회·취소해도 같은 작업을 본다.
+작업을 실행 중인 서버 프로세스가 죽으면 그 작업은 running 상태로 남는다.
+"""
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+ID_PATTERN = re.compile(r"^[0-9a-f]{16}$")
+FINAL_STATES = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """취소 요청을 받은 작업"""
+
+
+class JobFailed(Exception):
+    """작업 함수가 계산할 수 없다고 판단한 작업 (메시지가 그대로 상태의 error가 됨)"""
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _write_json(path, content):
+    """임시 파일에 쓰고 교체 (읽는 쪽이 쓰다 만 파일을 보지 않도록)"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(content, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+class JobStore:
+    """작업 폴더 하나의 상태·결과 파일"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _path(self, job_id, name):
+        return self.directory / job_id / name
+
+    def create(self, kind, params):
+        """queued 상태의 새 작업 - 상태 dict 반환 (params는 작은 값만, 진행률을 쓸 때마다 다시 저장됨)"""
+        job_id = uuid.uuid4().hex[:16]
+        (self.directory / job_id).mkdir(parents=True)
+        status = {
+            "id": job_id, "kind": kind, "params": params, "state": "queued",
+            "done": 0, "total": None, "progress": 0.0,
+            "created_at": _now(), "started_at": None, "finished_at": None, "error": None,
+        }
+        _write_json(self._path(job_id, "status.json"), status)
+        return status
+
+    def status(self, job_id):
+        """작업 상태 (없으면 None)"""
+        if not ID_PATTERN.match(job_id or ""):
+            return None
+        try:
+            with open(self._path(job_id, "status.json"), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def update(self, job_id, **fields):
+        status = self.status(job_id)
+        status.update(fields)
+        _write_json(self._path(job_id, "status.json"), status)
+        return status
+
+    def list(self, limit=100):
+        """최근 작업부터 상태 목록"""
+        if not self.directory.exists():
+            return []
+        statuses = (self.status(path.name) for path in self.directory.iterdir())
+        return sorted((s for s in statuses if s is not None), key=lambda s: s["created_at"], reverse=True)[:limit]
+
+    def delete(self, job_id):
+        shutil.rmtree(self.directory / job_id, ignore_errors=True)
+
+    def request_cancel(self, job_id):
+        self._path(job_id, "cancel").touch()
+
+    def cancel_requested(self, job_id):
+        return self._path(job_id, "cancel").exists()
+
+    def append_results(self, job_id, results):
+        lines = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in results)
+        with open(self._path(job_id, "results.ndjson"), 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+    def read_results(self, job_id, offset=0, limit=None):
+        """부분 결과 offset번째부터 limit개"""
+        path = self._path(job_id, "results.ndjson")
+        if not path.exists():
+            return []
+        results = []
+        with open(path, encoding='utf-8') as f:
+            for index, line in enumerate(f):
+                if index < offset:
+                    continue
+                if limit is not None and len(results) >= limit:
+                    break
+                if not line.endswith("\n"):  # 아직 쓰는 중인 줄
+                    break
+                results.append(json.loads(line))
+        return results
+
+    def write_result(self, job_id, result):
+        _write_json(self._path(job_id, "result.json"), result)
+
+    def result_bytes(self, job_id):
+        """최종 결과 JSON 원문 (없으면 None) - 큰 결과를 다시 파싱·직렬화하지 않고 그대로 응답"""
+        try:
+            with open(self._path(job_id, "result.json"), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class JobProgress:
+    """작업 함수가 받는 진행률 기록기 (워커 프로세스에서 사용)
+
+    advance()는 부분 결과를 모아 두었다가 interval초마다 한 번만 파일에 쓰고, 그때 취소 요청을
+    확인해 있으면 JobCancelled를 던진다.
+    """
+
+    def __init__(self, store, job_id, interval=0.2):
+        self.store = store
+        self.job_id = job_id
+        self.interval = interval
+        self.total = None
+        self.done = 0
+        self._pending = []
+        self._flushed_at = time.monotonic()
+
+    def start(self, total):
+        self.total = total
+        self.store.update(self.job_id, total=total)
+
+    def advance(self, n=1, results=()):
+        self.done += n
+        self._pending.extend(results)
+        if time.monotonic() - self._flushed_at >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self.store.append_results(self.job_id, self._pending)
+            self._pending = []
+        progress = min(self.done / self.total, 1.0) if self.total else 0.0
+        self.store.update(self.job_id, done=self.done, progress=round(progress, 4))
+        self._flushed_at = time.monotonic()
+        if self.store.cancel_requested(self.job_id):
+            raise JobCancelled()
+
+
+def execute(directory, job_id, fn, *args):
+    """워커 프로세스에서 작업 실행 - fn(progress, *args)의 반환값을 result.json에 저장"""
+    store = JobStore(directory)
+    if store.cancel_requested(job_id):
+        store.update(job_id, state="cancelled", finished_at=_now())
+        return
+    store.update(job_id, state="running", started_at=_now())
+    progress = JobProgress(store, job_id)
+    try:
+        result = fn(progress, *args)
+        progress.flush()
+    except JobCancelled:
+        store.update(job_id, state="cancelled", finished_at=_now())
+        return
+    except JobFailed as e:
+        store.update(job_id, state="failed", finished_at=_now(), error=str(e))
+        return
+    except Exception as e:
+        store.update(job_id, state="failed", finished_at=_now(), error=f"{type(e).__name__}: {e}")
+        return
+    store.write_result(job_id, result)
+    store.update(job_id, state="succeeded", progress=1.0, finished_at=_now())
+
+
+class JobQueue:
+    """크기가 정해진 프로세스 풀 + 대기 작업 수 제한 (프로세스당 하나)"""
+
+    def __init__(self, max_workers, max_pending, mp_context=None, initializer=None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._mp_context = mp_context
+        self._initializer = initializer
+        self._executor = None
+        self._futures = {}  # (작업 폴더, 작업 ID) -> Future
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self.max_workers, mp_context=self._mp_context, initializer=self._initializer
+            )
+        return self._executor
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for f in self._futures.values() if not f.done())
+
+    def submit(self, store, job_id, fn, *args):
+        """작업 실행 예약 - 대기 작업이 max_pending개 이상이면 False"""
+        with self._lock:
+            if sum(1 for f in self._futures.values() if not f.done()) >= self.max_pending:
+                return False
+            future = self._pool().submit(execute, store.directory, job_id, fn, *args)
+            key = (store.directory, job_id)
+            self._futures[key] = future
+        future.add_done_callback(lambda f: self._finished(store, job_id, key, f))
+        return True
+
+    def _finished(self, store, job_id, key, future):
+        with self._lock:
+            self._futures.pop(key, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        # 워커 프로세스가 비정상 종료한 경우 (작업 함수의 예외는 execute가 이미 기록)
+        if error is not None and store.status(job_id)["state"] not in FINAL_STATES:
+            store.update(job_id, state="failed", finished_at=_now(), error=f"{type(error).__name__}: {error}")
+
+    def cancel(self, store, job_id):
+        """취소 요청 - 아직 시작하지 않았으면 바로 취소, 실행 중이면 작업이 다음 진행률 기록 때 멈춤"""
+        store.request_cancel(job_id)
+        with self._lock:
+            future = self._futures.get((store.directory, job_id))
+        if future is not None and future.cancel():
+            store.update(job_id, state="cancelled", finished_at=_now())
+
+    def stats(self):
+        return {"workers": self.max_workers, "pending": self.pending(), "max_pending": self.max_pending}
@@ -1,55 +1,488 @@
 #change check
-from fastapi import FastAPI
-from pydantic import BaseModel
-from datetime import date
+from fastapi import FastAPI, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from datetime import date, datetime, timedelta
+import asyncio
+import functools
+import gzip
+import hashlib
+import json
+from typing import Dict, List, Optional
+from collections import OrderedDict
+import codecs
+import contextlib
+import contextvars
 import math
-import csv
+import multiprocessing
 import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+import bulk
+import catalog
+import costing
+import export
+import jobs
+import metrics
+import optimizer
+import profiling
+import scenarios
+import scheduler
+import sites
+from storage import LEDGER_SNAPSHOT_EVERY, TABLES, consumption_of, open_storage
+
+try:
+    import engine
+    import procurement
+    import simulation
+except ImportError:  # numpy 미설치 시 python 엔진만 사용 (시뮬레이션, 발주 계획 불가)
+    engine = None
+    procurement = None
+    simulation = None
+
 app = FastAPI()
+app.router.route_class = profiling.ProfiledRoute
+app.add_middleware(metrics.MetricsMiddleware)
+
+# 계획 계산 엔진: "python"(기본) 또는 "numpy"
+PLAN_ENGINE = os.environ.get("PLAN_ENGINE", "python")
+if engine is None:
+    PLAN_ENGINE = "python"
 
-# CSV 파일 경로
-CSV_DIR = Path(__file__).parent
-PRODUCTS_CSV = CSV_DIR / "products.csv"
-MATERIALS_CSV = CSV_DIR / "raw_materials.csv"
-BOM_CSV = CSV_DIR / "bom.csv"
-INVENTORY_CSV = CSV_DIR / "inventory.csv"
+# CSV 파일 경로 (DATA_DIR로 다른 데이터 폴더 지정 가능)
+CSV_DIR = Path(os.environ.get("DATA_DIR", Path(__file__).parent))
+
+# 저장소: "csv"(기본) 또는 "sqlite" (SQLITE_PATH 기본값: CSV_DIR/patbingsu.db)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "csv")
+# 재고 원장 항목이 이만큼 쌓일 때마다 재고 스냅샷 저장 (시점 재고 조회의 재생 구간 길이)
+LEDGER_SNAPSHOT_EVERY = int(os.environ.get("LEDGER_SNAPSHOT_EVERY", LEDGER_SNAPSHOT_EVERY))
 
 # 1️⃣ 요청 모델
 class ProductionRequest(BaseModel):
     product: str
-    plan_qty: int
+    plan_qty: int = Field(gt=0)
     start_date: date
-    raw_defect_rate: float
-    process_defect_rate: float
+    raw_defect_rate: float = Field(ge=0, lt=1)
+    process_defect_rate: float = Field(ge=0, lt=1)
     rounding: bool
 
-# 2️⃣ CSV 읽기 함수
-def read_csv(filepath):
-    """CSV 파일을 딕셔너리 리스트로 반환"""
-    if not os.path.exists(filepath):
-        return []
-    with open(filepath, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        return list(reader)
-
-def write_csv(filepath, fieldnames, data):
-    """CSV 파일에 데이터 쓰기"""
-    with open(filepath, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data)
+class BatchProductionRequest(BaseModel):
+    requests: List[ProductionRequest]
+
+class ScheduleOrder(BaseModel):
+    product: str
+    plan_qty: int = Field(gt=0)
+    due_date: date
+    start_date: Optional[date] = None  # 착수 가능일 (없으면 바로 착수)
+    raw_defect_rate: float = Field(default=0.0, ge=0, lt=1)
+    process_defect_rate: float = Field(default=0.0, ge=0, lt=1)
+    rounding: bool = True
+
+class MaterialReceipt(BaseModel):
+    material_name: str
+    quantity: int
+    date: date
+
+MAX_SCHEDULE_DAYS = 3650  # 스케줄 기간 상한 (약 10년)
+
+class ScheduleRequest(BaseModel):
+    start_date: date
+    horizon_days: int = Field(default=90, ge=1, le=MAX_SCHEDULE_DAYS)
+    daily_capacity: int  # 하루 최대 생산 수량 (불량 포함)
+    capacity_overrides: Dict[date, int] = {}  # 특정일 용량 (휴무일은 0)
+    orders: List[ScheduleOrder]
+    receipts: List[MaterialReceipt] = []
+    inventory_as_of: Optional[date] = None  # 이 날짜 마감 시점 재고로 계산 (없으면 현재 재고)
+
+class ProcurementRequest(BaseModel):
+    orders: List[ProductionRequest]  # 착수일(start_date)에 원재료가 모두 있어야 함
+    receipts: List[MaterialReceipt] = []  # 이미 발주한 입고 예정
+    lead_times: Dict[str, int] = {}  # 원재료별 조달 기간 (일)
+    default_lead_time: int = 0
+    min_order_qty: Dict[str, int] = {}  # 원재료별 최소 발주량
+    default_min_order_qty: int = 0
+    order_date: Optional[date] = None  # 발주 기준일 (없으면 오늘)
+
+class CapacityRequest(BaseModel):
+    raw_defect_rate: float = Field(default=0.0, ge=0, lt=1)
+    process_defect_rate: float = Field(default=0.0, ge=0, lt=1)
+    rounding: bool = True
+    products: Optional[List[str]] = None  # 없으면 BOM에 있는 전체 제품
+    optimize_mix: bool = False  # 판매가 합계 최대 제품 믹스도 계산
+
+class DefectDistribution(BaseModel):
+    kind: str = "fixed"  # fixed, uniform, triangular, normal, beta
+    mean: Optional[float] = None
+    std: Optional[float] = None
+    low: Optional[float] = None
+    high: Optional[float] = None
+    mode: Optional[float] = None
+
+class SimulationRequest(BaseModel):
+    product: str
+    plan_qty: int = Field(gt=0)
+    rounding: bool = True
+    raw_defect: DefectDistribution
+    process_defect: DefectDistribution
+    trials: int = 100_000
+    seed: Optional[int] = None  # 같은 seed면 같은 결과
+    workers: int = 1  # 2 이상이면 프로세스 풀로 나눠 실행
+    percentiles: List[float] = [5, 50, 95]
+
+MAX_SIMULATION_TRIALS = 10_000_000  # 표본 배열을 메모리에 한 번에 두므로 상한
+
+class SweepRequest(BaseModel):
+    product: str
+    plan_qtys: List[int]
+    raw_defect_rates: List[float]
+    process_defect_rates: List[float]
+    rounding: bool = True
+
+MAX_SWEEP_CELLS = 1_000_000
+SWEEP_JOB_STEPS = 50  # 백그라운드 작업으로 실행할 때 진행률 기록 횟수
+
+class ScenarioRequest(BaseModel):
+    name: str
+    upserts: Dict[str, List[Dict]] = {}  # {테이블(products, raw-materials, bom, inventory): [행]}
+    deletes: Dict[str, List[Dict]] = {}  # {테이블: [기본키 dict]}
+    inventory_deltas: Dict[str, int] = {}  # 원재료별 재고 증감
+    price_factors: Dict[str, float] = {}  # 원재료별 단가 배수 (2.0이면 두 배)
+
+class ScenarioCompareRequest(BaseModel):
+    scenario_ids: List[Optional[str]]  # null이면 기본 데이터
+    requests: List[ProductionRequest]
+
+# 2️⃣ 마스터 데이터 캐시
+class MasterDataCache:
+    """테이블을 한 번만 파싱해 보관하는 프로세스 단위 스냅샷 캐시
+
+    - 읽기: 파싱 결과는 불변 dict(self._entries)에 있고, 갱신할 때는 새 dict를 만들어
+      참조를 통째로 바꾸므로(atomic swap) 읽는 쪽은 잠금 없이 한 시점의 스냅샷을 본다.
+    - 변경 감지: storage.signature(table)(CSV: mtime/size, SQLite: 버전)을 테이블마다
+      check_interval초에 한 번만 확인한다. 다른 프로세스의 쓰기는 그만큼 늦게 보일 수 있다.
+    - 이 프로세스의 쓰기는 쓰기 스레드(StorageWriter)가 쓰기 직후 reload()로 바로 반영한다.
+    반환되는 객체는 여러 요청이 공유하므로 호출 측에서 수정하면 안 된다.
+    통계 카운터는 잠금 없이 올리므로 동시 요청이 많으면 근삿값이다.
+    """
+
+    def __init__(self, storage, check_interval=0.0):
+        self.storage = storage
+        self.check_interval = check_interval
+        self._entries = {}  # (테이블, 파서 이름) -> (시그니처, 파싱 결과)
+        self._parsers = {}  # (테이블, 파서 이름) -> 파서
+        self._checked = {}  # 테이블 -> 마지막 시그니처 확인 시각
+        self._load_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.invalidations = 0
+
+    def get(self, table, parser):
+        """캐시된 파싱 결과 반환 (없거나 테이블이 바뀌었으면 다시 파싱)"""
+        key = (table, parser.__name__)
+        entry = self._entries.get(key)
+        if entry is not None and not self._changed(table, entry[0]):
+            self.hits += 1
+            return entry[1]
+        return self._load(key, parser, entry)
+
+    def _changed(self, table, signature):
+        now = time.monotonic()
+        if now - self._checked.get(table, -math.inf) < self.check_interval:
+            return False
+        self._checked[table] = now
+        return self.storage.signature(table) != signature
+
+    def _load(self, key, parser, entry):
+        with self._load_lock:
+            # 기다리는 동안 다른 스레드가 이미 새로 읽었으면 그 결과 사용
+            current = self._entries.get(key)
+            if current is not None and current is not entry:
+                self.hits += 1
+                return current[1]
+            signature = self.storage.signature(key[0])
+            data = parser(self.storage.read(key[0]))
+            if entry is None:
+                self.misses += 1
+            else:
+                self.reloads += 1
+            self._parsers[key] = parser
+            self._publish({key: (signature, data)})
+            return data
+
+    def signature(self, table, parser):
+        """스냅샷에 반영된 테이블 시그니처 (get과 같은 주기로 변경 확인)
+
+        저장소 시그니처를 직접 보면 아직 반영되지 않은 변경이 버전에 먼저 나타날 수 있다.
+        """
+        self.get(table, parser)
+        return self._entries[(table, parser.__name__)][0]
+
+    def reload(self, table):
+        """이 프로세스에서 테이블을 쓴 직후 호출 - 캐시된 파서 결과를 모두 새로 만들어 교체"""
+        with self._load_lock:
+            keys = [key for key in self._parsers if key[0] == table]
+            if not keys:
+                return
+            signature = self.storage.signature(table)
+            rows = self.storage.read(table)
+            self._publish({key: (signature, self._parsers[key](rows)) for key in keys})
+            self._checked[table] = time.monotonic()
+            self.invalidations += len(keys)
+
+    def _publish(self, updates):
+        entries = dict(self._entries)
+        entries.update(updates)
+        self._entries = entries
+
+    def stats(self):
+        """hit/miss/reload 카운터"""
+        lookups = self.hits + self.misses + self.reloads
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "storage": self.storage.name,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "check_interval": self.check_interval,
+        }
+
+# 저장소 변경 확인 주기 (초) - 다른 프로세스(워커)나 직접 수정한 파일이 반영되기까지의 최대 지연
+SNAPSHOT_CHECK_INTERVAL = float(os.environ.get("SNAPSHOT_CHECK_INTERVAL", "0.5"))
+
+def data_versions():
+    """테이블별 데이터 버전 (스냅샷에 반영된 시그니처 기반) + 전체 버전 "all"
+
+    스냅샷이 최신이면 파일/DB를 읽지 않으므로 클라이언트가 매번 호출해도 가볍다.
+    """
+    parsers = {
+        "products": parse_products,
+        "bom": parse_bom,
+        "raw_materials": parse_raw_materials,
+        "inventory": parse_inventory,
+    }
+    master_cache = current_site().master_cache
+    versions = {
+        table: hashlib.sha1(repr(master_cache.signature(table, parsers[table])).encode()).hexdigest()[:16]
+        for table in TABLES
+    }
+    versions["all"] = hashlib.sha1("|".join(versions[t] for t in TABLES).encode()).hexdigest()[:16]
+    return versions
+
+class DerivedData:
+    """캐시된 원본 객체로부터 계산한 파생 데이터
+
+    MasterDataCache는 파일이 바뀔 때만 새 객체를 만들므로, 원본 객체가 그대로면
+    (is 비교) 이전 계산 결과를 재사용한다. 원본 객체를 함께 보관해 id 재사용으로
+    인한 오판을 막고, 계산 중 발생한 예외도 원본이 바뀔 때까지 보관한다.
+    """
+
+    def __init__(self, builder):
+        self._builder = builder
+        self._sources = None
+        self._result = None
+        self._error = None
+        self._lock = threading.Lock()
+
+    def get(self, *sources):
+        with self._lock:
+            cached = self._sources
+            if cached is None or len(cached) != len(sources) or any(a is not b for a, b in zip(cached, sources)):
+                try:
+                    self._result, self._error = self._builder(*sources), None
+                except Exception as e:
+                    self._result, self._error = None, e
+                self._sources = sources
+            if self._error is not None:
+                raise self._error
+            return self._result
+
+class PlanResultCache:
+    """계획 결과 LRU 캐시
+
+    키: (세대, 제품, 계획 수량, 원료 불량률, 공정 불량률, 반올림)
+    세대는 계획에 쓴 마스터 데이터 객체(전개된 BOM, 재고, 원재료)가 바뀔 때마다 올라가고,
+    그때 이전 항목을 모두 비운다. 이전 세대 데이터로 만든 계획 함수는 캐시를 거치지 않는다.
+    캐시된 결과는 얕은 복사본으로 반환하므로 최상위 키는 추가해도 되지만
+    중첩된 dict는 수정하면 안 된다.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._sources = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _generation_of(self, sources):
+        with self._lock:
+            cached = self._sources
+            if cached is None or any(a is not b for a, b in zip(cached, sources)):
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._sources = sources
+                self._generation += 1
+            return self._generation
+
+    def wrap(self, sources, plan):
+        """sources로 만든 계획 함수 plan을 캐시를 거치도록 감싼 함수 반환 (maxsize가 0이면 그대로)"""
+        if self.maxsize <= 0:
+            return plan
+        generation = self._generation_of(sources)
+
+        def cached_plan(req):
+            key = (generation, req.product, req.plan_qty, req.raw_defect_rate,
+                   req.process_defect_rate, req.rounding)
+            with self._lock:
+                current = generation == self._generation
+                result = self._entries.get(key) if current else None
+                if result is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(result)
+                self.misses += 1
+
+            result = plan(req)
+            if not current:
+                return result
+
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[key] = result
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+            return dict(result)
+
+        return cached_plan
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+# 계획 결과 캐시 항목 수 (0이면 사용 안 함)
+PLAN_CACHE_SIZE = int(os.environ.get("PLAN_CACHE_SIZE", "10000"))
+
+# 2️⃣-1 사이트(매장)별 데이터
+# 사이트 데이터 폴더 (SITES_DIR/<사이트 ID>/), 메모리에 둘 사이트 수 (오래 안 쓴 사이트부터 내보냄)
+SITES_DIR = Path(os.environ.get("SITES_DIR", CSV_DIR / "sites"))
+SITE_CACHE_SIZE = int(os.environ.get("SITE_CACHE_SIZE", "16"))
+# 계획 계산을 전용 워커 프로세스에서 할 사이트 (쉼표로 구분), 사이트당 프로세스 수
+SITE_WORKERS = {name.strip() for name in os.environ.get("SITE_WORKERS", "").split(",") if name.strip()}
+SITE_WORKER_PROCESSES = int(os.environ.get("SITE_WORKER_PROCESSES", "1"))
+# 기본 사이트의 시나리오 폴더, 사이트마다 메모리에 둘 시나리오 수 (시나리오마다 파생 데이터를 따로 보관)
+SCENARIO_DIR = Path(os.environ.get("SCENARIO_DIR", CSV_DIR / "scenarios"))
+SCENARIO_CACHE_SIZE = int(os.environ.get("SCENARIO_CACHE_SIZE", "32"))
+# 기본 사이트의 백그라운드 작업 폴더 (다른 사이트는 SITES_DIR/<사이트 ID>/jobs)
+JOB_DIR = Path(os.environ.get("JOB_DIR", CSV_DIR / "jobs"))
+
+IN_SITE_WORKER = False  # 사이트 전용 워커 프로세스 안에서는 True
+
+class Site:
+    """사이트 하나의 저장소, 캐시, 쓰기 스레드
+
+    기본 사이트(id None)는 CSV_DIR, 나머지는 SITES_DIR/<사이트 ID>/ 데이터를 쓴다.
+    요청 처리 중에는 current_site()로 얻는다. SITE_WORKERS에 있는 사이트는 무거운 계획 API를
+    전용 프로세스 풀(workers)에서 실행해 다른 사이트 요청과 GIL·스레드 풀을 나눠 쓰지 않는다.
+    """
+
+    def __init__(self, site_id, data_dir, sqlite_path=None, scenario_dir=None, job_dir=None):
+        self.id = site_id
+        self.storage = open_storage(STORAGE_BACKEND, data_dir, sqlite_path, LEDGER_SNAPSHOT_EVERY)
+        self.master_cache = MasterDataCache(self.storage, SNAPSHOT_CHECK_INTERVAL)
+        self.plan_cache = PlanResultCache(PLAN_CACHE_SIZE)
+        self.exploded_boms = DerivedData(explode_bom)
+        self.plan_templates = DerivedData(compile_templates)
+        self.compiled_bom = DerivedData(lambda bom, raw_materials: engine.compile_bom(bom, raw_materials))
+        self.inventory_vectors = DerivedData(lambda compiled, inventory: engine.inventory_vector(compiled, inventory))
+        self.snapshots = DerivedData(build_snapshot)
+        self.catalogs = {table: DerivedData(functools.partial(build_catalog, table)) for table in TABLES}
+        self.cost_table = costing.CostTable()
+        self.scenario_store = scenarios.ScenarioStore(scenario_dir or Path(data_dir) / "scenarios", SCENARIO_CACHE_SIZE)
+        self.jobs = jobs.JobStore(job_dir or Path(data_dir) / "jobs")
+        self.writer = StorageWriter()
+        self.workers = None
+        if site_id in SITE_WORKERS and not IN_SITE_WORKER:
+            # 요청 스레드가 있는 프로세스를 fork하지 않도록 spawn (워커는 main을 새로 import)
+            self.workers = ProcessPoolExecutor(
+                SITE_WORKER_PROCESSES, mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_site_worker,
+            )
+
+    def close(self):
+        """LRU에서 내보낼 때 호출 (처리 중인 요청이 없을 때만) - 쓰기 스레드와 워커 프로세스 종료"""
+        self.writer.close()
+        if self.workers is not None:
+            self.workers.shutdown(wait=False, cancel_futures=True)
+
+def current_site():
+    """현재 요청의 사이트 (/sites/<사이트 ID>/... 요청이 아니면 기본 사이트)"""
+    return sites.current.get() or default_site
+
+def init_site_worker():
+    global IN_SITE_WORKER
+    IN_SITE_WORKER = True
+
+@contextlib.contextmanager
+def use_site(site_id):
+    """워커 프로세스에서 사이트 지정 (None이면 기본 사이트) - 워커는 쓴 사이트 데이터를 계속 로드해 둔다"""
+    if site_id is None:
+        yield default_site
+        return
+    site = site_registry.acquire(site_id)
+    if site is None:
+        raise LookupError(f"등록되지 않은 사이트입니다: {site_id}")
+    token = sites.current.set(site)
+    try:
+        yield site
+    finally:
+        sites.current.reset(token)
+        site_registry.release(site_id)
+
+def run_in_site(site_id, name, kwargs):
+    """사이트 워커 프로세스에서 엔드포인트 실행"""
+    if not site_registry.exists(site_id):
+        return {"status": "error", "message": f"등록되지 않은 사이트입니다: {site_id}"}
+    with use_site(site_id):
+        return globals()[name].__wrapped__(**kwargs)
+
+def site_isolated(endpoint):
+    """SITE_WORKERS 사이트의 요청이면 동기 엔드포인트를 그 사이트 전용 워커 프로세스에서 실행
+
+    인자(요청 모델)와 결과는 pickle로 주고받는다. 워커에서 기록한 계획 단계 지표는 /metrics에 합쳐지지 않는다.
+    """
+    @functools.wraps(endpoint)
+    def wrapper(**kwargs):
+        site = current_site()
+        if site.workers is None:
+            return endpoint(**kwargs)
+        return site.workers.submit(run_in_site, site.id, endpoint.__name__, kwargs).result()
+    return wrapper
 
 # 3️⃣ 데이터 로드 함수
-def get_products():
-    """제품 정보 로드"""
-    rows = read_csv(PRODUCTS_CSV)
+def parse_products(rows):
     return {row['product_name']: {'price': int(row['price'])} for row in rows}
 
-def get_bom():
-    """BOM 정보 로드"""
-    rows = read_csv(BOM_CSV)
+def parse_bom(rows):
     bom = {}
     for row in rows:
         product = row['product_name']
@@ -60,41 +493,182 @@ def get_bom():
         bom[product][material] = quantity
     return bom
 
+def parse_raw_materials(rows):
+    return {row['material_name']: {'unit': row['unit'], 'price': int(row['price'])} for row in rows}
+
+def parse_inventory(rows):
+    return {row['material_name']: int(row['quantity']) for row in rows}
+
+def parse_rows(rows):
+    return rows
+
+def get_products():
+    """제품 정보 로드"""
+    return current_site().master_cache.get("products", parse_products)
+
+def get_bom():
+    """BOM 정보 로드"""
+    return current_site().master_cache.get("bom", parse_bom)
+
 def get_raw_materials():
     """원재료 정보 로드"""
-    rows = read_csv(MATERIALS_CSV)
-    return {row['material_name']: {'unit': row['unit'], 'price': int(row['price'])} for row in rows}
+    return current_site().master_cache.get("raw_materials", parse_raw_materials)
 
 def get_inventory():
     """재고 정보 로드"""
-    rows = read_csv(INVENTORY_CSV)
-    return {row['material_name']: int(row['quantity']) for row in rows}
+    return current_site().master_cache.get("inventory", parse_inventory)
 
 def get_bom_as_list():
     """BOM을 리스트로 반환 (CSV 쓰기용)"""
-    return read_csv(BOM_CSV)
+    return current_site().master_cache.get("bom", parse_rows)
 
-@app.post("/production-plan")
-def calculate_plan(req: ProductionRequest):
-    # 불량률 반영
+# 3️⃣-1 다단계 BOM
+class BomCycleError(ValueError):
+    """BOM 순환 참조 (예: A → B → A)"""
+
+    def __init__(self, cycle):
+        self.cycle = cycle
+        super().__init__("BOM 순환 참조: " + " → ".join(cycle))
+
+def bom_topological_order(bom):
+    """하위 구성품(중간재)이 먼저 오도록 제품 정렬
+
+    구성품 중 bom에 제품으로 등록된 것은 중간재로 본다.
+    순환 참조가 있으면 BomCycleError
+    """
+    order = []
+    state = {}  # 제품 -> 1: 방문 중, 2: 완료
+    for root in bom:
+        if root in state:
+            continue
+        state[root] = 1
+        path = [root]
+        stack = [iter(bom[root])]
+        # 깊은 BOM에서도 재귀 한도에 걸리지 않도록 반복문으로 DFS
+        while stack:
+            for component in stack[-1]:
+                if component not in bom:
+                    continue
+                if state.get(component) == 1:
+                    raise BomCycleError(path[path.index(component):] + [component])
+                if component not in state:
+                    state[component] = 1
+                    path.append(component)
+                    stack.append(iter(bom[component]))
+                    break
+            else:
+                stack.pop()
+                done = path.pop()
+                state[done] = 2
+                order.append(done)
+    return order
+
+def explode_bom(bom):
+    """다단계 BOM을 제품 1개당 원재료 소요량으로 전개
+
+    위상 정렬 순서로 계산하므로 여러 제품이 공유하는 중간재도 한 번만 전개된다.
+    """
+    exploded = {}
+    for product in bom_topological_order(bom):
+        requirements = {}
+        for component, qty in bom[product].items():
+            if component in bom:
+                for material, unit_qty in exploded[component].items():
+                    requirements[material] = requirements.get(material, 0) + qty * unit_qty
+            else:
+                requirements[component] = requirements.get(component, 0) + qty
+        exploded[product] = requirements
+    return exploded
+
+def get_exploded_bom():
+    """원재료 기준으로 전개한 BOM (bom.csv 로드 시 순환 참조면 BomCycleError)"""
+    return current_site().exploded_boms.get(get_bom())
+
+def get_cost_table():
+    """제품 단위 원가 테이블 + where-used 색인 (BOM·단가가 바뀐 만큼만 다시 계산)"""
+    cost_table = current_site().cost_table
+    cost_table.update(get_bom(), get_exploded_bom(), get_raw_materials())
+    return cost_table
+
+# 3️⃣-2 카탈로그 검색
+def build_catalog(table, data):
+    """get_* 결과 → 검색·페이지 조회용 행 목록 + 이름 색인 (기본키 필드로 검색)"""
+    if table == "products":
+        rows = ({"product_name": name, "price": info["price"]} for name, info in data.items())
+    elif table == "raw_materials":
+        rows = ({"material_name": name, "unit": info["unit"], "price": info["price"]} for name, info in data.items())
+    elif table == "bom":
+        rows = (
+            {"product_name": product, "material_name": material, "quantity": quantity}
+            for product, components in data.items() for material, quantity in components.items()
+        )
+    else:
+        rows = ({"material_name": name, "quantity": quantity} for name, quantity in data.items())
+    return catalog.Catalog(rows, TABLES[table]["fields"], TABLES[table]["key"])
+
+CATALOG_LOADERS = {
+    "products": get_products,
+    "raw_materials": get_raw_materials,
+    "bom": get_bom,
+    "inventory": get_inventory,
+}
+
+def get_catalog(table):
+    """테이블 검색 색인 (데이터가 바뀔 때만 다시 만듦)"""
+    return current_site().catalogs[table].get(CATALOG_LOADERS[table]())
+
+# 4️⃣ 생산 계획 계산
+def required_production(req):
+    """불량률을 반영한 실제 생산 필요 수량"""
     total_yield = (1 - req.raw_defect_rate) * (1 - req.process_defect_rate)
     required_qty = req.plan_qty / total_yield
 
     if req.rounding:
         required_qty = math.ceil(required_qty)
 
-    required_qty = int(required_qty)
-    
-    # BOM 계산
-    bom = get_bom()
-    materials = {}
-    for name, qty in bom[req.product].items():
-        materials[name] = qty * required_qty
-    
-    # 재고 확인
-    inventory = get_inventory()
+    return int(required_qty), total_yield
+
+class PlanTemplate:
+    """제품 1개의 계획 템플릿 (마스터 데이터가 바뀔 때까지 그대로 재사용)
+
+    components: [(원재료, 1개당 소요량, 단가 또는 None)] - 전개된 BOM 순서
+    unit_material_cost: 실제 생산 1개당 재료비
+    """
+    __slots__ = ("product", "components", "unit_material_cost")
+
+    def __init__(self, product, per_unit, raw_materials):
+        self.product = product
+        self.components = [
+            (name, qty, raw_materials[name]["price"] if name in raw_materials else None)
+            for name, qty in per_unit.items()
+        ]
+        self.unit_material_cost = sum(qty * price for _, qty, price in self.components if price is not None)
+
+    def materials_for(self, required_qty):
+        """BOM 전개 - 원재료별 소요량"""
+        return {name: qty * required_qty for name, qty, _ in self.components}
+
+    def cost(self, materials):
+        """원가 계산 - (총 재료비, 원재료별 수량/단가/비용) (단가 미등록 원재료는 0원)"""
+        total_cost = 0
+        materials_with_cost = {}
+        for material_name, _, unit_price in self.components:
+            required_amount = materials[material_name]
+            if unit_price is None:
+                materials_with_cost[material_name] = {"quantity": required_amount, "unit_price": 0, "cost": 0}
+            else:
+                material_cost = required_amount * unit_price
+                total_cost += material_cost
+                materials_with_cost[material_name] = {
+                    "quantity": required_amount,
+                    "unit_price": unit_price,
+                    "cost": material_cost
+                }
+        return total_cost, materials_with_cost
+
+def check_inventory(materials, inventory):
+    """재고 확인 - 부족한 원재료별 필요량/가용량/부족량"""
     insufficient_materials = {}
-    
     for material_name, required_amount in materials.items():
         available = inventory.get(material_name, 0)
         if available < required_amount:
@@ -103,7 +677,16 @@ def calculate_plan(req: ProductionRequest):
                 "available": available,
                 "shortage": required_amount - available
             }
-    
+    return insufficient_materials
+
+def compile_templates(bom, raw_materials):
+    """전개된 BOM의 모든 제품 → PlanTemplate"""
+    return {product: PlanTemplate(product, per_unit, raw_materials) for product, per_unit in bom.items()}
+
+def plan_response(req, required_qty, total_yield, explosion):
+    """전개 결과를 API 응답 형태로 변환"""
+    materials, insufficient_materials, total_cost, materials_with_cost = explosion
+
     # 재고 부족시 에러 반환
     if insufficient_materials:
         return {
@@ -117,28 +700,6 @@ def calculate_plan(req: ProductionRequest):
     raw_defect_qty = int(req.plan_qty * req.raw_defect_rate / total_yield)
     process_defect_qty = int(req.plan_qty * req.process_defect_rate / total_yield)
 
-    # 총 비용 계산
-    raw_materials = get_raw_materials()
-    total_cost = 0
-    materials_with_cost = {}
-    
-    for material_name, qty in materials.items():
-        if material_name in raw_materials:
-            unit_price = raw_materials[material_name]["price"]
-            material_cost = qty * unit_price
-            total_cost += material_cost
-            materials_with_cost[material_name] = {
-                "quantity": qty,
-                "unit_price": unit_price,
-                "cost": material_cost
-            }
-        else:
-            materials_with_cost[material_name] = {
-                "quantity": qty,
-                "unit_price": 0,
-                "cost": 0
-            }
-    
     # 객단가 (상품 1개당 재료비)
     unit_cost = int(total_cost / req.plan_qty) if req.plan_qty > 0 else 0
 
@@ -156,7 +717,819 @@ def calculate_plan(req: ProductionRequest):
         "materials_with_cost": materials_with_cost
     }
 
+def unknown_product_error(product):
+    return {
+        "status": "error",
+        "message": f"{product}의 BOM이 등록되어 있지 않습니다",
+        "insufficient_materials": {}
+    }
+
+def build_plan(req, templates, inventory):
+    """미리 컴파일한 제품별 템플릿으로 단일 생산 계획 계산 (python 엔진, 단계별 시간 기록)"""
+    template = templates.get(req.product)
+    if template is None:
+        return unknown_product_error(req.product)
+
+    start = time.perf_counter()
+    # 불량률 반영
+    required_qty, total_yield = required_production(req)
+    yielded = time.perf_counter()
+    materials = template.materials_for(required_qty)
+    exploded = time.perf_counter()
+    insufficient_materials = check_inventory(materials, inventory)
+    checked = time.perf_counter()
+    # 재고가 부족하면 응답에 원가가 없으므로 계산하지 않음
+    total_cost, materials_with_cost = (0, {}) if insufficient_materials else template.cost(materials)
+    costed = time.perf_counter()
+
+    metrics.PLAN_STAGE_SECONDS.observe_many({
+        "yield": yielded - start,
+        "explosion": exploded - yielded,
+        "inventory_check": checked - exploded,
+        "costing": costed - checked,
+    })
+    explosion = (materials, insufficient_materials, total_cost, materials_with_cost)
+    return plan_response(req, required_qty, total_yield, explosion)
+
+def build_plan_numpy(req, compiled, inventory_vec):
+    """미리 컴파일한 BOM 행렬로 단일 생산 계획 계산 (numpy 엔진)
+
+    전개·재고 확인·원가 계산을 한 번의 벡터 연산으로 하므로 explosion 단계로 함께 기록한다.
+    """
+    if req.product not in compiled.product_index:
+        return unknown_product_error(req.product)
+
+    start = time.perf_counter()
+    required_qty, total_yield = required_production(req)
+    yielded = time.perf_counter()
+    explosion = engine.explode(compiled, inventory_vec, req.product, required_qty)
+    exploded = time.perf_counter()
+
+    metrics.PLAN_STAGE_SECONDS.observe_many({
+        "yield": yielded - start,
+        "explosion": exploded - yielded,
+    })
+    return plan_response(req, required_qty, total_yield, explosion)
+
+# 4️⃣-1 계획 데이터 (기본 / what-if 시나리오)
+class PlanningData:
+    """계획 계산에 쓰는 마스터 데이터 - 기본 데이터 또는 그 위에 시나리오 변경분을 얹은 뷰
+
+    파생 데이터(전개된 BOM, 템플릿, BOM 행렬, 재고 벡터, 원가 테이블)는 시나리오가 그 원본 테이블을
+    바꿨을 때만 시나리오 전용 캐시(scenario.caches)에 계산하고, 아니면 기본 데이터 캐시를 같이 쓴다.
+    """
+
+    def __init__(self, scenario=None):
+        self.scenario = scenario
+
+    def _view(self, table, base):
+        return base if self.scenario is None else self.scenario.view(table, base)
+
+    def _derived(self, name, tables):
+        """현재 사이트의 파생 데이터 캐시(name) 또는 시나리오 전용 캐시"""
+        base_cache = getattr(current_site(), name)
+        if self.scenario is None or not any(self.scenario.touches(t) for t in tables):
+            return base_cache
+        cache = self.scenario.caches.get(name)
+        if cache is None:
+            cache = self.scenario.caches.setdefault(name, DerivedData(base_cache._builder))
+        return cache
+
+    def products(self):
+        return self._view("products", get_products())
+
+    def bom(self):
+        return self._view("bom", get_bom())
+
+    def raw_materials(self):
+        return self._view("raw_materials", get_raw_materials())
+
+    def inventory(self):
+        return self._view("inventory", get_inventory())
+
+    def inventory_at(self, moment):
+        """시점 재고 (원장 시작 이전이면 None)"""
+        stock = current_site().storage.ledger.stock_at(moment)
+        if stock is None or self.scenario is None:
+            return stock
+        return self.scenario.apply("inventory", stock)
+
+    def exploded_bom(self):
+        """순환 참조가 있으면 BomCycleError"""
+        return self._derived("exploded_boms", ("bom",)).get(self.bom())
+
+    def templates(self):
+        return self._derived("plan_templates", ("bom", "raw_materials")).get(self.exploded_bom(), self.raw_materials())
+
+    def compiled(self):
+        return self._derived("compiled_bom", ("bom", "raw_materials")).get(self.exploded_bom(), self.raw_materials())
+
+    def inventory_vector(self, compiled):
+        tables = ("bom", "raw_materials", "inventory")
+        return self._derived("inventory_vectors", tables).get(compiled, self.inventory())
+
+    def cost_table(self):
+        if self.scenario is None:
+            return get_cost_table()
+        table = self.scenario.caches.setdefault("cost_table", costing.CostTable())
+        table.update(self.bom(), self.exploded_bom(), self.raw_materials())
+        return table
+
+BASE_DATA = PlanningData()
+
+def planning_data(scenario_id):
+    """scenario_id → PlanningData (없으면 기본 데이터, 등록되지 않은 시나리오면 None)"""
+    if scenario_id is None:
+        return BASE_DATA
+    scenario = current_site().scenario_store.get(scenario_id)
+    return PlanningData(scenario) if scenario is not None else None
+
+def unknown_scenario_error(scenario_id):
+    return {"status": "error", "message": f"등록되지 않은 시나리오입니다: {scenario_id}"}
+
+def make_planner(data=BASE_DATA):
+    """설정된 엔진으로 계획 함수 생성 (마스터 데이터는 한 번만 로드, 결과는 plan_cache에 보관)
+
+    시나리오 계획은 plan_cache를 거치지 않는다 (기본 데이터 캐시를 비우지 않도록).
+    bom.csv(시나리오 반영)에 순환 참조가 있으면 BomCycleError
+    """
+    start = time.perf_counter()
+    bom = data.exploded_bom()
+    inventory = data.inventory()
+    raw_materials = data.raw_materials()
+    if PLAN_ENGINE == "numpy":
+        compiled = data.compiled()
+        inventory_vec = data.inventory_vector(compiled)
+        plan = lambda req: build_plan_numpy(req, compiled, inventory_vec)
+    else:
+        templates = data.templates()
+        plan = lambda req: build_plan(req, templates, inventory)
+    metrics.PLAN_STAGE_SECONDS.observe(time.perf_counter() - start, stage="load")
+    if data.scenario is not None:
+        return plan
+    return current_site().plan_cache.wrap((bom, inventory, raw_materials), plan)
+
+@app.post("/production-plan")
+def calculate_plan(req: ProductionRequest, scenario_id: Optional[str] = None):
+    data = planning_data(scenario_id)
+    if data is None:
+        return unknown_scenario_error(scenario_id)
+    try:
+        plan = make_planner(data)
+    except BomCycleError as e:
+        return {"status": "error", "message": str(e)}
+    return plan(req)
+
+def deduct_inventory(consumption, reference=""):
+    """재고 차감 (쓰기 스레드에서 실행) - 부족하면 부족 내역, 아니면 빈 dict
+
+    부족할 때도 스냅샷을 새로 읽는다 (미리보기가 오래된 재고로 계산됐을 수 있음)
+    """
+    site = current_site()
+    insufficient = site.storage.deduct(consumption, reference)
+    site.master_cache.reload("inventory")
+    return insufficient
+
+@app.post("/production-plan/commit")
+async def commit_plan(req: ProductionRequest):
+    """생산 계획 확정: 재고 확인과 차감을 원자적으로 수행
+
+    캐시 기준 계획 계산은 미리보기일 뿐이고, 실제 확인은 저장소 잠금(트랜잭션)
+    안에서 최신 재고로 다시 한다. 동시에 들어온 계획이 같은 재고를 중복 사용할 수 없다.
+    """
+    # 계획 계산(스냅샷 로드, 템플릿 빌드)은 막히는 작업이므로 이벤트 루프 밖에서
+    result = await asyncio.to_thread(calculate_plan, req)
+    if result["status"] != "success":
+        return result
+
+    consumption = consumption_of(result["materials"])
+    # 0 이하 차감은 재고를 늘리거나 의미 없는 원장 항목을 남기므로 확정하지 않는다
+    invalid = {name: qty for name, qty in consumption.items() if qty <= 0}
+    if invalid:
+        return {
+            "status": "error",
+            "message": f"차감량이 0 이하인 원재료가 있어 확정할 수 없습니다: {', '.join(invalid)}",
+            "invalid_consumption": invalid
+        }
+    reference = f"{req.product} {req.plan_qty}개 ({req.start_date})"
+    insufficient = await current_site().writer.run(deduct_inventory, consumption, reference)
+    if insufficient:
+        return {
+            "status": "error",
+            "message": "재고가 부족하여 생산 계획을 확정할 수 없습니다",
+            "insufficient_materials": insufficient
+        }
+
+    result["committed"] = True
+    result["consumed"] = consumption
+    return result
+
+def plan_batch(plan, requests, inventory, raw_materials, progress=None):
+    """계획 함수 하나로 여러 계획 계산 + 원재료 합계·배치 기준 재고 부족
+
+    progress(jobs.JobProgress)가 있으면 계획 1건마다 진행률과 부분 결과를 기록한다.
+    """
+    results = []
+    total_demand = {}
+    total_cost = 0
+    success_count = 0
+    if progress is not None:
+        progress.start(len(requests))
+
+    for req in requests:
+        result = plan(req)
+        results.append(result)
+        if progress is not None:
+            progress.advance(1, [result])
+        if result["status"] != "success":
+            continue
+        success_count += 1
+        total_cost += result["total_cost"]
+        for material_name, qty in result["materials"].items():
+            total_demand[material_name] = total_demand.get(material_name, 0) + qty
+
+    # 배치 전체 기준 재고 부족 (개별 계획은 통과해도 합산하면 부족할 수 있음)
+    total_insufficient = {}
+    for material_name, required_amount in total_demand.items():
+        available = inventory.get(material_name, 0)
+        if available < required_amount:
+            total_insufficient[material_name] = {
+                "required": required_amount,
+                "available": available,
+                "shortage": required_amount - available
+            }
+
+    total_demand_with_cost = {}
+    for material_name, qty in total_demand.items():
+        unit_price = raw_materials.get(material_name, {}).get("price", 0)
+        total_demand_with_cost[material_name] = {
+            "quantity": qty,
+            "unit_price": unit_price,
+            "cost": qty * unit_price
+        }
+
+    return {
+        "status": "success",
+        "count": len(results),
+        "success_count": success_count,
+        "error_count": len(results) - success_count,
+        "results": results,
+        "total_materials": total_demand_with_cost,
+        "total_cost": total_cost,
+        "insufficient_materials": total_insufficient
+    }
+
+@app.post("/production-plan/batch")
+@site_isolated
+def calculate_plan_batch(batch: BatchProductionRequest, scenario_id: Optional[str] = None):
+    """여러 생산 계획을 한 번에 계산 (마스터 데이터는 한 번만 로드)"""
+    data = planning_data(scenario_id)
+    if data is None:
+        return unknown_scenario_error(scenario_id)
+    try:
+        plan = make_planner(data)
+    except BomCycleError as e:
+        return {"status": "error", "message": str(e)}
+    return plan_batch(plan, batch.requests, data.inventory(), data.raw_materials())
+
+@app.post("/production-plan/simulate")
+@site_isolated
+def simulate_plan(req: SimulationRequest, scenario_id: Optional[str] = None):
+    """불량률을 분포로 두고 몬테카를로 시뮬레이션 (생산 수량/소요량/원가 백분위, 부족 확률)"""
+    if simulation is None:
+        return {"status": "error", "message": "시뮬레이션에는 numpy가 필요합니다"}
+    data = planning_data(scenario_id)
+    if data is None:
+        return unknown_scenario_error(scenario_id)
+    try:
+        bom = data.exploded_bom()
+    except BomCycleError as e:
+        return {"status": "error", "message": str(e)}
+    if req.product not in bom:
+        return unknown_product_error(req.product)
+
+    raw_dist = dict(req.raw_defect)
+    process_dist = dict(req.process_defect)
+    try:
+        simulation.validate(raw_dist)
+        simulation.validate(process_dist)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    if not 1 <= req.trials <= MAX_SIMULATION_TRIALS:
+        return {"status": "error", "message": f"trials는 1 ~ {MAX_SIMULATION_TRIALS:,}이어야 합니다"}
+    max_workers = os.cpu_count() or 1
+    if not 1 <= req.workers <= max_workers:
+        return {"status": "error", "message": f"workers는 1 ~ {max_workers}이어야 합니다"}
+    if any(not 0 <= p <= 100 for p in req.percentiles):
+        return {"status": "error", "message": "percentiles는 0 ~ 100 사이 값이어야 합니다"}
+
+    required = simulation.sample_required(
+        req.plan_qty, req.rounding, raw_dist, process_dist, req.trials, req.seed, req.workers
+    )
+    unit_prices = {name: info["price"] for name, info in data.raw_materials().items()}
+    result = simulation.summarize(
+        required, req.plan_qty, bom[req.product], data.inventory(), unit_prices, req.percentiles
+    )
+    result.update({"status": "success", "product": req.product, "planned_qty": req.plan_qty,
+                   "trials": req.trials, "seed": req.seed})
+    return result
+
+def sweep(req, scenario_id, progress=None):
+    """민감도 격자 계산 - progress가 있으면 계획 수량 축을 나눠 계산하며 진행률 기록"""
+    if engine is None:
+        return {"status": "error", "message": "민감도 분석에는 numpy가 필요합니다"}
+    cells = len(req.plan_qtys) * len(req.raw_defect_rates) * len(req.process_defect_rates)
+    if cells == 0 or cells > MAX_SWEEP_CELLS:
+        return {"status": "error", "message": f"격자 크기는 1 ~ {MAX_SWEEP_CELLS:,}칸이어야 합니다 (요청: {cells:,})"}
+    # 불량률 1 이상이면 양품률이 0 이하가 되어 생산 수량이 음수·오버플로가 된다 (부정형 비교로 NaN도 거름)
+    if any(not 0 <= rate < 1 for rate in (*req.raw_defect_rates, *req.process_defect_rates)):
+        return {"status": "error", "message": "불량률은 0 이상 1 미만이어야 합니다"}
+    if any(qty < 0 for qty in req.plan_qtys):
+        return {"status": "error", "message": "계획 수량은 0 이상이어야 합니다"}
+    data = planning_data(scenario_id)
+    if data is None:
+        return unknown_scenario_error(scenario_id)
+    try:
+        bom = data.exploded_bom()
+    except BomCycleError as e:
+        return {"status": "error", "message": str(e)}
+    if req.product not in bom:
+        return unknown_product_error(req.product)
+
+    unit_prices = {name: info["price"] for name, info in data.raw_materials().items()}
+    inventory = data.inventory()
+    columns = {"required_production": [], "total_cost": [], "unit_cost": [], "shortage": []}
+    # 수량 축 C order이므로 수량 구간별 결과를 이어 붙이면 전체 격자와 같다
+    step = len(req.plan_qtys) if progress is None else max(1, math.ceil(len(req.plan_qtys) / SWEEP_JOB_STEPS))
+    if progress is not None:
+        progress.start(len(req.plan_qtys))
+    for start in range(0, len(req.plan_qtys), step):
+        plan_qtys = req.plan_qtys[start:start + step]
+        grid = engine.sweep_grid(
+            bom[req.product], unit_prices, inventory, plan_qtys,
+            req.raw_defect_rates, req.process_defect_rates, req.rounding
+        )
+        for name, values in columns.items():
+            values.extend(grid[name].ravel().tolist())
+        if progress is not None:
+            progress.advance(len(plan_qtys))
+    return {
+        "status": "success",
+        "product": req.product,
+        "shape": [len(req.plan_qtys), len(req.raw_defect_rates), len(req.process_defect_rates)],
+        "plan_qtys": req.plan_qtys,
+        "raw_defect_rates": req.raw_defect_rates,
+        "process_defect_rates": req.process_defect_rates,
+        **columns,
+    }
+
+@app.post("/production-plan/sweep")
+@site_isolated
+def sweep_plan(req: SweepRequest, scenario_id: Optional[str] = None):
+    """계획 수량 × 원료 불량률 × 공정 불량률 격자 계산 (열 단위 결과)
+
+    각 배열은 shape = [수량, 원료 불량률, 공정 불량률] 순서로 펼친(C order) 값이다.
+    """
+    # 값이 모두 기본 타입이므로 jsonable_encoder를 거치지 않고 바로 직렬화 (큰 격자에서 수십 배 빠름)
+    return JSONResponse(sweep(req, scenario_id))
+
+# 5️⃣ 다일 생산 스케줄
+@app.post("/production-schedule")
+@site_isolated
+def calculate_schedule(req: ScheduleRequest, scenario_id: Optional[str] = None):
+    """납기·일별 용량·원재료 입고일을 고려한 일별 생산 스케줄"""
+    if req.start_date > date.max - timedelta(days=req.horizon_days):
+        return {"status": "error", "message": "스케줄 종료일이 표현할 수 있는 날짜 범위를 벗어납니다"}
+    data = planning_data(scenario_id)
+    if data is None:
+        return unknown_scenario_error(scenario_id)
+    try:
+        bom = data.exploded_bom()
+    except BomCycleError as e:
+        return {"status": "error", "message": str(e)}
+
+    orders = [
+        (order.product, required_production(order)[0], order.due_date, order.start_date)
+        for order in req.orders
+    ]
+    receipts = [(r.material_name, r.quantity, r.date) for r in req.receipts]
+    if req.inventory_as_of is None:
+        inventory = data.inventory()
+    else:
+        inventory = data.inventory_at(req.inventory_as_of)
+        if inventory is None:
+            return {"status": "error", "message": f"{req.inventory_as_of}은(는) 재고 원장 시작 이전입니다"}
+    result = scheduler.build_schedule(
+        orders, bom, inventory, req.start_date, req.horizon_days,
+        req.daily_capacity, req.capacity_overrides, receipts
+    )
+    result["status"] = "success"
+    return result
+
+# 5️⃣-1 최대 생산 가능 수량 / 제품 믹스
+@app.post("/production-capacity")
+@site_isolated
+def calculate_capacity(req: CapacityRequest, scenario_id: Optional[str] = None):
+    """현재 재고로 제품별 최대 계획 수량 (선택: 매출 최대 제품 믹스)"""
+    data = planning_data(scenario_id)
+    if data is None:
+        return unknown_scenario_error(scenario_id)
+    try:
+        bom = data.exploded_bom()
+    except BomCycleError as e:
+        return {"status": "error", "message": str(e)}
+
+    products = req.products if req.products is not None else list(bom.keys())
+    unknown = [p for p in products if p not in bom]
+    if unknown:
+        return {"status": "error", "message": f"BOM이 등록되지 않은 제품: {', '.join(unknown)}"}
+
+    inventory = data.inventory()
+    total_yield = (1 - req.raw_defect_rate) * (1 - req.process_defect_rate)
+    result = {
+        "status": "success",
+        "max_producible": optimizer.max_producible(bom, inventory, products, total_yield, req.rounding),
+    }
+
+    if req.optimize_mix:
+        prices = {name: info["price"] for name, info in data.products().items()}
+        mix = optimizer.optimize_mix(bom, inventory, products, prices, total_yield, req.rounding)
+        raw_materials = data.raw_materials()
+        mix["material_cost"] = sum(
+            qty * raw_materials[name]["price"]
+            for name, qty in mix["materials_used"].items() if name in raw_materials
+        )
+        result["optimal_mix"] = mix
+    return result
+
+# 5️⃣-2 제품 원가 / 마진
+def cost_entry(table, product, products, total_yield):
+    """제품 하나의 원가·판매가·마진 (BOM이 없으면 None)"""
+    cost = table.cost(product)
+    if cost is None:
+        return None
+    unit_material_cost, unpriced = cost
+    unit_cost = unit_material_cost / total_yield
+    price = products[product]["price"] if product in products else None
+    entry = {
+        "unit_material_cost": unit_material_cost,
+        "unit_cost": unit_cost,
+        "price": price,
+        "margin": price - unit_cost if price is not None else None,
+        "margin_rate": round((price - unit_cost) / price, 4) if price else None,
+    }
+    if unpriced:
+        entry["unpriced_materials"] = unpriced
+    return entry
+
+@app.get("/costs")
+def api_get_costs(product: Optional[str] = None, raw_defect_rate: float = Query(0.0, ge=0, lt=1),
+                  process_defect_rate: float = Query(0.0, ge=0, lt=1), scenario_id: Optional[str] = None):
+    """제품별 단위 원가와 마진 (products.csv 판매가 기준)
+
+    unit_material_cost는 실제 생산 1개당 재료비, unit_cost는 불량률을 반영한 양품 1개당 원가.
+    원가 테이블은 BOM·단가가 바뀔 때 영향을 받는 제품만 다시 계산해 두므로 조회는 제품당 O(1)이다.
+    """
+    data = planning_data(scenario_id)
+    if data is None:
+        return unknown_scenario_error(scenario_id)
+    try:
+        table = data.cost_table()
+    except BomCycleError as e:
+        return {"status": "error", "message": str(e)}
+    products = data.products()
+    total_yield = (1 - raw_defect_rate) * (1 - process_defect_rate)
+    if product is not None:
+        entry = cost_entry(table, product, products, total_yield)
+        if entry is None:
+            return unknown_product_error(product)
+        return {"status": "success", "product": product, **entry}
+    return {
+        "status": "success",
+        "costs": {name: cost_entry(table, name, products, total_yield) for name in table.costs()},
+    }
+
+# 5️⃣-3 원재료 발주 계획
+@app.post("/procurement-plan")
+@site_isolated
+def calculate_procurement(req: ProcurementRequest, scenario_id: Optional[str] = None):
+    """여러 생산 계획의 원재료 순소요량 → 리드타임·최소 발주량을 반영한 발주 제안
+
+    재고와 입고 예정량으로 필요일 순서대로 차감하고, 부족해지는 날짜에 맞춰 발주일을 역산한다.
+    """
+    if procurement is None:
+        return {"status": "error", "message": "발주 계획에는 numpy가 필요합니다"}
+    data = planning_data(scenario_id)
+    if data is None:
+        return unknown_scenario_error(scenario_id)
+    try:
+        compiled = data.compiled()
+    except BomCycleError as e:
+        return {"status": "error", "message": str(e)}
+
+    raw_materials = data.raw_materials()
+    orders = [(order.product, required_production(order)[0], order.start_date) for order in req.orders]
+    receipts = [(r.material_name, r.quantity, r.date) for r in req.receipts]
+    result = procurement.plan_purchases(
+        compiled, orders, data.inventory(), receipts,
+        {name: info["unit"] for name, info in raw_materials.items()},
+        req.lead_times, req.min_order_qty, req.default_lead_time, req.default_min_order_qty,
+        req.order_date,
+    )
+    result["status"] = "success"
+    return JSONResponse(result)
+
+# 5️⃣-4 what-if 시나리오
+def validate_scenario(req):
+    """시나리오 변경분 검증 - (upserts, deletes, 오류 목록), 테이블 키는 저장소 테이블 이름으로 변환
+
+    행은 대량 업로드와 같은 규칙으로 검증하고, 시나리오 안에서 추가하는 원재료·제품도 참조할 수 있다.
+    """
+    errors = [
+        {"table": name, "error": f"지원하지 않는 테이블: {name}"}
+        for name in {*req.upserts, *req.deletes} if name not in TABLE_PATHS
+    ]
+    if errors:
+        return {}, {}, errors
+
+    known_raw = set(get_raw_materials()) | {r.get("material_name") for r in req.upserts.get("raw-materials", [])}
+    known_bom = known_raw | set(get_bom()) | set(get_products())
+    known_bom |= {r.get("product_name") for r in req.upserts.get("products", []) + req.upserts.get("bom", [])}
+    known = {"bom": known_bom, "inventory": known_raw}
+
+    upserts = {}
+    for name, rows in req.upserts.items():
+        table = TABLE_PATHS[name]
+        valid, table_errors = bulk.validate_records(table, list(enumerate(rows, 1)), known.get(table, set()))
+        upserts[table] = valid
+        errors.extend({"table": name, **error} for error in table_errors)
+
+    deletes = {}
+    for name, keys in req.deletes.items():
+        table = TABLE_PATHS[name]
+        fields = TABLES[table]["key"]
+        deletes[table] = []
+        for number, key in enumerate(keys, 1):
+            missing = [f for f in fields if key.get(f) in (None, "")]
+            if missing:
+                errors.append({"table": name, "row": number, "error": f"필수 값 누락: {', '.join(missing)}"})
+            else:
+                deletes[table].append({f: str(key[f]).strip() for f in fields})
+
+    for material in req.inventory_deltas:
+        if material not in known_raw:
+            errors.append({"table": "inventory_deltas", "error": f"알 수 없는 원재료: {material}"})
+    for material, factor in req.price_factors.items():
+        if material not in known_raw:
+            errors.append({"table": "price_factors", "error": f"알 수 없는 원재료: {material}"})
+        elif factor < 0:
+            errors.append({"table": "price_factors", "error": f"단가 배수는 음수일 수 없습니다: {material}"})
+    return upserts, deletes, errors
+
+@app.post("/scenarios")
+def create_scenario(req: ScenarioRequest):
+    """시나리오 생성 - 변경분만 저장하고 마스터 데이터(CSV/DB)는 건드리지 않는다"""
+    upserts, deletes, errors = validate_scenario(req)
+    if errors:
+        return {"status": "error", "message": "시나리오 변경분에 오류가 있습니다",
+                "error_count": len(errors), "errors": errors[:bulk.MAX_REPORTED_ERRORS]}
+
+    scenario = scenarios.Scenario.create(req.name, upserts, deletes, req.inventory_deltas, req.price_factors)
+    if scenario.touches("bom"):
+        try:
+            PlanningData(scenario).exploded_bom()
+        except BomCycleError as e:
+            return {"status": "error", "message": str(e), "cycle": e.cycle}
+    current_site().scenario_store.save(scenario)
+    return {"status": "success", **scenario.summary()}
+
+@app.get("/scenarios")
+def api_get_scenarios():
+    return {"scenarios": current_site().scenario_store.list()}
+
+@app.get("/scenarios/{scenario_id}")
+def api_get_scenario(scenario_id: str):
+    """시나리오 변경분 전체"""
+    scenario = current_site().scenario_store.get(scenario_id)
+    if scenario is None:
+        return unknown_scenario_error(scenario_id)
+    return {"status": "success", **scenario.to_json()}
+
+@app.post("/scenarios/{scenario_id}/delete")
+def delete_scenario(scenario_id: str):
+    if not current_site().scenario_store.delete(scenario_id):
+        return unknown_scenario_error(scenario_id)
+    return {"status": "success", "message": f"{scenario_id} 삭제됨"}
+
+@app.post("/scenarios/compare")
+@site_isolated
+def compare_scenarios(req: ScenarioCompareRequest):
+    """같은 생산 계획들을 여러 시나리오로 계산해 비교 (scenario_ids의 null은 기본 데이터)
+
+    시나리오마다 계획 함수를 한 번만 만들고 모든 계획을 그 함수로 계산한다.
+    시나리오가 바꾸지 않은 테이블의 파생 데이터(전개된 BOM 등)는 기본 데이터 것을 같이 쓴다.
+    plans[i][j]는 i번째 계획을 j번째 시나리오로 계산한 요약, total_cost_delta는 첫 시나리오 대비 차이.
+    """
+    batches = []
+    for scenario_id in req.scenario_ids:
+        data = planning_data(scenario_id)
+        if data is None:
+            return unknown_scenario_error(scenario_id)
+        try:
+            plan = make_planner(data)
+        except BomCycleError as e:
+            return {"status": "error", "message": f"{scenario_id or '기본 데이터'}: {e}"}
+        batch = plan_batch(plan, req.requests, data.inventory(), data.raw_materials())
+        batch["scenario_id"] = scenario_id
+        batch["name"] = data.scenario.name if data.scenario is not None else None
+        batches.append(batch)
+
+    plans = [
+        [
+            {
+                "status": batch["results"][i]["status"],
+                "total_cost": batch["results"][i].get("total_cost"),
+                "unit_cost": batch["results"][i].get("unit_cost"),
+                "shortage": {
+                    name: info["shortage"]
+                    for name, info in batch["results"][i].get("insufficient_materials", {}).items()
+                },
+            }
+            for batch in batches
+        ]
+        for i in range(len(req.requests))
+    ]
+    baseline = batches[0]["total_cost"] if batches else 0
+    for batch in batches:
+        del batch["results"], batch["status"]
+        batch["total_cost_delta"] = batch["total_cost"] - baseline
+    return {"status": "success", "scenarios": batches, "plans": plans}
+
+# 5️⃣-5 백그라운드 작업 (오래 걸리는 계획 계산)
+# 작업 실행 프로세스 수 (모든 사이트가 같이 씀), 서버 프로세스당 대기·실행 중인 작업 수 상한
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.environ.get("JOB_MAX_PENDING", "16"))
+JOB_POLL_INTERVAL = 0.2  # 초 - /jobs/{id}/stream이 상태 파일을 확인하는 주기
+
+def batch_job(req, scenario_id, progress):
+    """배치 계획 작업 - 계획별 결과는 진행 중에 부분 결과로 기록하므로 최종 결과에서는 뺀다"""
+    data = planning_data(scenario_id)
+    if data is None:
+        return unknown_scenario_error(scenario_id)
+    try:
+        plan = make_planner(data)
+    except BomCycleError as e:
+        return {"status": "error", "message": str(e)}
+    result = plan_batch(plan, req.requests, data.inventory(), data.raw_materials(), progress)
+    del result["results"]
+    return result
+
+def endpoint_job(endpoint, with_scenario=True):
+    """진행률을 나눠 기록하지 않는 계획 API를 작업 함수로 (끝나면 100%)"""
+    def run(req, scenario_id, progress):
+        progress.start(1)
+        args = (req, scenario_id) if with_scenario else (req,)
+        result = endpoint.__wrapped__(*args)
+        progress.advance(1)
+        return result
+    return run
+
+# 작업 종류 → (요청 모델, 작업 함수(req, scenario_id, progress))
+JOB_KINDS = {
+    "batch": (BatchProductionRequest, batch_job),
+    "sweep": (SweepRequest, sweep),
+    "simulate": (SimulationRequest, endpoint_job(simulate_plan)),
+    "schedule": (ScheduleRequest, endpoint_job(calculate_schedule)),
+    "capacity": (CapacityRequest, endpoint_job(calculate_capacity)),
+    "procurement": (ProcurementRequest, endpoint_job(calculate_procurement)),
+    "compare": (ScenarioCompareRequest, endpoint_job(compare_scenarios, with_scenario=False)),
+}
+
+def run_planning_job(progress, site_id, kind, req, scenario_id):
+    """작업 프로세스에서 실행 (jobs.execute가 호출) - 반환값이 result.json이 된다
+
+    계획 API가 오류 응답({"status": "error", ...})을 돌려주면 작업을 failed로 기록한다.
+    """
+    with use_site(site_id):
+        result = JOB_KINDS[kind][1](req, scenario_id, progress)
+    if isinstance(result, Response):
+        result = json.loads(result.body)
+    if result.get("status") == "error":
+        raise jobs.JobFailed(result.get("message", "계산 실패"))
+    return result
+
+job_queue = jobs.JobQueue(
+    JOB_WORKERS, JOB_MAX_PENDING, mp_context=multiprocessing.get_context("spawn"), initializer=init_site_worker
+)
+
+def unknown_job_error(job_id):
+    return {"status": "error", "message": f"존재하지 않는 작업입니다: {job_id}"}
+
+def start_job(site, kind, req, scenario_id):
+    store = site.jobs
+    job = store.create(kind, {"site_id": site.id, "scenario_id": scenario_id})
+    if not job_queue.submit(store, job["id"], run_planning_job, site.id, kind, req, scenario_id):
+        store.delete(job["id"])
+        return {"status": "error", "message": f"대기 중인 작업이 너무 많습니다 (최대 {JOB_MAX_PENDING}개)"}
+    return {"status": "success", "job": job}
+
+@app.post("/jobs/{kind}")
+async def submit_job(kind: str, request: Request, scenario_id: Optional[str] = None):
+    """계획 API를 백그라운드 작업으로 실행 - 본문은 그 API와 같고, 작업 ID를 바로 반환"""
+    if kind not in JOB_KINDS:
+        return {"status": "error", "message": f"지원하지 않는 작업 종류입니다: {kind} (가능: {', '.join(JOB_KINDS)})"}
+    try:
+        req = JOB_KINDS[kind][0].model_validate(await request.json())
+    except ValueError as e:  # JSON 형식 오류, pydantic.ValidationError
+        return {"status": "error", "message": f"요청 본문 오류: {e}"}
+    if planning_data(scenario_id) is None:
+        return unknown_scenario_error(scenario_id)
+    # 처음 제출할 때 작업 프로세스를 띄우므로 스레드에서
+    return await asyncio.to_thread(start_job, current_site(), kind, req, scenario_id)
+
+@app.get("/jobs")
+def api_get_jobs(limit: int = 100):
+    """최근 작업 상태 목록"""
+    return {"jobs": current_site().jobs.list(limit), **job_queue.stats()}
+
+@app.get("/jobs/{job_id}")
+def api_get_job(job_id: str):
+    """작업 상태 (state, done/total, progress 0~1, error)"""
+    job = current_site().jobs.status(job_id)
+    if job is None:
+        return unknown_job_error(job_id)
+    return {"status": "success", "job": job}
+
+@app.get("/jobs/{job_id}/results")
+def api_get_job_results(job_id: str, offset: int = 0, limit: int = 100):
+    """지금까지 계산된 부분 결과 (배치 계획 작업은 계획 1건당 1개) - 실행 중에도 조회 가능"""
+    store = current_site().jobs
+    job = store.status(job_id)
+    if job is None:
+        return unknown_job_error(job_id)
+    results = store.read_results(job_id, max(offset, 0), max(limit, 0))
+    return {"status": "success", "job": job, "offset": offset, "results": results}
+
+@app.get("/jobs/{job_id}/result")
+def api_get_job_result(job_id: str):
+    """최종 결과 (해당 계획 API의 응답과 같음, 배치 계획은 results 제외)"""
+    store = current_site().jobs
+    job = store.status(job_id)
+    if job is None:
+        return unknown_job_error(job_id)
+    body = store.result_bytes(job_id) if job["state"] == "succeeded" else None
+    if body is None:
+        return {"status": "error", "message": f"작업이 완료되지 않았습니다 ({job['state']})", "job": job}
+    return Response(body, media_type="application/json")
+
+@app.get("/jobs/{job_id}/stream")
+async def api_stream_job(job_id: str):
+    """작업이 끝날 때까지 진행률·부분 결과를 NDJSON으로 스트리밍
+
+    줄마다 {"event": "progress", "job": 상태} 또는 {"event": "result", "index": i, "result": 부분 결과},
+    마지막 줄은 {"event": "end", "job": 최종 상태}.
+    """
+    store = current_site().jobs
+    job = store.status(job_id)
+    if job is None:
+        return unknown_job_error(job_id)
+
+    def line(content):
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    async def events():
+        sent_results = 0
+        last = None
+        while True:
+            job = await asyncio.to_thread(store.status, job_id)
+            results = await asyncio.to_thread(store.read_results, job_id, sent_results)
+            for result in results:
+                yield line({"event": "result", "index": sent_results, "result": result})
+                sent_results += 1
+            if job["state"] in jobs.FINAL_STATES:
+                yield line({"event": "end", "job": job})
+                return
+            if job != last:
+                yield line({"event": "progress", "job": job})
+                last = job
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """작업 취소 - 대기 중이면 바로, 실행 중이면 다음 진행률 기록 때 멈춤"""
+    store = current_site().jobs
+    job = store.status(job_id)
+    if job is None:
+        return unknown_job_error(job_id)
+    if job["state"] in jobs.FINAL_STATES:
+        return {"status": "error", "message": f"이미 끝난 작업입니다 ({job['state']})", "job": job}
+    job_queue.cancel(store, job_id)
+    return {"status": "success", "job": store.status(job_id)}
+
 # 6️⃣ 설정 API
+# 읽기 핸들러는 스냅샷 재로드·CSV 파싱·파생 데이터 재계산을 할 수 있으므로 일반 def로 두어 스레드 풀에서 실행
 @app.get("/settings/products")
 def api_get_products():
     return get_products()
@@ -165,6 +1538,26 @@ def api_get_products():
 def api_get_bom():
     return get_bom()
 
+@app.get("/settings/bom/exploded")
+def api_get_exploded_bom():
+    """중간재를 원재료까지 전개한 BOM"""
+    try:
+        return get_exploded_bom()
+    except BomCycleError as e:
+        return {"status": "error", "message": str(e), "cycle": e.cycle}
+
+@app.get("/settings/bom/where-used")
+def api_get_where_used(material_name: str):
+    """구성품(원재료·중간재)을 쓰는 제품 (where-used)
+
+    direct: bom.csv에 직접 등록된 제품과 수량, products: 중간재를 거쳐 쓰는 제품까지 포함한 1개당 소요량
+    """
+    try:
+        direct, products = get_cost_table().used_by(material_name)
+    except BomCycleError as e:
+        return {"status": "error", "message": str(e)}
+    return {"material_name": material_name, "direct": direct, "products": products}
+
 @app.get("/settings/raw-materials")
 def api_get_raw_materials():
     return get_raw_materials()
@@ -173,68 +1566,453 @@ def api_get_raw_materials():
 def api_get_inventory():
     return get_inventory()
 
+def parse_moment(value):
+    """날짜(YYYY-MM-DD) 또는 시각(ISO) 문자열 - 형식이 틀리면 None"""
+    try:
+        return date.fromisoformat(value) if len(value) == 10 else datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+@app.get("/settings/inventory/at")
+def api_get_inventory_at(as_of: str):
+    """시점 재고 (날짜만 주면 그날 마감 시점) - 가장 가까운 스냅샷 + 원장 재생"""
+    moment = parse_moment(as_of)
+    if moment is None:
+        return {"status": "error", "message": "as_of는 YYYY-MM-DD 또는 ISO 시각이어야 합니다"}
+    inventory = current_site().storage.ledger.stock_at(moment)
+    if inventory is None:
+        return {"status": "error", "message": f"{as_of}은(는) 재고 원장 시작 이전입니다"}
+    return inventory
+
+@app.get("/settings/inventory/ledger")
+def api_get_inventory_ledger(material_name: Optional[str] = None, limit: int = 100,
+                             before_seq: Optional[int] = None):
+    """재고 원장 최근 항목 (최신순, before_seq로 이전 페이지)"""
+    limit = max(1, min(limit, 1000))
+    return {"entries": current_site().storage.ledger.entries(material_name, limit, before_seq)}
+
+MAX_PAGE_SIZE = 500
+SEARCH_PARAMS = {"q", "mode", "sort", "order", "offset", "limit"}  # 필터가 아닌 검색 쿼리 인자
+
+def convert_value(type_, name, value):
+    try:
+        return type_(value)
+    except ValueError:
+        raise ValueError(f"{name} 값이 올바르지 않습니다: {value}") from None
+
+def search_filters(spec, query_params):
+    """필드 이름 인자 → 값 일치, min_<필드>/max_<필드> → 숫자 범위 (잘못된 인자면 ValueError)"""
+    equals, ranges = {}, {}
+    for name, value in query_params.items():
+        if name in SEARCH_PARAMS:
+            continue
+        bound, _, field = name.partition("_")
+        if name in spec["fields"]:
+            equals[name] = convert_value(spec["types"].get(name, str), name, value)
+        elif bound in ("min", "max") and field in spec["types"]:
+            low, high = ranges.get(field, (None, None))
+            number = convert_value(spec["types"][field], name, value)
+            ranges[field] = (number, high) if bound == "min" else (low, number)
+        else:
+            raise ValueError(f"알 수 없는 검색 조건입니다: {name}")
+    return equals, ranges
+
+@app.get("/settings/{table}/search")
+def api_search_table(table: str, request: Request, q: str = "", mode: str = "prefix", sort: Optional[str] = None,
+                     order: str = "asc", offset: int = 0, limit: int = 50):
+    """마스터 데이터 페이지 조회 / 이름 검색 (한글은 입력 중인 글자·초성으로도 검색)
+
+    q가 있으면 관련도 순(sort로 바꿀 수 있음), 없으면 sort(기본 이름) 순. order: asc | desc
+    필드 이름 인자는 값 일치 필터, min_<필드>/max_<필드>는 숫자 범위 필터
+    (예: /settings/bom/search?product_name=클래식 팥빙수, /settings/inventory/search?max_quantity=1000)
+    """
+    if table not in TABLE_PATHS:
+        return {"status": "error", "message": f"지원하지 않는 테이블: {table}"}
+    spec = TABLES[TABLE_PATHS[table]]
+    if mode not in catalog.MODES:
+        return {"status": "error", "message": f"mode는 {', '.join(catalog.MODES)} 중 하나여야 합니다"}
+    if sort is not None and sort not in spec["fields"]:
+        return {"status": "error", "message": f"정렬할 수 없는 필드입니다: {sort}"}
+    if order not in ("asc", "desc"):
+        return {"status": "error", "message": "order는 asc 또는 desc여야 합니다"}
+    try:
+        equals, ranges = search_filters(spec, request.query_params)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    offset = max(offset, 0)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    total, items = get_catalog(TABLE_PATHS[table]).query(
+        q.strip() or None, mode, sort, order == "desc", equals, ranges, offset, limit
+    )
+    return {"status": "success", "total": total, "offset": offset, "limit": limit, "items": items}
+
+GZIP_MIN_SIZE = 1024  # 바이트 - 이보다 작은 응답은 압축하지 않음
+
+def build_snapshot(products, bom, raw_materials, inventory):
+    """전체 마스터 데이터 응답 본문, ETag, gzip 본문 (작으면 None)"""
+    body = json.dumps(
+        {"products": products, "bom": bom, "raw_materials": raw_materials, "inventory": inventory},
+        ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+    # gzip 본문과 같은 ETag를 쓰므로 약한 ETag
+    etag = 'W/"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    compressed = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None
+    return body, etag, compressed
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match 헤더와 ETag 약한 비교"""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in [t.removeprefix("W/") for t in tags]
+
+def accepts_gzip(accept_encoding):
+    """Accept-Encoding 헤더가 gzip을 허용하는지 (q 값 반영 - gzip이 없으면 *의 q, 둘 다 없으면 불가)"""
+    qualities = {}
+    for token in (accept_encoding or "").split(","):
+        coding, *params = [part.strip() for part in token.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+@app.get("/settings/snapshot")
+def api_get_snapshot(request: Request):
+    """전체 마스터 데이터를 한 번에 반환 (ETag / If-None-Match → 304, gzip 지원)
+
+    직렬화와 압축 결과는 데이터가 바뀔 때까지 재사용한다.
+    """
+    body, etag, compressed = current_site().snapshots.get(get_products(), get_bom(), get_raw_materials(), get_inventory())
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if compressed is not None and accepts_gzip(request.headers.get("accept-encoding")):
+        headers["Content-Encoding"] = "gzip"
+        return Response(compressed, media_type="application/json", headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.get("/settings/version")
+def api_get_data_version():
+    """마스터 데이터 버전 (클라이언트 캐시 키)"""
+    return data_versions()
+
+@app.get("/settings/cache-stats")
+def api_get_cache_stats():
+    """현재 사이트의 마스터 데이터 캐시 + 계획 결과 캐시 + 원가 테이블 통계, 사이트 LRU 통계"""
+    site = current_site()
+    stats = site.master_cache.stats()
+    stats["plan_cache"] = site.plan_cache.stats()
+    stats["cost_table"] = site.cost_table.stats()
+    stats["sites"] = site_registry.stats()
+    stats["jobs"] = job_queue.stats()
+    return stats
+
 # 7️⃣ 데이터 추가/수정 API
+class StorageWriter:
+    """저장소 쓰기를 전용 스레드 하나에서 들어온 순서대로 실행 (사이트마다 하나)
+
+    async 핸들러는 await current_site().writer.run(fn, ...)으로 쓰기를 맡기므로 이벤트 루프를 막지 않는다.
+    쓰기가 한 줄로 처리되어 "확인 후 쓰기"(중복 확인, BOM 순환 검사)도 다른 쓰기와 섞이지 않는다.
+    쓰기 함수는 끝나기 전에 master_cache.reload로 스냅샷을 교체해, 응답 직후의 읽기에 반영되게 한다.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage-writer")
+
+    async def run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        # 쓰기 함수도 요청과 같은 사이트(current_site)를 보도록 컨텍스트를 넘김
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, functools.partial(context.run, fn, *args))
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+def write_row(table, row):
+    """저장소에 한 행 upsert 후 스냅샷 교체"""
+    site = current_site()
+    site.storage.upsert(table, row)
+    site.master_cache.reload(table)
+
+def insert_inventory(material_name, quantity):
+    """재고 행 추가 (이미 있으면 False)"""
+    site = current_site()
+    inserted = site.storage.insert("inventory", {'material_name': material_name, 'quantity': quantity})
+    if inserted:
+        site.master_cache.reload("inventory")
+    return inserted
+
+def delete_row(table, key):
+    site = current_site()
+    site.storage.delete(table, key)
+    site.master_cache.reload(table)
+
+def record_inventory(record, *args):
+    """재고 원장 기록 (storage.ledger.receive / adjust) 후 스냅샷 교체"""
+    result = record(*args)
+    current_site().master_cache.reload("inventory")
+    return result
+
+def add_bom_row(product_name, material_name, quantity):
+    """순환 참조 검사 후 BOM 행 저장 - 순환이 생기면 BomCycleError"""
+    candidate = {product: dict(components) for product, components in get_bom().items()}
+    candidate.setdefault(product_name, {})[material_name] = quantity
+    bom_topological_order(candidate)
+    write_row("bom", {'product_name': product_name, 'material_name': material_name, 'quantity': quantity})
+
 @app.post("/settings/raw-materials/add")
-def add_raw_material(material_name: str, unit: str, price: int):
+async def add_raw_material(material_name: str, unit: str, price: int):
     """원재료 추가"""
-    rows = read_csv(MATERIALS_CSV)
-    # 기존 데이터 확인
-    existing = [r for r in rows if r['material_name'] != material_name]
-    existing.append({'material_name': material_name, 'unit': unit, 'price': str(price)})
-    write_csv(MATERIALS_CSV, ['material_name', 'unit', 'price'], existing)
+    await current_site().writer.run(write_row, "raw_materials", {'material_name': material_name, 'unit': unit, 'price': price})
     return {"status": "success", "message": f"{material_name} 추가됨"}
 
 @app.post("/settings/products/add")
-def add_product(product_name: str, price: int):
+async def add_product(product_name: str, price: int):
     """제품 추가 + 자동으로 BOM에 등록"""
     # 1. 제품 추가
-    rows = read_csv(PRODUCTS_CSV)
-    existing = [r for r in rows if r['product_name'] != product_name]
-    existing.append({'product_name': product_name, 'price': str(price)})
-    write_csv(PRODUCTS_CSV, ['product_name', 'price'], existing)
-    
-    # 2. BOM에 자동으로 추가 (초기값: 빈 상태)
-    bom_rows = read_csv(BOM_CSV)
-    # 해당 제품이 BOM에 없으면 추가
-    if not any(r['product_name'] == product_name for r in bom_rows):
-        # 새 제품을 위한 초기 BOM 엔트리 추가 (선택사항: 첫번째 원재료와 기본값 추가)
-        pass  # BOM은 사용자가 수동으로 추가하도록 함
+    await current_site().writer.run(write_row, "products", {'product_name': product_name, 'price': price})
     
+    # 2. BOM은 사용자가 수동으로 추가하도록 함 (초기값: 빈 상태)
     return {"status": "success", "message": f"{product_name} 추가됨 - BOM관리에서 구성도를 설정하세요"}
 
 @app.post("/settings/inventory/update")
-def update_inventory(material_name: str, quantity: int):
-    """재고 수정"""
-    rows = read_csv(INVENTORY_CSV)
-    existing = [r for r in rows if r['material_name'] != material_name]
-    existing.append({'material_name': material_name, 'quantity': str(quantity)})
-    write_csv(INVENTORY_CSV, ['material_name', 'quantity'], existing)
+async def update_inventory(material_name: str, quantity: int):
+    """재고 수정 (현재 수량과의 차이를 조정 항목으로 원장에 기록)"""
+    await current_site().writer.run(write_row, "inventory", {'material_name': material_name, 'quantity': quantity})
     return {"status": "success", "message": f"{material_name} 재고 업데이트"}
 
 @app.post("/settings/inventory/add")
-def add_inventory(material_name: str, quantity: int):
+async def add_inventory(material_name: str, quantity: int):
     """재고 추가"""
-    rows = read_csv(INVENTORY_CSV)
     # 이미 존재하면 추가하지 않음
-    if any(r['material_name'] == material_name for r in rows):
+    if not await current_site().writer.run(insert_inventory, material_name, quantity):
         return {"status": "error", "message": "이미 존재하는 재고입니다"}
-    rows.append({'material_name': material_name, 'quantity': str(quantity)})
-    write_csv(INVENTORY_CSV, ['material_name', 'quantity'], rows)
     return {"status": "success", "message": f"{material_name} 추가됨"}
 
 @app.post("/settings/inventory/delete")
-def delete_inventory(material_name: str):
+async def delete_inventory(material_name: str):
     """재고 삭제"""
-    rows = read_csv(INVENTORY_CSV)
-    existing = [r for r in rows if r['material_name'] != material_name]
-    write_csv(INVENTORY_CSV, ['material_name', 'quantity'], existing)
+    await current_site().writer.run(delete_row, "inventory", {'material_name': material_name})
     return {"status": "success", "message": f"{material_name} 삭제됨"}
 
+@app.post("/settings/inventory/receive")
+async def receive_inventory(material_name: str, quantity: int, reference: str = ""):
+    """원재료 입고"""
+    if quantity <= 0:
+        return {"status": "error", "message": "입고 수량은 0보다 커야 합니다"}
+    site = current_site()
+    await site.writer.run(record_inventory, site.storage.ledger.receive, material_name, quantity, reference)
+    return {"status": "success", "message": f"{material_name} {quantity} 입고"}
+
+@app.post("/settings/inventory/adjust")
+async def adjust_inventory(material_name: str, delta: int, reference: str = ""):
+    """재고 증감 조정 (실사 차이, 폐기 등)"""
+    site = current_site()
+    if not await site.writer.run(record_inventory, site.storage.ledger.adjust, material_name, delta, reference):
+        return {"status": "error", "message": "등록되지 않은 재고입니다"}
+    return {"status": "success", "message": f"{material_name} 재고 {delta:+d} 조정"}
+
 @app.post("/settings/bom/add")
-def add_bom(product_name: str, material_name: str, quantity: float):
-    """BOM 추가"""
-    rows = read_csv(BOM_CSV)
-    existing = [r for r in rows if not (r['product_name'] == product_name and r['material_name'] == material_name)]
-    existing.append({'product_name': product_name, 'material_name': material_name, 'quantity': str(quantity)})
-    write_csv(BOM_CSV, ['product_name', 'material_name', 'quantity'], existing)
+async def add_bom(product_name: str, material_name: str, quantity: float):
+    """BOM 추가 (구성품으로 다른 제품(중간재)도 지정 가능)"""
+    # 순환 참조가 생기는 구성은 저장하지 않는다
+    try:
+        await current_site().writer.run(add_bom_row, product_name, material_name, quantity)
+    except BomCycleError as e:
+        return {"status": "error", "message": str(e)}
     return {"status": "success", "message": f"BOM 추가됨"}
+
+# 8️⃣ 대량 업로드 API
+# URL 경로의 테이블 이름 → 저장소 테이블
+TABLE_PATHS = {
+    "products": "products",
+    "raw-materials": "raw_materials",
+    "bom": "bom",
+    "inventory": "inventory",
+}
+
+async def read_lines(request):
+    """요청 본문을 스트리밍으로 받아 줄 단위로 분리 (UTF-8, BOM 허용)"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    lines = []
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        parts = pending.split("\n")
+        pending = parts.pop()
+        lines.extend(part + "\n" for part in parts)
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        lines.append(pending)
+    return lines
+
+def apply_bulk(table, lines, fmt, strict, dry_run):
+    """파싱 → 검증 → 한 번에 upsert"""
+    records = bulk.parse_records(lines, fmt)
+    known_materials = set(get_raw_materials())
+    if table == "bom":
+        # 다른 제품(이번 업로드에서 추가되는 제품 포함)도 중간재로 쓸 수 있다
+        known_materials |= set(get_bom()) | set(get_products())
+        known_materials |= {r.get("product_name") for _, r in records if isinstance(r, dict)}
+    valid, errors = bulk.validate_records(table, records, known_materials)
+
+    # BOM은 합친 결과에 순환 참조가 없어야 한다
+    if table == "bom" and valid:
+        candidate = {product: dict(components) for product, components in get_bom().items()}
+        for row in valid:
+            candidate.setdefault(row["product_name"], {})[row["material_name"]] = row["quantity"]
+        try:
+            bom_topological_order(candidate)
+        except BomCycleError as e:
+            return {"status": "error", "message": str(e), "received": len(records), "applied": 0,
+                    "error_count": len(errors), "errors": errors[:bulk.MAX_REPORTED_ERRORS]}
+
+    apply = valid and not dry_run and not (strict and errors)
+    if apply:
+        site = current_site()
+        site.storage.bulk_upsert(table, valid)
+        site.master_cache.reload(table)
+
+    if errors and strict:
+        status, message = "error", "오류 행이 있어 반영하지 않았습니다"
+    elif dry_run:
+        status, message = "success", "검증만 수행했습니다 (dry_run)"
+    else:
+        status, message = "success", f"{len(valid) if apply else 0}행 반영됨"
+    return {
+        "status": status,
+        "message": message,
+        "received": len(records),
+        "applied": len(valid) if apply else 0,
+        "error_count": len(errors),
+        "errors": errors[:bulk.MAX_REPORTED_ERRORS],
+    }
+
+@app.post("/settings/{table}/bulk")
+async def api_bulk_upsert(table: str, request: Request, format: Optional[str] = None,
+                          strict: bool = False, dry_run: bool = False):
+    """CSV / JSON Lines 대량 upsert (행별 검증, 통과한 행은 한 번에 저장)
+
+    format: csv | jsonl (없으면 Content-Type으로 판단, 기본 csv)
+    strict: 오류 행이 하나라도 있으면 전체를 반영하지 않음
+    dry_run: 검증 결과만 반환
+    """
+    if table not in TABLE_PATHS:
+        return {"status": "error", "message": f"지원하지 않는 테이블: {table}"}
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "jsonl" if ("json" in content_type or "ndjson" in content_type) else "csv"
+    if format not in ("csv", "jsonl"):
+        return {"status": "error", "message": f"지원하지 않는 형식: {format}"}
+
+    try:
+        lines = await read_lines(request)
+    except UnicodeDecodeError:
+        return {"status": "error", "message": "UTF-8 인코딩이 아닙니다"}
+    # 검증·쓰기는 다른 쓰기와 섞이지 않도록 쓰기 스레드에서 실행
+    return await current_site().writer.run(apply_bulk, TABLE_PATHS[table], lines, format, strict, dry_run)
+
+# 9️⃣ 스트리밍 내보내기 API
+def export_response(fmt, fields, types, rows, filename):
+    """행 생성기 → StreamingResponse (지원하지 않는 형식이면 오류 dict)"""
+    try:
+        chunks = export.stream(fmt, fields, types, rows)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    media_type, extension = export.FORMATS[fmt]
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'},
+    )
+
+@app.get("/export/{table}")
+def api_export_table(table: str, format: str = "csv"):
+    """마스터 데이터 내보내기 (csv | ndjson | parquet | arrow)
+
+    캐시를 거치지 않고 저장소에서 한 행씩 읽어 바로 내보낸다.
+    """
+    if table not in TABLE_PATHS:
+        return {"status": "error", "message": f"지원하지 않는 테이블: {table}"}
+    spec = TABLES[TABLE_PATHS[table]]
+    rows = current_site().storage.iter_rows(TABLE_PATHS[table])
+    return export_response(format, spec["fields"], spec["types"], rows, TABLE_PATHS[table])
+
+@app.post("/export/production-plan/batch")
+def api_export_plan_batch(batch: BatchProductionRequest, format: str = "csv", scenario_id: Optional[str] = None):
+    """배치 생산 계획을 원재료별 행으로 펼쳐 내보내기 (csv | ndjson | parquet | arrow)
+
+    계획은 응답을 보내면서 한 건씩 계산하므로 결과 전체를 메모리에 두지 않는다.
+    """
+    data = planning_data(scenario_id)
+    if data is None:
+        return unknown_scenario_error(scenario_id)
+    try:
+        plan = make_planner(data)
+    except BomCycleError as e:
+        return {"status": "error", "message": str(e)}
+
+    def rows():
+        for index, req in enumerate(batch.requests):
+            yield from export.plan_rows(index, req, plan(req))
+
+    return export_response(format, export.PLAN_FIELDS, export.PLAN_TYPES, rows(), "production_plan")
+
+# 🔟 운영 지표 API
+@app.get("/metrics")
+async def api_get_metrics():
+    """Prometheus 텍스트 형식 지표 (HTTP 지연 시간, 계획 단계별 시간, CSV 입출력, 캐시는 현재 사이트 기준)"""
+    site = current_site()
+    master = site.master_cache.stats()
+    plan = site.plan_cache.stats()
+    extra = [
+        ("patbingsu_master_cache_hits_total", "counter", "마스터 데이터 캐시 적중", master["hits"]),
+        ("patbingsu_master_cache_misses_total", "counter", "마스터 데이터 캐시 최초 로드", master["misses"]),
+        ("patbingsu_master_cache_reloads_total", "counter", "저장소 변경 감지로 다시 읽은 횟수", master["reloads"]),
+        ("patbingsu_master_cache_invalidations_total", "counter", "쓰기 후 스냅샷 교체 횟수", master["invalidations"]),
+        ("patbingsu_master_cache_entries", "gauge", "마스터 데이터 캐시 항목 수", master["entries"]),
+        ("patbingsu_plan_cache_hits_total", "counter", "계획 결과 캐시 적중", plan["hits"]),
+        ("patbingsu_plan_cache_misses_total", "counter", "계획 결과 캐시 미적중", plan["misses"]),
+        ("patbingsu_plan_cache_evictions_total", "counter", "계획 결과 캐시 LRU 제거", plan["evictions"]),
+        ("patbingsu_plan_cache_invalidations_total", "counter", "데이터 변경으로 비운 계획 결과", plan["invalidations"]),
+        ("patbingsu_plan_cache_size", "gauge", "계획 결과 캐시 항목 수", plan["size"]),
+        ("patbingsu_sites_loaded", "gauge", "메모리에 있는 사이트 수", site_registry.stats()["loaded"]),
+        ("patbingsu_site_evictions_total", "counter", "LRU로 내보낸 사이트", site_registry.evictions),
+    ]
+    return Response(metrics.render(extra), media_type=metrics.CONTENT_TYPE)
+
+# 1️⃣1️⃣ 사이트(매장) 관리 API
+default_site = Site(None, CSV_DIR, os.environ.get("SQLITE_PATH"), SCENARIO_DIR, JOB_DIR)
+site_registry = sites.SiteRegistry(Site, SITES_DIR, SITE_CACHE_SIZE)
+app.add_middleware(sites.SiteMiddleware, registry=site_registry)
+
+@app.get("/sites")
+def api_get_sites():
+    """등록된 사이트 (loaded: 지금 메모리에 있는지, pinned: 전용 워커 프로세스 사용)
+
+    모든 API는 /sites/<사이트 ID>/... 로 그 사이트 데이터에 대해 호출한다 (접두어가 없으면 기본 사이트).
+    """
+    return {
+        "sites": [dict(site, pinned=site["site_id"] in SITE_WORKERS) for site in site_registry.list()],
+        **site_registry.stats(),
+    }
+
+@app.post("/sites/add")
+def add_site(site_id: str):
+    """빈 사이트 추가 (데이터는 /sites/<사이트 ID>/settings/... 로 입력)"""
+    if not sites.ID_PATTERN.match(site_id):
+        return {"status": "error", "message": "사이트 ID는 영문·숫자·-·_ 64자 이내여야 합니다"}
+    if not site_registry.create(site_id):
+        return {"status": "error", "message": "이미 존재하는 사이트입니다"}
+    return {"status": "success", "message": f"{site_id} 추가됨"}
@@ -0,0 +1,165 @@
+"""운영 지표 - Prometheus 텍스트 형식 (외부 패키지 없이)
+
+- Counter / Histogram: 라벨 조합별 값을 보관 (스레드 안전)
+- MetricsMiddleware: 엔드포인트(라우트 경로)별 응답 시간 히스토그램
+- render(): GET /metrics 응답 본문 (text/plain; version=0.0.4)
+"""
+import bisect
+import threading
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                 0.01, 0.05, 0.1, 0.5, 1.0)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in (*zip(names, values), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[n]) for n in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._lines(key, value) for key, value in items)
+        return "\n".join(line for line in lines if line)
+
+
+class Counter(_Metric):
+    """단조 증가 값"""
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _lines(self, key, value):
+        return f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """구간별 누적 개수 + 합계 + 개수"""
+    kind = "histogram"
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+
+    def _observe(self, key, value):
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._observe(key, value)
+
+    def observe_many(self, values):
+        """라벨이 하나인 히스토그램에 여러 관측값을 잠금 한 번으로 기록 ({라벨 값: 관측값})"""
+        with self._lock:
+            for label_value, value in values.items():
+                self._observe((label_value,), value)
+
+    def _lines(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labels, key, [("le", _format_value(bound))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labels, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return "\n".join(lines)
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "patbingsu_http_request_duration_seconds", "HTTP 요청 처리 시간 (응답 본문 전송 완료까지)",
+    ("method", "route", "status"),
+)
+PLAN_STAGE_SECONDS = Histogram(
+    "patbingsu_plan_stage_duration_seconds", "생산 계획 계산 단계별 시간",
+    ("stage",), STAGE_BUCKETS,
+)
+CSV_READS = Counter("patbingsu_csv_reads_total", "CSV 파일 읽기 횟수", ("file",))
+CSV_READ_BYTES = Counter("patbingsu_csv_read_bytes_total", "CSV 파일 읽기 바이트", ("file",))
+CSV_WRITES = Counter("patbingsu_csv_writes_total", "CSV 파일 쓰기 횟수", ("file",))
+CSV_WRITE_BYTES = Counter("patbingsu_csv_write_bytes_total", "CSV 파일 쓰기 바이트", ("file",))
+
+
+def render(extra=()):
+    """등록된 지표 + extra [(이름, 타입, 설명, 값)] → Prometheus 텍스트"""
+    parts = [metric.render() for metric in _registry]
+    for name, kind, description, value in extra:
+        parts.append(f"# HELP {name} {description}\n# TYPE {name} {kind}\n{name} {_format_value(value)}")
+    return "\n".join(parts) + "\n"
+
+
+class MetricsMiddleware:
+    """라우트 경로별 HTTP 응답 시간 기록 (ASGI 미들웨어)
+
+    라벨은 실제 URL이 아니라 라우트 경로(/settings/{table}/bulk 등)를 쓰므로 라벨 수가 늘지 않는다.
+    스트리밍 응답은 마지막 본문 조각을 보낼 때까지를 잰다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status["code"],
+            )
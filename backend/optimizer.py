@@ -0,0 +1,165 @@
+"""최대 생산 가능 수량 / 제품 믹스 최적화
+
+- max_producible: 현재 재고로 제품별 최대 계획 수량을 한 번에 계산
+- optimize_mix: 재고를 나눠 쓸 때 판매가 합계가 최대인 제품 조합
+  scipy가 있으면 정수계획법(milp), 없으면 순수 python 탐욕 알고리즘으로 근사한다.
+"""
+import math
+
+try:
+    import numpy as np
+    from scipy.optimize import Bounds, LinearConstraint, milp
+except ImportError:  # scipy 미설치 시 탐욕 알고리즘 사용
+    milp = None
+
+
+def gross_for(plan_qty, total_yield, rounding):
+    """계획 수량 → 실제 생산 수량 (main.required_production과 같은 계산)"""
+    required_qty = plan_qty / total_yield
+    if rounding:
+        required_qty = math.ceil(required_qty)
+    return int(required_qty)
+
+
+def plan_qty_for(gross, total_yield, rounding):
+    """실제 생산 수량 gross 안에서 가능한 최대 계획 수량"""
+    plan_qty = int(gross * total_yield)
+    while gross_for(plan_qty + 1, total_yield, rounding) <= gross:
+        plan_qty += 1
+    while plan_qty > 0 and gross_for(plan_qty, total_yield, rounding) > gross:
+        plan_qty -= 1
+    return plan_qty
+
+
+def _gross_limit(per_unit, available):
+    """원재료 가용량으로 만들 수 있는 최대 생산 수량과 병목 원재료"""
+    best = None
+    bottleneck = None
+    for material, unit_qty in per_unit.items():
+        if unit_qty <= 0:
+            continue
+        can_make = int(available.get(material, 0) // unit_qty)
+        if best is None or can_make < best:
+            best = can_make
+            bottleneck = material
+    return best, bottleneck
+
+
+def max_producible(bom, inventory, products, total_yield, rounding):
+    """제품별(각자 재고 전부를 쓴다고 가정) 최대 계획 수량
+
+    원재료 소요량이 모두 0인 제품은 재고로 제한되지 않으므로 None
+    """
+    result = {}
+    for product in products:
+        gross, bottleneck = _gross_limit(bom[product], inventory)
+        if gross is None:
+            result[product] = {"max_plan_qty": None, "required_production": None, "bottleneck": None}
+            continue
+        plan_qty = plan_qty_for(gross, total_yield, rounding)
+        result[product] = {
+            "max_plan_qty": plan_qty,
+            "required_production": gross_for(plan_qty, total_yield, rounding),
+            "bottleneck": bottleneck,
+        }
+    return result
+
+
+MILP_TIME_LIMIT = 2.0  # 초 - 시간 안에 최적해를 못 찾으면 그때까지의 최선해 사용
+
+
+def _solve_milp(bom, inventory, products, prices, total_yield):
+    """정수계획: max Σ 가격·수율·생산수량  s.t. Σ 소요량·생산수량 ≤ 재고 (생산수량은 정수)"""
+    materials = sorted({m for p in products for m in bom[p]})
+    material_index = {m: i for i, m in enumerate(materials)}
+
+    usage = np.zeros((len(materials), len(products)))
+    for j, product in enumerate(products):
+        for material, unit_qty in bom[product].items():
+            usage[material_index[material], j] = unit_qty
+    capacity = np.array([inventory.get(m, 0) for m in materials], dtype=float)
+    objective = -np.array([prices[p] * total_yield for p in products], dtype=float)
+
+    res = milp(
+        objective,
+        constraints=[LinearConstraint(usage, -np.inf, capacity)],
+        integrality=np.ones(len(products)),
+        bounds=Bounds(0, np.inf),
+        options={"time_limit": MILP_TIME_LIMIT},
+    )
+    if res.x is None:
+        return None
+    # 정수 변수지만 부동소수 오차가 있을 수 있으므로 내림
+    return {p: int(math.floor(res.x[j] + 1e-6)) for j, p in enumerate(products)}
+
+
+GREEDY_PASSES = 8
+
+
+def _solve_greedy(bom, inventory, products, prices, total_yield):
+    """탐욕 근사: 남은 재고 대비 희소 원재료를 덜 쓰는 고가 제품부터 배정
+
+    한 번에 재고를 다 쓰지 않도록 GREEDY_PASSES번에 나눠 배정하고(마지막 회차는
+    남은 재고를 모두 채움), 회차마다 남은 재고 기준으로 우선순위를 다시 계산한다.
+    계산량은 O(회차 수 × BOM 크기)다.
+    """
+    remaining = dict(inventory)
+    gross = {p: 0 for p in products}
+    for pass_no in range(GREEDY_PASSES):
+        shares = GREEDY_PASSES - pass_no
+        scored = []
+        for product in products:
+            limit, _ = _gross_limit(bom[product], remaining)
+            if not limit:
+                continue
+            scarcity = sum(
+                unit_qty / remaining[m] for m, unit_qty in bom[product].items() if unit_qty > 0
+            )
+            scored.append((prices[product] * total_yield / scarcity, product))
+        if not scored:
+            break
+        scored.sort(key=lambda item: item[0], reverse=True)
+        for _, product in scored:
+            limit, _ = _gross_limit(bom[product], remaining)
+            step = limit // shares if shares > 1 else limit
+            if not step:
+                continue
+            gross[product] += step
+            for material, unit_qty in bom[product].items():
+                remaining[material] = remaining.get(material, 0) - unit_qty * step
+    return gross
+
+
+def optimize_mix(bom, inventory, products, prices, total_yield, rounding):
+    """판매가 합계가 최대인 제품 믹스 (계획 수량 기준)"""
+    candidates = [
+        p for p in products
+        if prices.get(p, 0) > 0 and any(q > 0 for q in bom[p].values())
+    ]
+    method = "milp" if milp is not None else "greedy"
+    gross = None
+    if candidates and milp is not None:
+        gross = _solve_milp(bom, inventory, candidates, prices, total_yield)
+    if gross is None:
+        method = "greedy"
+        gross = _solve_greedy(bom, inventory, candidates, prices, total_yield)
+
+    mix = {}
+    revenue = 0
+    materials_used = {}
+    for product, gross_qty in gross.items():
+        plan_qty = plan_qty_for(gross_qty, total_yield, rounding)
+        if plan_qty <= 0:
+            continue
+        required_qty = gross_for(plan_qty, total_yield, rounding)
+        mix[product] = {"plan_qty": plan_qty, "required_production": required_qty}
+        revenue += prices[product] * plan_qty
+        for material, unit_qty in bom[product].items():
+            materials_used[material] = materials_used.get(material, 0) + unit_qty * required_qty
+
+    return {
+        "method": method,
+        "mix": mix,
+        "revenue": revenue,
+        "materials_used": materials_used,
+    }
@@ -0,0 +1,141 @@
+"""원재료 발주 계획 (MRP 순소요량 계산)
+
+여러 생산 계획의 원재료 소요량을 필요일(착수일)별로 모으고, 현재 재고와 입고 예정량으로
+차감(netting)한 부족분을 리드타임·최소 발주량(MOQ)을 반영한 발주 제안으로 만든다.
+
+- 주문 × 원재료 전개: 전개된 BOM의 CSR 행렬(engine.compile_bom)에서 인덱스 배열로 한 번에 계산
+- 필요일 × 원재료 총소요량 행렬: np.bincount 한 번으로 집계
+- 순소요량: 원재료 축 전체를 벡터로 두고 필요일 순서로 누적 (날짜 수만큼만 반복)
+"""
+from datetime import date
+
+import numpy as np
+
+import engine
+
+# 부동소수 소요량을 정수 발주량으로 올릴 때 무시하는 오차
+EPSILON = 1e-9
+
+
+def demand_matrix(compiled, order_rows, order_qty, order_days, n_days):
+    """주문별 (제품 행, 실제 생산 수량, 필요일 인덱스) 배열 → (필요일 × 원재료) 총소요량 행렬"""
+    starts = compiled.indptr[order_rows]
+    counts = compiled.indptr[order_rows + 1] - starts
+    # 주문마다 CSR 행 구간 [start, start + count)를 이어 붙인 위치
+    positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    cols = compiled.indices[positions]
+    weights = compiled.data[positions] * np.repeat(order_qty, counts)
+    n_materials = len(compiled.materials)
+    cells = np.repeat(order_days, counts) * n_materials + cols
+    return np.bincount(cells, weights=weights, minlength=n_days * n_materials).reshape(n_days, n_materials)
+
+
+def net_requirements(gross, on_hand, scheduled, min_order_qty):
+    """필요일별 입고 필요량 (필요일 × 원재료)
+
+    필요일마다 예상 재고(재고 + 입고 예정 - 누적 소요량)가 음수가 되면 부족분만큼 입고받도록
+    하고(lot-for-lot), 최소 발주량보다 적으면 최소 발주량으로 올려 남는 양은 이후 필요일에 쓴다.
+    반환: (발주 수량 행렬, 원재료별 최종 예상 재고)
+    """
+    balance = on_hand.astype(float)
+    planned = np.zeros(gross.shape, dtype=np.int64)
+    for day in range(gross.shape[0]):
+        balance += scheduled[day] - gross[day]
+        shortage = np.ceil(np.maximum(-balance - EPSILON, 0)).astype(np.int64)
+        planned[day] = np.where(shortage > 0, np.maximum(shortage, min_order_qty), 0)
+        balance += planned[day]
+    return planned, balance
+
+
+def plan_purchases(compiled, orders, inventory, receipts, units, lead_times, min_order_qty,
+                   default_lead_time=0, default_min_order_qty=0, order_date=None):
+    """발주 제안 계산
+
+    orders: [(제품, 실제 생산 수량, 필요일)] - 필요일에 원재료가 모두 있어야 함
+    receipts: [(원재료, 수량, 입고일)] - 이미 발주한 입고 예정 (입고일 당일부터 사용 가능)
+    units: {원재료: 단위}, lead_times / min_order_qty: {원재료: 일 / 수량} (없으면 기본값)
+    order_date: 발주 기준일 (없으면 오늘) - 발주일이 이보다 이르면 late (긴급 발주)
+    """
+    order_date = order_date or date.today()
+    materials = compiled.materials
+    material_index = compiled.material_index
+
+    known = [i for i, (product, _, _) in enumerate(orders) if product in compiled.product_index]
+    unknown = [i for i, (product, _, _) in enumerate(orders) if product not in compiled.product_index]
+    scheduled_receipts = [r for r in receipts if r[0] in material_index]
+
+    # 필요일 + 입고일을 하나의 날짜 축으로 (date.toordinal 기준 정렬)
+    order_ordinals = np.array([orders[i][2].toordinal() for i in known], dtype=np.int64)
+    receipt_ordinals = np.array([d.toordinal() for _, _, d in scheduled_receipts], dtype=np.int64)
+    days, day_index = np.unique(np.concatenate([order_ordinals, receipt_ordinals]), return_inverse=True)
+    n_days = len(days)
+
+    order_rows = np.array([compiled.product_index[orders[i][0]] for i in known], dtype=np.int64)
+    order_qty = np.array([orders[i][1] for i in known], dtype=float)
+    gross = demand_matrix(compiled, order_rows, order_qty, day_index[:len(known)], n_days)
+
+    scheduled = np.zeros(gross.shape)
+    if scheduled_receipts:
+        np.add.at(
+            scheduled,
+            (day_index[len(known):], [material_index[m] for m, _, _ in scheduled_receipts]),
+            [qty for _, qty, _ in scheduled_receipts],
+        )
+
+    on_hand = engine.inventory_vector(compiled, inventory)
+    moq = np.array([min_order_qty.get(m, default_min_order_qty) for m in materials], dtype=np.int64)
+    lead = np.array([lead_times.get(m, default_lead_time) for m in materials], dtype=np.int64)
+    planned, ending = net_requirements(gross, on_hand, scheduled, moq)
+
+    # 발주 제안은 0이 아닌 칸만 배열로 뽑아 (발주일, 필요일, 원재료 이름) 순으로 정렬한 뒤 dict로 변환
+    day_idx, cols = np.nonzero(planned)
+    quantity = planned[day_idx, cols]
+    need = days[day_idx]
+    place_by = need - lead[cols]
+    name_rank = np.argsort(np.argsort(np.array(materials, dtype=object)))
+    order = np.lexsort((name_rank[cols], need, place_by))
+    cols, quantity, need, place_by = (v[order] for v in (cols, quantity, need, place_by))
+    cost = quantity * compiled.prices[cols]
+    late = place_by < order_date.toordinal()
+
+    need_list, place_list = need.tolist(), place_by.tolist()
+    iso = {ordinal: date.fromordinal(ordinal).isoformat() for ordinal in {*need_list, *place_list}}
+    prices = compiled.prices.tolist()
+    lead_list = lead.tolist()
+    purchase_orders = [
+        {
+            "material_name": materials[col],
+            "unit": units.get(materials[col]),
+            "quantity": qty,
+            "need_date": iso[need_day],
+            "order_date": iso[place_day],
+            "lead_time_days": lead_list[col],
+            "unit_price": prices[col],
+            "cost": po_cost,
+            "late": po_late,
+        }
+        for col, qty, need_day, place_day, po_cost, po_late in zip(
+            cols.tolist(), quantity.tolist(), need_list, place_list, cost.tolist(), late.tolist()
+        )
+    ]
+
+    gross_total = gross.sum(axis=0)
+    scheduled_total = scheduled.sum(axis=0)
+    ordered_total = planned.sum(axis=0)
+    summary = {}
+    for col in np.flatnonzero(gross_total > 0).tolist():
+        summary[materials[col]] = {
+            "gross_requirement": float(gross_total[col]),
+            "on_hand": int(on_hand[col]),
+            "scheduled_receipts": float(scheduled_total[col]),
+            "order_qty": int(ordered_total[col]),
+            "projected_ending": float(ending[col]),
+        }
+
+    return {
+        "purchase_orders": purchase_orders,
+        "materials": summary,
+        "total_cost": int(cost.sum()),
+        "late_orders": int(late.sum()),
+        "unknown_orders": unknown,
+    }
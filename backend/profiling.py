@@ -0,0 +1,120 @@
+"""요청 단위 프로파일링 (PROFILING_ENABLED=1일 때만)
+
+요청에 X-Profile 헤더를 붙이면 그 요청의 엔드포인트 실행을 프로파일해 PROFILE_DIR에 저장하고,
+파일 경로를 X-Profile-File 응답 헤더로 알려 준다.
+
+- X-Profile: cprofile (기본값) → .prof (python -m pstats, snakeviz로 열기)
+- X-Profile: pyinstrument → .html (pyinstrument 설치 시, 없으면 cprofile)
+
+동기 엔드포인트는 스레드 풀에서 실행되므로, 엔드포인트 함수를 감싸 실제 실행 스레드에서
+프로파일러를 켠다. async 엔드포인트를 cProfile로 재면 같은 이벤트 루프의 다른 요청도 섞일 수 있다.
+"""
+import contextvars
+import cProfile
+import functools
+import inspect
+import itertools
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi.routing import APIRoute
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # pyinstrument 미설치 시 cProfile만 사용
+    Profiler = None
+
+ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", Path(tempfile.gettempdir()) / "patbingsu-profiles"))
+HEADER = "x-profile"
+
+_current = contextvars.ContextVar("profile_session", default=None)
+_sequence = itertools.count(1)
+
+
+class _Session:
+    """요청 하나의 프로파일 설정과 결과 파일 경로"""
+
+    def __init__(self, mode):
+        self.mode = "pyinstrument" if mode == "pyinstrument" and Profiler is not None else "cprofile"
+        self.path = None
+
+    def start(self):
+        if self.mode == "pyinstrument":
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def stop(self, profiler, name):
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequence)}-{name}"
+        if self.mode == "pyinstrument":
+            profiler.stop()
+            self.path = PROFILE_DIR / f"{stem}.html"
+            self.path.write_text(profiler.output_html(), encoding="utf-8")
+        else:
+            profiler.disable()
+            self.path = PROFILE_DIR / f"{stem}.prof"
+            profiler.dump_stats(self.path)
+
+
+def profiled(endpoint):
+    """프로파일 요청이 있을 때만 프로파일러를 켜고 실행하도록 엔드포인트를 감쌈"""
+    name = endpoint.__name__
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            session = _current.get()
+            if session is None:
+                return await endpoint(*args, **kwargs)
+            profiler = session.start()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                session.stop(profiler, name)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            session = _current.get()
+            if session is None:
+                return endpoint(*args, **kwargs)
+            profiler = session.start()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                session.stop(profiler, name)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """X-Profile 헤더가 있는 요청만 프로파일하는 라우트 (app.router.route_class로 지정)"""
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, profiled(endpoint) if ENABLED else endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        if not ENABLED:
+            return handler
+
+        async def route_handler(request):
+            mode = request.headers.get(HEADER)
+            if not mode:
+                return await handler(request)
+            session = _Session(mode.lower())
+            token = _current.set(session)
+            try:
+                response = await handler(request)
+            finally:
+                _current.reset(token)
+            if session.path is not None:
+                response.headers["X-Profile-File"] = str(session.path)
+            return response
+
+        return route_handler
@@ -0,0 +1,245 @@
+"""what-if 시나리오 - 기본 마스터 데이터 위에 바뀐 부분만 덮어쓰는 오버레이
+
+시나리오는 변경분(행 upsert/삭제, 재고 증감, 단가 배수)만 저장하므로 만드는 비용은 변경 수에
+비례한다. 계획 계산 때는 테이블마다 Overlay 뷰(기본 dict + 바뀐 항목, 복사 없음)를 만들고,
+시나리오가 건드리지 않은 테이블은 기본 데이터 객체를 그대로 쓴다.
+증감·배수는 기본 데이터 기준이라 실제 재고나 단가가 바뀌면 시나리오 결과도 따라 바뀐다.
+
+시나리오 파일: DATA_DIR/scenarios/<id>.json (여러 워커가 공유, 파일이 바뀌면 다시 읽음)
+"""
+import json
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Mapping
+from datetime import datetime
+from pathlib import Path
+
+from storage import TABLES, file_signature
+
+ID_PATTERN = re.compile(r"^[0-9a-f]{12}$")
+
+
+class Overlay(Mapping):
+    """기본 dict 위에 바뀐 항목(changed)과 삭제된 키(removed)만 얹은 읽기 전용 뷰"""
+
+    def __init__(self, base, changed, removed=()):
+        self._base = base
+        self._changed = changed
+        self._removed = {key for key in removed if key not in changed}
+        added = sum(1 for key in changed if key not in base)
+        self._len = len(base) + added - sum(1 for key in self._removed if key in base)
+
+    def __getitem__(self, key):
+        if key in self._changed:
+            return self._changed[key]
+        if key in self._removed:
+            raise KeyError(key)
+        return self._base[key]
+
+    def __contains__(self, key):
+        return key in self._changed or (key not in self._removed and key in self._base)
+
+    def __iter__(self):
+        for key in self._base:
+            if key not in self._removed:
+                yield key
+        for key in self._changed:
+            if key not in self._base:
+                yield key
+
+    def __len__(self):
+        return self._len
+
+
+def _parsed_value(table, row):
+    """검증된 행 → main.parse_* 결과의 값 형식 (bom 제외)"""
+    if table == "products":
+        return {'price': row['price']}
+    if table == "raw_materials":
+        return {'unit': row['unit'], 'price': row['price']}
+    return row['quantity']
+
+
+class Scenario:
+    """이름 있는 변경분 묶음
+
+    upserts / deletes: {테이블: [행] / [기본키 dict]} (bulk.validate_records로 검증된 값)
+    inventory_deltas: {원재료: 재고 증감}, price_factors: {원재료: 단가 배수}
+    caches: 호출 측(main.PlanningData)이 이 시나리오 전용 파생 데이터 캐시를 두는 곳
+    """
+
+    def __init__(self, scenario_id, name, created_at, upserts, deletes, inventory_deltas, price_factors):
+        self.id = scenario_id
+        self.name = name
+        self.created_at = created_at
+        self.upserts = upserts
+        self.deletes = deletes
+        self.inventory_deltas = inventory_deltas
+        self.price_factors = price_factors
+        self.caches = {}
+        self._views = {}  # 테이블 -> (기본 객체, 뷰)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, name, upserts, deletes, inventory_deltas, price_factors):
+        """새 시나리오 (아직 저장하지 않음)"""
+        return cls(uuid.uuid4().hex[:12], name, datetime.now().isoformat(timespec="seconds"),
+                   upserts, deletes, inventory_deltas, price_factors)
+
+    def touches(self, table):
+        if table == "inventory" and self.inventory_deltas:
+            return True
+        if table == "raw_materials" and self.price_factors:
+            return True
+        return bool(self.upserts.get(table) or self.deletes.get(table))
+
+    def view(self, table, base):
+        """기본 데이터(main.get_* 결과)에 변경분을 얹은 뷰 - 기본 객체가 그대로면 같은 뷰 객체 반환"""
+        if not self.touches(table):
+            return base
+        with self._lock:
+            cached = self._views.get(table)
+            if cached is None or cached[0] is not base:
+                cached = self._views[table] = (base, self.apply(table, base))
+            return cached[1]
+
+    def apply(self, table, base):
+        """view와 같지만 캐시하지 않음 (시점 재고처럼 매번 새로 만드는 기본 데이터용)"""
+        if not self.touches(table):
+            return base
+        upserts = self.upserts.get(table, [])
+        deletes = self.deletes.get(table, [])
+        if table == "bom":
+            changed = {}
+            for row in upserts:
+                product = row['product_name']
+                if product not in changed:
+                    changed[product] = dict(base.get(product, {}))
+                changed[product][row['material_name']] = row['quantity']
+            for key in deletes:
+                product = key['product_name']
+                if product not in changed:
+                    changed[product] = dict(base.get(product, {}))
+                changed[product].pop(key['material_name'], None)
+            removed = [product for product, components in changed.items() if not components]
+            return Overlay(base, {p: c for p, c in changed.items() if c}, removed)
+
+        key_field = TABLES[table]["key"][0]
+        changed = {row[key_field]: _parsed_value(table, row) for row in upserts}
+        removed = [key[key_field] for key in deletes if key[key_field] not in changed]
+        current = Overlay(base, changed, removed)
+        if table == "inventory":
+            for name, delta in self.inventory_deltas.items():
+                changed[name] = current.get(name, 0) + delta
+        if table == "raw_materials":
+            for name, factor in self.price_factors.items():
+                if name in current:
+                    info = current[name]
+                    changed[name] = {'unit': info['unit'], 'price': round(info['price'] * factor)}
+        return Overlay(base, changed, removed)
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "created_at": self.created_at,
+            "upserts": {table: len(rows) for table, rows in self.upserts.items() if rows},
+            "deletes": {table: len(keys) for table, keys in self.deletes.items() if keys},
+            "inventory_deltas": self.inventory_deltas,
+            "price_factors": self.price_factors,
+        }
+
+    def to_json(self):
+        return {
+            "id": self.id, "name": self.name, "created_at": self.created_at,
+            "upserts": self.upserts, "deletes": self.deletes,
+            "inventory_deltas": self.inventory_deltas, "price_factors": self.price_factors,
+        }
+
+
+class ScenarioStore:
+    """시나리오 파일 저장소 - 최근 사용한 시나리오 maxsize개를 (파생 데이터 캐시와 함께) 메모리에 유지"""
+
+    def __init__(self, directory, maxsize=32):
+        self.directory = Path(directory)
+        self.maxsize = maxsize
+        self._loaded = OrderedDict()  # id -> (파일 시그니처, Scenario)
+        self._lock = threading.Lock()
+
+    def _path(self, scenario_id):
+        return self.directory / f"{scenario_id}.json"
+
+    def save(self, scenario):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(scenario.id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(scenario.to_json(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._loaded[scenario.id] = (file_signature(path), scenario)
+            self._evict()
+
+    def get(self, scenario_id):
+        """시나리오 (없으면 None)"""
+        if not ID_PATTERN.match(scenario_id or ""):
+            return None
+        path = self._path(scenario_id)
+        signature = file_signature(path)
+        with self._lock:
+            loaded = self._loaded.get(scenario_id)
+            if signature is None:
+                self._loaded.pop(scenario_id, None)
+                return None
+            if loaded is not None and loaded[0] == signature:
+                self._loaded.move_to_end(scenario_id)
+                return loaded[1]
+        scenario = self._read(path)
+        if scenario is None:
+            return None
+        with self._lock:
+            self._loaded[scenario_id] = (signature, scenario)
+            self._evict()
+        return scenario
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:  # 다른 워커가 방금 삭제
+            return None
+        return Scenario(
+            data["id"], data["name"], data["created_at"], data["upserts"], data["deletes"],
+            data["inventory_deltas"], data["price_factors"],
+        )
+
+    def _evict(self):
+        while len(self._loaded) > self.maxsize:
+            self._loaded.popitem(last=False)
+
+    def list(self):
+        """전체 시나리오 요약 (created_at 순) - 메모리에 없는 시나리오는 읽기만 하고 보관하지 않음"""
+        if not self.directory.exists():
+            return []
+        scenarios = []
+        for path in self.directory.glob("*.json"):
+            with self._lock:
+                loaded = self._loaded.get(path.stem)
+            scenarios.append(loaded[1] if loaded is not None else self._read(path))
+        return sorted((s.summary() for s in scenarios if s is not None), key=lambda s: s["created_at"])
+
+    def delete(self, scenario_id):
+        """시나리오 삭제 - 없으면 False"""
+        if self.get(scenario_id) is None:
+            return False
+        try:
+            os.remove(self._path(scenario_id))
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            self._loaded.pop(scenario_id, None)
+        return True
@@ -0,0 +1,167 @@
+"""용량 제약 다일(多日) 생산 스케줄러
+
+납기(due_date)가 빠른 주문부터 일별 라인 용량과 원재료 가용량 안에서 배정한다.
+
+- 준비된 주문은 (납기, 접수 순서) 우선순위 큐로 관리한다.
+- 원재료가 없어 한 개도 만들 수 없는 주문은 막힌 원재료별 대기열로 옮기고,
+  그 원재료가 입고되는 날에만 다시 큐에 넣는다. 매일 모든 주문을 다시 검사하지 않는다.
+- 용량 단위는 불량을 포함한 실제 생산 수량(required_production)이다.
+"""
+import heapq
+from datetime import timedelta
+
+
+class _Order:
+    __slots__ = ("index", "product", "due_date", "release_date", "gross_qty",
+                 "remaining", "per_unit", "completed_on")
+
+    def __init__(self, index, product, due_date, release_date, gross_qty, per_unit):
+        self.index = index
+        self.product = product
+        self.due_date = due_date
+        self.release_date = release_date
+        self.gross_qty = gross_qty
+        self.remaining = gross_qty
+        self.per_unit = per_unit
+        self.completed_on = None
+
+
+def _producible(order, available, limit):
+    """오늘 만들 수 있는 수량과, 0개일 때 막힌 원재료"""
+    qty = limit
+    blocking = None
+    for material, unit_qty in order.per_unit:
+        if unit_qty <= 0:
+            continue
+        can_make = int(available.get(material, 0) // unit_qty)
+        if can_make < qty:
+            qty = can_make
+            blocking = material
+            if qty == 0:
+                break
+    return qty, blocking
+
+
+def build_schedule(orders, bom, inventory, start_date, horizon_days, daily_capacity,
+                   capacity_overrides=None, receipts=None):
+    """일별 생산 스케줄 계산
+
+    orders: [(제품, 실제 생산 수량, 납기, 착수 가능일 또는 None)]
+    bom: 원재료까지 전개한 BOM (main.get_exploded_bom)
+    receipts: [(원재료, 수량, 입고일)] - 입고일 당일부터 사용 가능
+    """
+    capacity_overrides = capacity_overrides or {}
+    end_date = start_date + timedelta(days=horizon_days)
+
+    available = dict(inventory)
+    receipts_by_day = {}
+    for material, qty, receipt_date in receipts or []:
+        if receipt_date < start_date:
+            available[material] = available.get(material, 0) + qty
+        elif receipt_date < end_date:
+            receipts_by_day.setdefault(receipt_date, []).append((material, qty))
+
+    all_orders = []
+    unknown = []
+    releases = []  # (착수 가능일, 순서)
+    ready = []  # (납기, 순서)
+    for index, (product, gross_qty, due_date, release_date) in enumerate(orders):
+        if product not in bom:
+            unknown.append(index)
+            all_orders.append(None)
+            continue
+        order = _Order(index, product, due_date, release_date, gross_qty,
+                       list(bom[product].items()))
+        all_orders.append(order)
+        if order.remaining <= 0:
+            order.completed_on = start_date
+        elif release_date is not None and release_date > start_date:
+            releases.append((release_date, index))
+        else:
+            ready.append((due_date, index))
+    heapq.heapify(releases)
+    heapq.heapify(ready)
+
+    waiting = {}  # 원재료 -> 그 원재료 때문에 막힌 주문 순서 목록
+    days = []
+
+    for offset in range(horizon_days):
+        day = start_date + timedelta(days=offset)
+
+        # 입고 반영 + 해당 원재료를 기다리던 주문만 다시 큐에 넣기
+        for material, qty in receipts_by_day.get(day, ()):
+            available[material] = available.get(material, 0) + qty
+            for index in waiting.pop(material, ()):
+                heapq.heappush(ready, (all_orders[index].due_date, index))
+        while releases and releases[0][0] <= day:
+            _, index = heapq.heappop(releases)
+            heapq.heappush(ready, (all_orders[index].due_date, index))
+
+        capacity = capacity_overrides.get(day, daily_capacity)
+        capacity_left = capacity
+        production = []
+        materials_used = {}
+        carry_over = []
+
+        while ready and capacity_left > 0:
+            due_date, index = heapq.heappop(ready)
+            order = all_orders[index]
+            qty, blocking = _producible(order, available, min(order.remaining, capacity_left))
+            if qty == 0:
+                waiting.setdefault(blocking, []).append(index)
+                continue
+
+            for material, unit_qty in order.per_unit:
+                used = unit_qty * qty
+                available[material] = available.get(material, 0) - used
+                materials_used[material] = materials_used.get(material, 0) + used
+            order.remaining -= qty
+            capacity_left -= qty
+            production.append({"order": index, "product": order.product, "quantity": qty})
+
+            if order.remaining == 0:
+                order.completed_on = day
+            else:
+                # 용량 소진 또는 원재료 부분 부족 - 다음 날 다시 시도
+                carry_over.append((due_date, index))
+
+        for item in carry_over:
+            heapq.heappush(ready, item)
+
+        if production:
+            days.append({
+                "date": day,
+                "capacity": capacity,
+                "capacity_used": capacity - capacity_left,
+                "production": production,
+                "materials_used": materials_used,
+            })
+
+    summary = []
+    for index, order in enumerate(all_orders):
+        if order is None:
+            continue
+        scheduled = order.gross_qty - order.remaining
+        if order.remaining == 0:
+            status = "completed"
+        elif scheduled > 0:
+            status = "partial"
+        else:
+            status = "unscheduled"
+        summary.append({
+            "order": index,
+            "product": order.product,
+            "required_production": order.gross_qty,
+            "scheduled_qty": scheduled,
+            "due_date": order.due_date,
+            "completion_date": order.completed_on,
+            "late": order.completed_on is None or order.completed_on > order.due_date,
+            "status": status,
+        })
+
+    return {
+        "days": days,
+        "orders": summary,
+        "unknown_orders": unknown,
+        "ending_inventory": available,
+    }
@@ -0,0 +1,138 @@
+"""불량률 몬테카를로 시뮬레이션 (numpy 필요)
+
+원료/공정 불량률을 분포에서 뽑아 실제 생산 수량(required_production)의 분포를 구한다.
+원재료 소요량과 원가는 생산 수량에 선형이므로 시행×원재료 행렬을 만들지 않고
+생산 수량 표본 하나로 백분위/부족 확률을 계산한다.
+
+시행은 CHUNK_SIZE 단위 묶음으로 나누고 묶음마다 SeedSequence.spawn으로 얻은
+독립 시드를 쓰므로, 같은 seed면 프로세스 풀 사용 여부와 관계없이 결과가 같다.
+"""
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+CHUNK_SIZE = 50_000
+MAX_DEFECT_RATE = 0.99
+DISTRIBUTIONS = ("fixed", "uniform", "triangular", "normal", "beta")
+
+
+def validate(dist):
+    """분포 설정 확인 - 잘못되면 ValueError"""
+    kind = dist["kind"]
+    if kind not in DISTRIBUTIONS:
+        raise ValueError(f"지원하지 않는 분포: {kind} (가능: {', '.join(DISTRIBUTIONS)})")
+    if kind in ("fixed", "normal", "beta") and dist.get("mean") is None:
+        raise ValueError(f"{kind} 분포에는 mean이 필요합니다")
+    if kind in ("normal", "beta") and dist.get("std") is None:
+        raise ValueError(f"{kind} 분포에는 std가 필요합니다")
+    if kind in ("uniform", "triangular") and (dist.get("low") is None or dist.get("high") is None):
+        raise ValueError(f"{kind} 분포에는 low, high가 필요합니다")
+    if kind == "triangular" and dist.get("mode") is None:
+        raise ValueError("triangular 분포에는 mode가 필요합니다")
+    # 불량률은 0 이상 1 미만 - 비교를 부정형으로 써서 NaN도 거른다
+    if kind in ("fixed", "normal") and not 0 <= dist["mean"] < 1:
+        raise ValueError(f"{kind} 분포는 0 ≤ mean < 1 이어야 합니다")
+    if kind == "normal" and not dist["std"] > 0:
+        raise ValueError("normal 분포는 std > 0 이어야 합니다")
+    if kind == "uniform" and not 0 <= dist["low"] <= dist["high"] < 1:
+        raise ValueError("uniform 분포는 0 ≤ low ≤ high < 1 이어야 합니다")
+    if kind == "triangular" and not (0 <= dist["low"] <= dist["mode"] <= dist["high"] < 1
+                                     and dist["low"] < dist["high"]):
+        raise ValueError("triangular 분포는 0 ≤ low ≤ mode ≤ high < 1, low < high 이어야 합니다")
+    if kind == "beta":
+        mean, std = dist["mean"], dist["std"]
+        if not 0 < mean < 1 or std <= 0 or std ** 2 >= mean * (1 - mean):
+            raise ValueError("beta 분포는 0 < mean < 1, 0 < std² < mean·(1-mean) 이어야 합니다")
+
+
+def sample(rng, dist, size):
+    """불량률 표본 (0 ~ MAX_DEFECT_RATE로 자름)"""
+    kind = dist["kind"]
+    if kind == "fixed":
+        values = np.full(size, dist["mean"], dtype=float)
+    elif kind == "uniform":
+        values = rng.uniform(dist["low"], dist["high"], size)
+    elif kind == "triangular":
+        values = rng.triangular(dist["low"], dist["mode"], dist["high"], size)
+    elif kind == "normal":
+        values = rng.normal(dist["mean"], dist["std"], size)
+    else:
+        mean, var = dist["mean"], dist["std"] ** 2
+        k = mean * (1 - mean) / var - 1
+        values = rng.beta(mean * k, (1 - mean) * k, size)
+    return np.clip(values, 0.0, MAX_DEFECT_RATE)
+
+
+def _run_chunk(args):
+    """한 묶음의 실제 생산 수량 표본"""
+    seed_seq, size, plan_qty, rounding, raw_dist, process_dist = args
+    rng = np.random.default_rng(seed_seq)
+    raw = sample(rng, raw_dist, size)
+    process = sample(rng, process_dist, size)
+    required = plan_qty / ((1 - raw) * (1 - process))
+    if rounding:
+        required = np.ceil(required)
+    return np.floor(required).astype(np.int64)
+
+
+def sample_required(plan_qty, rounding, raw_dist, process_dist, trials, seed=None, workers=1):
+    """실제 생산 수량 표본 (길이 trials)"""
+    n_chunks = max(1, math.ceil(trials / CHUNK_SIZE))
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    sizes = [CHUNK_SIZE] * (n_chunks - 1) + [trials - CHUNK_SIZE * (n_chunks - 1)]
+    jobs = [
+        (seeds[i], sizes[i], plan_qty, rounding, raw_dist, process_dist)
+        for i in range(n_chunks)
+    ]
+    if workers > 1 and n_chunks > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, n_chunks)) as pool:
+            chunks = list(pool.map(_run_chunk, jobs))
+    else:
+        chunks = [_run_chunk(job) for job in jobs]
+    return np.concatenate(chunks)
+
+
+def _percentiles(values, percentiles):
+    points = np.percentile(values, percentiles)
+    return {f"p{p:g}": float(v) for p, v in zip(percentiles, points)}
+
+
+def summarize(required, plan_qty, per_unit, inventory, unit_prices, percentiles):
+    """생산 수량 표본 → 생산 수량/소요량/부족 확률/원가 요약
+
+    per_unit: 제품 1개당 원재료 소요량 (전개된 BOM 행)
+    unit_prices: 단가가 등록된 원재료의 단가
+    """
+    required = required.astype(float)
+    points = np.percentile(required, percentiles)
+
+    material_demand = {}
+    shortage_probability = {}
+    # 원재료별 부족 없이 만들 수 있는 최대 생산 수량 → 부족 확률은 P(생산 수량 > 한도)
+    overall_limit = math.inf
+    for material, unit_qty in per_unit.items():
+        material_demand[material] = {
+            f"p{p:g}": float(unit_qty * v) for p, v in zip(percentiles, points)
+        }
+        material_demand[material]["mean"] = float(unit_qty * required.mean())
+        if unit_qty > 0:
+            limit = inventory.get(material, 0) / unit_qty
+            overall_limit = min(overall_limit, limit)
+            shortage_probability[material] = float(np.mean(required > limit))
+        else:
+            shortage_probability[material] = 0.0
+
+    cost_per_unit = sum(unit_qty * unit_prices[m] for m, unit_qty in per_unit.items() if m in unit_prices)
+    cost = required * cost_per_unit
+
+    return {
+        "required_production": dict(_percentiles(required, percentiles), mean=float(required.mean())),
+        "material_demand": material_demand,
+        "shortage_probability": float(np.mean(required > overall_limit)),
+        "material_shortage_probability": shortage_probability,
+        "total_cost": dict(_percentiles(cost, percentiles), mean=float(cost.mean())),
+        "unit_cost": dict(
+            _percentiles(cost / plan_qty, percentiles), mean=float(cost.mean() / plan_qty)
+        ) if plan_qty > 0 else {},
+    }
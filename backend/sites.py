@@ -0,0 +1,172 @@
+"""멀티 사이트(매장) - 한 서버에서 여러 사이트의 마스터 데이터를 따로 제공
+
+- 사이트 데이터: SITES_DIR/<사이트 ID>/ (CSV 파일 또는 patbingsu.db, 시나리오)
+- /sites/<사이트 ID>/... 요청은 SiteMiddleware가 접두어를 떼고 기존 라우트로 넘기며,
+  요청이 끝날 때까지 current에 그 사이트를 둔다 (접두어 없는 요청은 기본 사이트)
+- 사이트 상태(저장소, 캐시, 쓰기 스레드)는 처음 요청이 올 때 만들고, 최근에 쓰인 maxsize개만
+  메모리에 둔다. 처리 중인 요청이 있는 사이트는 내보내지 않는다.
+"""
+import asyncio
+import contextvars
+import json
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+PREFIX = "/sites/"
+
+# 현재 요청의 사이트 (None이면 기본 사이트)
+current = contextvars.ContextVar("site", default=None)
+
+
+class SiteRegistry:
+    """사이트 ID → 사이트 상태 (LRU)
+
+    factory(site_id, data_dir)로 사이트 상태를 만들고, 내보낼 때 close()를 호출한다.
+    """
+
+    def __init__(self, factory, directory, maxsize=16):
+        self.factory = factory
+        self.directory = Path(directory)
+        self.maxsize = maxsize
+        self._sites = OrderedDict()  # id -> 사이트 상태
+        self._active = {}  # id -> 처리 중인 요청 수
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def path(self, site_id):
+        return self.directory / site_id
+
+    def exists(self, site_id):
+        return bool(ID_PATTERN.match(site_id)) and self.path(site_id).is_dir()
+
+    def acquire_loaded(self, site_id):
+        """이미 메모리에 있는 사이트만 acquire (없으면 None)"""
+        with self._lock:
+            site = self._sites.get(site_id)
+            if site is not None:
+                self._sites.move_to_end(site_id)
+                self._active[site_id] = self._active.get(site_id, 0) + 1
+            return site
+
+    def acquire(self, site_id):
+        """사이트 상태 반환 (필요하면 로드), 다 쓰면 release - 등록되지 않은 사이트면 None"""
+        site = self.acquire_loaded(site_id)
+        if site is not None or not self.exists(site_id):
+            return site
+        created = self.factory(site_id, self.path(site_id))
+        with self._lock:
+            site = self._sites.get(site_id)
+            if site is None:
+                site = self._sites[site_id] = created
+                self.loads += 1
+            self._sites.move_to_end(site_id)
+            self._active[site_id] = self._active.get(site_id, 0) + 1
+            evicted = self._evict()
+        if site is not created:  # 다른 요청이 먼저 같은 사이트를 로드함
+            created.close()
+        for site_state in evicted:
+            site_state.close()
+        return site
+
+    def release(self, site_id):
+        with self._lock:
+            self._active[site_id] -= 1
+            if not self._active[site_id]:
+                del self._active[site_id]
+            evicted = self._evict()
+        for site_state in evicted:
+            site_state.close()
+
+    def _evict(self):
+        """잠금 안에서 호출 - 처리 중이 아닌 오래된 사이트부터 maxsize개가 될 때까지 제거"""
+        evicted = []
+        for site_id in list(self._sites):
+            if len(self._sites) <= self.maxsize:
+                break
+            if site_id not in self._active:
+                evicted.append(self._sites.pop(site_id))
+                self.evictions += 1
+        return evicted
+
+    def create(self, site_id):
+        """빈 사이트 폴더 생성 - 이미 있으면 False"""
+        path = self.path(site_id)
+        if path.exists():
+            return False
+        path.mkdir(parents=True)
+        return True
+
+    def list(self):
+        if not self.directory.exists():
+            return []
+        with self._lock:
+            loaded = set(self._sites)
+            active = dict(self._active)
+        return [
+            {"site_id": path.name, "loaded": path.name in loaded, "active_requests": active.get(path.name, 0)}
+            for path in sorted(self.directory.iterdir())
+            if path.is_dir() and ID_PATTERN.match(path.name)
+        ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": len(self._sites),
+                "maxsize": self.maxsize,
+                "active": sum(self._active.values()),
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+class SiteMiddleware:
+    """/sites/<사이트 ID>/<경로>를 <경로> 라우트로 처리하고 요청이 끝날 때까지 current에 사이트 지정 (ASGI)
+
+    처음 쓰는 사이트는 저장소를 여는 동안 이벤트 루프를 막지 않도록 스레드에서 로드한다.
+    스트리밍 응답은 본문을 다 보낼 때까지 사이트를 붙잡고 있다.
+    """
+
+    def __init__(self, app, registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        root_path = scope.get("root_path", "")
+        path = scope["path"].removeprefix(root_path)
+        site_id, slash, _ = path.removeprefix(PREFIX).partition("/")
+        if not path.startswith(PREFIX) or not slash:
+            await self.app(scope, receive, send)
+            return
+
+        site = self.registry.acquire_loaded(site_id)
+        if site is None:
+            site = await asyncio.to_thread(self.registry.acquire, site_id)
+        if site is None:
+            await _send_json(send, {"status": "error", "message": f"등록되지 않은 사이트입니다: {site_id}"})
+            return
+
+        # Mount와 같은 방식: path는 그대로 두고 root_path에 접두어를 붙이면 라우터가 나머지 경로로 매칭
+        scope = dict(scope, root_path=root_path + PREFIX + site_id)
+        token = current.set(site)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current.reset(token)
+            self.registry.release(site_id)
+
+
+async def _send_json(send, content):
+    body = json.dumps(content, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,932 @@
+"""마스터 데이터 저장소
+
+CsvStorage(기존 CSV 파일)와 SqliteStorage(WAL 모드 SQLite) 두 가지 구현이 있고
+main.py의 로더/설정 API는 테이블 이름으로만 접근한다.
+CSV는 교환 포맷으로 유지하며 import_csv / export_csv로 옮길 수 있다.
+
+재고는 원장(입고·생산 소비·조정)에 덧붙이는 방식으로만 바뀌고, inventory 테이블은
+원장을 누적한 현재 재고다. 일정 건수마다 재고 스냅샷을 남겨 시점 재고를
+가장 가까운 스냅샷 + 원장 재생으로 계산한다 (storage.ledger.stock_at).
+
+실행 예시 (backend 폴더에서)
+python storage.py import patbingsu.db   # CSV → SQLite
+python storage.py export patbingsu.db   # SQLite → CSV
+"""
+import csv
+import functools
+import io
+import math
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 내 잠금만 사용
+    fcntl = None
+
+# 테이블 정의: CSV 파일명, 컬럼, 기본키, 숫자 컬럼 타입 (나머지 컬럼은 문자열)
+TABLES = {
+    "products": {
+        "csv": "products.csv",
+        "fields": ["product_name", "price"],
+        "key": ["product_name"],
+        "types": {"price": int},
+    },
+    "raw_materials": {
+        "csv": "raw_materials.csv",
+        "fields": ["material_name", "unit", "price"],
+        "key": ["material_name"],
+        "types": {"price": int},
+    },
+    "bom": {
+        "csv": "bom.csv",
+        "fields": ["product_name", "material_name", "quantity"],
+        "key": ["product_name", "material_name"],
+        "types": {"quantity": float},
+    },
+    "inventory": {
+        "csv": "inventory.csv",
+        "fields": ["material_name", "quantity"],
+        "key": ["material_name"],
+        "types": {"quantity": int},
+    },
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    product_name TEXT PRIMARY KEY,
+    price INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS raw_materials (
+    material_name TEXT PRIMARY KEY,
+    unit TEXT NOT NULL,
+    price INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bom (
+    product_name TEXT NOT NULL,
+    material_name TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    PRIMARY KEY (product_name, material_name)
+);
+CREATE INDEX IF NOT EXISTS bom_material_idx ON bom (material_name);
+CREATE TABLE IF NOT EXISTS inventory (
+    material_name TEXT PRIMARY KEY,
+    quantity INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS inventory_ledger (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded_at TEXT NOT NULL,
+    material_name TEXT NOT NULL,
+    delta INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    reference TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS inventory_ledger_material_idx ON inventory_ledger (material_name, seq);
+CREATE TABLE IF NOT EXISTS inventory_snapshot_index (
+    seq INTEGER PRIMARY KEY,
+    taken_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS inventory_snapshots (
+    seq INTEGER NOT NULL,
+    material_name TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY (seq, material_name)
+);
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+# 재고 원장 항목 종류: 입고, 생산 계획 소비, 수량 조정, 재고 행 삭제
+LEDGER_FIELDS = ["seq", "recorded_at", "material_name", "delta", "kind", "reference"]
+LEDGER_KINDS = ("receipt", "consumption", "adjustment", "delete")
+# 원장 항목이 이만큼 쌓일 때마다 재고 스냅샷 저장
+LEDGER_SNAPSHOT_EVERY = 1000
+
+
+# CSV 읽기/쓰기
+def read_csv(filepath):
+    """CSV 파일을 딕셔너리 리스트로 반환"""
+    if not os.path.exists(filepath):
+        return []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+        _count_read(filepath, os.fstat(f.fileno()).st_size)
+        return rows
+
+def _count_read(filepath, size):
+    name = os.path.basename(filepath)
+    metrics.CSV_READS.inc(file=name)
+    metrics.CSV_READ_BYTES.inc(size, file=name)
+
+def write_csv(filepath, fieldnames, data):
+    """CSV 파일에 데이터 쓰기
+
+    임시 파일에 쓴 뒤 os.replace로 교체하므로, 동시에 읽는 쪽은 항상
+    이전 파일이나 새 파일 전체 중 하나만 본다 (쓰다 만 파일을 읽지 않음).
+    """
+    tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(data)
+        size = f.tell()
+    os.replace(tmp_path, filepath)
+    name = os.path.basename(filepath)
+    metrics.CSV_WRITES.inc(file=name)
+    metrics.CSV_WRITE_BYTES.inc(size, file=name)
+
+def file_signature(filepath):
+    """파일 변경 감지용 시그니처 (mtime, size) - 파일이 없으면 None"""
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _key_of(table, row):
+    return tuple(str(row[k]) for k in TABLES[table]["key"])
+
+def consumption_of(materials):
+    """계획 소요량을 재고 차감량으로 변환 (재고는 정수 단위이므로 올림)"""
+    return {name: math.ceil(qty) for name, qty in materials.items()}
+
+def check_available(amounts, available):
+    """차감 전 재고 확인 - 부족한 원재료만 calculate_plan과 같은 형식으로 반환"""
+    insufficient = {}
+    for name, amount in amounts.items():
+        have = available.get(name, 0)
+        if have < amount:
+            insufficient[name] = {"required": amount, "available": have, "shortage": amount - have}
+    return insufficient
+
+
+# 재고 원장
+def ledger_timestamp(moment=None):
+    """원장 시각 문자열 (초 단위 ISO) - 날짜만 주면 그날 마감 시점, 없으면 현재 시각"""
+    if moment is None:
+        moment = datetime.now()
+    elif not isinstance(moment, datetime):
+        moment = datetime.combine(moment, datetime.max.time())
+    elif moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment.isoformat(timespec="seconds")
+
+def apply_entry(stock, material_name, delta, kind):
+    """원장 항목 하나를 재고 dict에 반영"""
+    if kind == "delete":
+        stock.pop(material_name, None)
+    else:
+        stock[material_name] = stock.get(material_name, 0) + delta
+
+def set_entries(stock, rows, reference=""):
+    """절대 수량 지정(수정·대량 업로드) → 현재 재고와의 차이만큼 조정 항목 (같으면 생략)"""
+    entries = []
+    assigned = {}
+    for row in rows:
+        name, quantity = row['material_name'], int(row['quantity'])
+        have = assigned[name] if name in assigned else stock.get(name)
+        if have != quantity:
+            entries.append((name, quantity - (have or 0), "adjustment", reference))
+        assigned[name] = quantity
+    return entries
+
+def _clean_reference(reference):
+    return " ".join(str(reference).split())
+
+
+class InventoryLedger:
+    """재고 원장 공통 동작 (CSV / SQLite)
+
+    하위 클래스는 _session()으로 쓰기 잠금(트랜잭션) 안에서 (현재 재고, append)를 넘긴다.
+    append([(원재료, 증감, 종류, 참조)])는 항목을 원장 끝에 덧붙이고 현재 재고에 바로 반영한다.
+    """
+
+    def set_quantities(self, rows, reference=""):
+        """재고 수량을 절대값으로 지정 (차이만큼 조정 항목 기록)"""
+        with self._session() as (stock, append):
+            append(set_entries(stock, rows, reference))
+
+    def insert(self, material_name, quantity, reference=""):
+        """재고 행 추가 - 이미 있으면 False"""
+        with self._session() as (stock, append):
+            if material_name in stock:
+                return False
+            append([(material_name, int(quantity), "adjustment", reference)])
+            return True
+
+    def remove(self, material_name, reference=""):
+        with self._session() as (stock, append):
+            if material_name in stock:
+                append([(material_name, -stock[material_name], "delete", reference)])
+
+    def replace(self, rows, reference=""):
+        """전체 교체 (가져오기) - 빠진 원재료는 삭제, 나머지는 차이만큼 조정"""
+        names = {row['material_name'] for row in rows}
+        with self._session() as (stock, append):
+            removed = [(name, -qty, "delete", reference) for name, qty in stock.items() if name not in names]
+            append(removed + set_entries(stock, rows, reference))
+
+    def receive(self, material_name, quantity, reference=""):
+        """입고 (없는 원재료면 재고 행이 새로 생김)"""
+        with self._session() as (_, append):
+            append([(material_name, int(quantity), "receipt", reference)])
+
+    def adjust(self, material_name, delta, reference=""):
+        """수량 증감 조정 (실사 차이, 폐기 등) - 재고 행이 없으면 False"""
+        with self._session() as (stock, append):
+            if material_name not in stock:
+                return False
+            append([(material_name, int(delta), "adjustment", reference)])
+            return True
+
+    def deduct(self, amounts, reference=""):
+        """생산 소비 - 모두 충분하면 차감하고 {}, 하나라도 부족하면 변경 없이 부족 내역"""
+        with self._session() as (stock, append):
+            insufficient = check_available(amounts, stock)
+            if insufficient:
+                return insufficient
+            append([(name, -amount, "consumption", reference) for name, amount in amounts.items() if amount])
+            return {}
+
+
+class CsvStorage:
+    """CSV 파일 저장소 (쓰기마다 파일 전체를 다시 씀, 재고는 원장에 한 줄씩 덧붙임)"""
+
+    name = "csv"
+
+    def __init__(self, csv_dir, snapshot_every=LEDGER_SNAPSHOT_EVERY):
+        self.csv_dir = Path(csv_dir)
+        self._lock = threading.Lock()
+        self.ledger = CsvInventoryLedger(self, snapshot_every)
+
+    def path(self, table):
+        return self.csv_dir / TABLES[table]["csv"]
+
+    @contextmanager
+    def _locked(self, table):
+        """읽기-수정-쓰기 구간 잠금 (스레드 + 워커 프로세스 간 파일 잠금)"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.csv_dir / f".{TABLES[table]['csv']}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def signature(self, table):
+        if table == "inventory":
+            return self.ledger.signature()
+        return file_signature(self.path(table))
+
+    def read(self, table):
+        if table == "inventory":
+            return self.ledger.rows()
+        return read_csv(self.path(table))
+
+    def iter_rows(self, table):
+        """행을 하나씩 읽음 (파일 전체를 메모리에 올리지 않음)"""
+        if table == "inventory":
+            yield from self.ledger.rows()
+            return
+        path = self.path(table)
+        if not path.exists():
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            _count_read(path, os.fstat(f.fileno()).st_size)
+            yield from csv.DictReader(f)
+
+    def _rewrite(self, table, rows):
+        write_csv(self.path(table), TABLES[table]["fields"], rows)
+
+    def upsert(self, table, row):
+        """기본키가 같은 행을 교체 (새 행은 맨 뒤로)"""
+        if table == "inventory":
+            return self.ledger.set_quantities([row])
+        key = _key_of(table, row)
+        with self._locked(table):
+            rows = [r for r in self.read(table) if _key_of(table, r) != key]
+            rows.append({f: str(row[f]) for f in TABLES[table]["fields"]})
+            self._rewrite(table, rows)
+
+    def insert(self, table, row):
+        """기본키가 없을 때만 추가 - 이미 있으면 False"""
+        if table == "inventory":
+            return self.ledger.insert(row['material_name'], row['quantity'])
+        key = _key_of(table, row)
+        with self._locked(table):
+            rows = self.read(table)
+            if any(_key_of(table, r) == key for r in rows):
+                return False
+            rows.append({f: str(row[f]) for f in TABLES[table]["fields"]})
+            self._rewrite(table, rows)
+            return True
+
+    def delete(self, table, key):
+        """기본키로 행 삭제 (key는 기본키 컬럼 dict)"""
+        if table == "inventory":
+            return self.ledger.remove(key['material_name'])
+        key = _key_of(table, key)
+        with self._locked(table):
+            rows = [r for r in self.read(table) if _key_of(table, r) != key]
+            self._rewrite(table, rows)
+
+    def bulk_upsert(self, table, rows):
+        """여러 행을 한 번의 파일 쓰기로 upsert (기존 키는 제자리 교체, 새 키는 뒤에 추가)"""
+        if table == "inventory":
+            return self.ledger.set_quantities(rows)
+        fields = TABLES[table]["fields"]
+        with self._locked(table):
+            existing = self.read(table)
+            index = {_key_of(table, r): i for i, r in enumerate(existing)}
+            for row in rows:
+                new_row = {f: str(row[f]) for f in fields}
+                key = _key_of(table, row)
+                if key in index:
+                    existing[index[key]] = new_row
+                else:
+                    index[key] = len(existing)
+                    existing.append(new_row)
+            self._rewrite(table, existing)
+
+    def replace_all(self, table, rows):
+        if table == "inventory":
+            return self.ledger.replace(rows, "import")
+        with self._locked(table):
+            self._rewrite(table, [{f: str(r[f]) for f in TABLES[table]["fields"]} for r in rows])
+
+    def deduct(self, amounts, reference=""):
+        """재고 확인과 차감을 한 잠금 구간에서 수행
+
+        모두 충분하면 차감하고 {} 반환, 하나라도 부족하면 변경 없이 부족 내역 반환
+        """
+        return self.ledger.deduct(amounts, reference)
+
+
+class _LedgerState:
+    """CSV 원장을 누적한 프로세스 내 현재 재고"""
+
+    def __init__(self, base, offset, stock, seq, adopted):
+        self.base = base  # 기준 inventory.csv 시그니처
+        self.offset = offset  # 원장에서 여기까지 반영함 (바이트)
+        self.stock = stock
+        self.seq = seq  # 마지막으로 반영한 원장 seq
+        self.since_snapshot = 0
+        self.adopted = adopted  # inventory.csv가 스냅샷 목록에 없음 (다음 쓰기 때 스냅샷으로 등록)
+
+
+class CsvInventoryLedger(InventoryLedger):
+    """CSV 재고 원장
+
+    - inventory_ledger.csv: 원장 (한 줄씩 덧붙이기만 함)
+    - inventory.csv: 마지막 스냅샷 시점의 재고 (스냅샷 때만 다시 씀)
+    - inventory_snapshots.csv: 스냅샷 목록 (seq, 시각, 원장 바이트 위치, inventory.csv 시그니처, 사본 파일)
+    - inventory_snapshots/: 시점 재고 조회용 스냅샷 사본
+    현재 재고 = inventory.csv + 스냅샷 이후 원장. 프로세스마다 원장에서 새로 늘어난 부분만 읽어
+    누적하므로 쓰기는 원장 한 줄 추가, 읽기는 변경이 없으면 stat뿐이다.
+    inventory.csv가 스냅샷 목록과 다르면(직접 수정, 스냅샷 도중 중단) 그 파일을 현재 재고로 본다.
+    """
+
+    INDEX_FIELDS = ["seq", "taken_at", "ledger_offset", "mtime_ns", "size", "file"]
+
+    def __init__(self, storage, snapshot_every=LEDGER_SNAPSHOT_EVERY):
+        self.storage = storage
+        self.base_path = storage.path("inventory")
+        self.ledger_path = storage.csv_dir / "inventory_ledger.csv"
+        self.index_path = storage.csv_dir / "inventory_snapshots.csv"
+        self.snapshot_dir = storage.csv_dir / "inventory_snapshots"
+        self.snapshot_every = snapshot_every
+        self._state = None
+        self._lock = threading.Lock()
+
+    def signature(self):
+        return (file_signature(self.base_path), file_signature(self.ledger_path))
+
+    def rows(self):
+        with self._lock:
+            stock = self._current().stock
+            return [{'material_name': name, 'quantity': str(qty)} for name, qty in stock.items()]
+
+    def _ledger_size(self):
+        try:
+            return os.path.getsize(self.ledger_path)
+        except FileNotFoundError:
+            return 0
+
+    def _current(self):
+        """원장에서 새로 늘어난 부분만 반영한 현재 상태 (self._lock 안에서 호출)"""
+        base = file_signature(self.base_path)
+        size = self._ledger_size()
+        state = self._state
+        if state is None or state.base != base or size < state.offset:
+            state = self._state = self._rebuild(base, size)
+        if size > state.offset:
+            self._replay(state)
+        return state
+
+    def _rebuild(self, base, size):
+        stock = {r['material_name']: int(r['quantity']) for r in read_csv(self.base_path)}
+        index = read_csv(self.index_path)
+        last = index[-1] if index else None
+        if last is not None and (int(last['mtime_ns']), int(last['size'])) == base \
+                and int(last['ledger_offset']) <= size:
+            return _LedgerState(base, int(last['ledger_offset']), stock, int(last['seq']), False)
+        return _LedgerState(base, size, stock, self._last_seq(), True)
+
+    def _last_seq(self):
+        """원장 마지막 항목의 seq (없으면 0)"""
+        try:
+            with open(self.ledger_path, 'rb') as f:
+                f.seek(max(0, os.fstat(f.fileno()).st_size - 4096))
+                lines = f.read().split(b"\n")[:-1]
+        except FileNotFoundError:
+            return 0
+        for line in reversed(lines):
+            seq = line.split(b",", 1)[0]
+            if seq.isdigit():
+                return int(seq)
+        return 0
+
+    def _read_ledger(self, offset):
+        """offset부터 끝까지의 완전한 줄 (쓰는 중인 마지막 줄은 제외) → (행 목록, 읽은 바이트)"""
+        with open(self.ledger_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        _count_read(self.ledger_path, end)
+        rows = csv.reader(io.StringIO(data[:end].decode('utf-8')))
+        return [row for row in rows if row and row[0] != "seq"], end
+
+    def _replay(self, state):
+        rows, size = self._read_ledger(state.offset)
+        for seq, _, name, delta, kind, _ in rows:
+            apply_entry(state.stock, name, int(delta), kind)
+            state.seq = int(seq)
+        state.offset += size
+        state.since_snapshot += len(rows)
+
+    @contextmanager
+    def _session(self):
+        with self.storage._locked("inventory"), self._lock:
+            state = self._current()
+            if state.adopted:
+                # 읽기 중에 본 다른 워커의 스냅샷일 수 있으므로 잠금 안에서 다시 확인
+                self._state = None
+                state = self._current()
+                if state.adopted:
+                    self._snapshot(state)
+            yield state.stock, functools.partial(self._append, state)
+
+    def _append(self, state, entries):
+        if not entries:
+            return
+        recorded_at = ledger_timestamp()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if state.offset == 0:
+            writer.writerow(LEDGER_FIELDS)
+        for name, delta, kind, reference in entries:
+            state.seq += 1
+            writer.writerow([state.seq, recorded_at, name, delta, kind, _clean_reference(reference)])
+            apply_entry(state.stock, name, delta, kind)
+        data = buffer.getvalue().encode('utf-8')
+        with open(self.ledger_path, 'ab') as f:
+            f.write(data)
+        state.offset += len(data)
+        state.since_snapshot += len(entries)
+        metrics.CSV_WRITES.inc(file=self.ledger_path.name)
+        metrics.CSV_WRITE_BYTES.inc(len(data), file=self.ledger_path.name)
+        if state.since_snapshot >= self.snapshot_every:
+            self._snapshot(state)
+
+    def _snapshot(self, state):
+        """현재 재고를 inventory.csv와 사본으로 저장하고 스냅샷 목록에 등록"""
+        fields = TABLES["inventory"]["fields"]
+        rows = [{'material_name': name, 'quantity': qty} for name, qty in state.stock.items()]
+        taken_at = ledger_timestamp()
+        copy_name = f"inventory-{state.seq}-{taken_at.replace(':', '')}.csv"
+        self.snapshot_dir.mkdir(exist_ok=True)
+        write_csv(self.snapshot_dir / copy_name, fields, rows)
+        write_csv(self.base_path, fields, rows)
+        state.base = file_signature(self.base_path)
+        new_index = not self.index_path.exists()
+        with open(self.index_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if new_index:
+                writer.writerow(self.INDEX_FIELDS)
+            writer.writerow([state.seq, taken_at, state.offset, *state.base, copy_name])
+        state.since_snapshot = 0
+        state.adopted = False
+
+    def entries(self, material_name=None, limit=100, before_seq=None):
+        """최근 원장 항목 (최신순)
+
+        파일 끝(before_seq가 있으면 그 직후 스냅샷의 원장 위치)에서 거꾸로 읽으므로
+        원장이 길어져도 한 페이지를 읽는 비용은 늘지 않는다.
+        """
+        try:
+            size = os.path.getsize(self.ledger_path)
+        except FileNotFoundError:
+            return []
+        end = self._entries_end(before_seq, size)
+        entries = []
+        for line in self._lines_backward(end):
+            row = next(csv.reader([line]), None)
+            if not row or row[0] == "seq":
+                continue
+            entry = dict(zip(LEDGER_FIELDS, row))
+            if before_seq is not None and int(entry['seq']) >= before_seq:
+                continue
+            if material_name is not None and entry['material_name'] != material_name:
+                continue
+            entries.append({**entry, 'seq': int(entry['seq']), 'delta': int(entry['delta'])})
+            if len(entries) >= limit:
+                break
+        return entries
+
+    def _entries_end(self, before_seq, size):
+        """before_seq 이전 항목이 모두 들어 있는 원장 앞부분의 끝 위치 (줄 경계)
+
+        스냅샷 목록의 (seq, 원장 위치) 중 seq가 before_seq - 1 이상인 가장 이른 스냅샷을 쓰고,
+        없으면 파일 끝 (건너뛸 항목은 최대 snapshot_every개)
+        """
+        if before_seq is None:
+            return size
+        for row in read_csv(self.index_path):
+            offset = int(row['ledger_offset'])
+            if int(row['seq']) >= before_seq - 1 and offset <= size:
+                if offset == 0 or self._ends_line(offset):
+                    return offset
+                break
+        return size
+
+    def _ends_line(self, offset):
+        with open(self.ledger_path, 'rb') as f:
+            f.seek(offset - 1)
+            return f.read(1) == b"\n"
+
+    def _lines_backward(self, end, block_size=65536):
+        """원장 [0, end) 구간의 완전한 줄을 뒤에서부터 (줄바꿈으로 끝나지 않은 마지막 조각은 제외)"""
+        with open(self.ledger_path, 'rb') as f:
+            position = end
+            head = None  # 블록 맨 앞의, 앞쪽이 아직 읽히지 않은 줄 조각
+            passed_tail = False  # end 직전의 (쓰는 중이거나 빈) 마지막 조각을 지났는지
+            while position > 0:
+                start = max(0, position - block_size)
+                f.seek(start)
+                parts = f.read(position - start).split(b"\n")
+                _count_read(self.ledger_path, position - start)
+                position = start
+                if head is not None:
+                    parts[-1] += head
+                head = parts.pop(0)
+                for part in reversed(parts):
+                    if not passed_tail:
+                        passed_tail = True
+                    elif part:
+                        yield part.decode('utf-8')
+            if passed_tail and head:
+                yield head.decode('utf-8')
+
+    def stock_at(self, moment):
+        """moment(날짜면 그날 마감) 시점 재고 - 이전 가장 가까운 스냅샷 + 원장 재생
+
+        원장이 없으면 현재 재고, 첫 스냅샷(원장 시작)보다 이전이면 None
+        """
+        moment = ledger_timestamp(moment)
+        index = read_csv(self.index_path)
+        if not index:
+            return {row['material_name']: int(row['quantity']) for row in self.rows()}
+        earlier = [row for row in index if row['taken_at'] <= moment]
+        if not earlier:
+            return None
+        snapshot = earlier[-1]
+        stock = {
+            r['material_name']: int(r['quantity']) for r in read_csv(self.snapshot_dir / snapshot['file'])
+        }
+        rows, _ = self._read_ledger(int(snapshot['ledger_offset']))
+        for _, recorded_at, name, delta, kind, _ in rows:
+            if recorded_at > moment:
+                break
+            apply_entry(stock, name, int(delta), kind)
+        return stock
+
+
+class SqliteStorage:
+    """SQLite 저장소 (WAL 모드, 단일 행 단위 트랜잭션 쓰기)
+
+    table_versions 테이블의 버전을 쓰기와 같은 트랜잭션에서 올리므로
+    다른 uvicorn 워커가 쓴 변경도 signature()로 감지된다.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path, snapshot_every=LEDGER_SNAPSHOT_EVERY):
+        self.db_path = str(db_path)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        self.ledger = SqliteInventoryLedger(self, snapshot_every)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # 트랜잭션은 BEGIN IMMEDIATE로 직접 관리
+            conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """쓰기 트랜잭션 (시작 시점에 쓰기 잠금 획득)"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _bump(self, conn, table):
+        conn.execute(
+            "INSERT INTO table_versions (table_name, version) VALUES (?, 1) "
+            "ON CONFLICT (table_name) DO UPDATE SET version = version + 1",
+            (table,),
+        )
+
+    def signature(self, table):
+        row = self._connect().execute(
+            "SELECT version FROM table_versions WHERE table_name = ?", (table,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def read(self, table):
+        return list(self.iter_rows(table))
+
+    def iter_rows(self, table):
+        """커서로 행을 하나씩 읽음
+
+        스트리밍 응답은 요청 스레드와 다른 스레드에서 소비될 수 있으므로 전용 연결을 쓴다.
+        """
+        fields = ", ".join(TABLES[table]["fields"])
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            for row in conn.execute(f"SELECT {fields} FROM {table} ORDER BY rowid"):
+                yield dict(row)
+        finally:
+            conn.close()
+
+    def upsert(self, table, row):
+        if table == "inventory":
+            return self.ledger.set_quantities([row])
+        fields = TABLES[table]["fields"]
+        with self.transaction() as conn:
+            conn.execute(self._upsert_sql(table), [row[f] for f in fields])
+            self._bump(conn, table)
+
+    def insert(self, table, row):
+        if table == "inventory":
+            return self.ledger.insert(row['material_name'], row['quantity'])
+        fields = TABLES[table]["fields"]
+        sql = (
+            f"INSERT OR IGNORE INTO {table} ({', '.join(fields)}) "
+            f"VALUES ({', '.join('?' * len(fields))})"
+        )
+        with self.transaction() as conn:
+            inserted = conn.execute(sql, [row[f] for f in fields]).rowcount == 1
+            if inserted:
+                self._bump(conn, table)
+        return inserted
+
+    def delete(self, table, key):
+        if table == "inventory":
+            return self.ledger.remove(key['material_name'])
+        keys = TABLES[table]["key"]
+        where = " AND ".join(f"{k} = ?" for k in keys)
+        with self.transaction() as conn:
+            conn.execute(f"DELETE FROM {table} WHERE {where}", [key[k] for k in keys])
+            self._bump(conn, table)
+
+    def deduct(self, amounts, reference=""):
+        """재고 확인과 차감을 한 트랜잭션에서 수행 (CsvStorage.deduct와 같은 규약)"""
+        return self.ledger.deduct(amounts, reference)
+
+    def _upsert_sql(self, table):
+        spec = TABLES[table]
+        fields = spec["fields"]
+        updates = [f for f in fields if f not in spec["key"]]
+        return (
+            f"INSERT INTO {table} ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))}) "
+            f"ON CONFLICT ({', '.join(spec['key'])}) DO UPDATE SET "
+            + ", ".join(f"{f} = excluded.{f}" for f in updates)
+        )
+
+    def bulk_upsert(self, table, rows):
+        """여러 행을 한 트랜잭션으로 upsert"""
+        if table == "inventory":
+            return self.ledger.set_quantities(rows)
+        fields = TABLES[table]["fields"]
+        with self.transaction() as conn:
+            conn.executemany(self._upsert_sql(table), ([r[f] for f in fields] for r in rows))
+            self._bump(conn, table)
+
+    def replace_all(self, table, rows):
+        if table == "inventory":
+            return self.ledger.replace(rows, "import")
+        fields = TABLES[table]["fields"]
+        sql = f"INSERT INTO {table} ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})"
+        with self.transaction() as conn:
+            conn.execute(f"DELETE FROM {table}")
+            conn.executemany(sql, ([r[f] for f in fields] for r in rows))
+            self._bump(conn, table)
+
+
+
+class _SqliteStock:
+    """트랜잭션 안의 inventory 테이블을 dict처럼 조회 (필요한 행만 읽음)"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def get(self, name, default=None):
+        row = self.conn.execute("SELECT quantity FROM inventory WHERE material_name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __getitem__(self, name):
+        quantity = self.get(name)
+        if quantity is None:
+            raise KeyError(name)
+        return quantity
+
+    def items(self):
+        return self.conn.execute("SELECT material_name, quantity FROM inventory ORDER BY rowid").fetchall()
+
+
+class SqliteInventoryLedger(InventoryLedger):
+    """SQLite 재고 원장
+
+    원장 추가, inventory 행 증감, 버전 증가를 한 트랜잭션에서 수행한다 (쓰기 비용은 항목 수에만 비례).
+    원장 시작 시점과 snapshot_every 항목마다 inventory 전체를 inventory_snapshots에 복사한다.
+    """
+
+    def __init__(self, storage, snapshot_every=LEDGER_SNAPSHOT_EVERY):
+        self.storage = storage
+        self.snapshot_every = snapshot_every
+
+    @contextmanager
+    def _session(self):
+        with self.storage.transaction() as conn:
+            if conn.execute("SELECT 1 FROM inventory_snapshot_index LIMIT 1").fetchone() is None:
+                self._snapshot(conn)
+            yield _SqliteStock(conn), functools.partial(self._append, conn)
+
+    def _last_seq(self, conn):
+        return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM inventory_ledger").fetchone()[0]
+
+    def _append(self, conn, entries):
+        if not entries:
+            return
+        recorded_at = ledger_timestamp()
+        for name, delta, kind, reference in entries:
+            conn.execute(
+                "INSERT INTO inventory_ledger (recorded_at, material_name, delta, kind, reference) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (recorded_at, name, delta, kind, _clean_reference(reference)),
+            )
+            if kind == "delete":
+                conn.execute("DELETE FROM inventory WHERE material_name = ?", (name,))
+            else:
+                conn.execute(
+                    "INSERT INTO inventory (material_name, quantity) VALUES (?, ?) "
+                    "ON CONFLICT (material_name) DO UPDATE SET quantity = quantity + excluded.quantity",
+                    (name, delta),
+                )
+        self.storage._bump(conn, "inventory")
+        last_snapshot = conn.execute("SELECT MAX(seq) FROM inventory_snapshot_index").fetchone()[0]
+        if self._last_seq(conn) - last_snapshot >= self.snapshot_every:
+            self._snapshot(conn)
+
+    def _snapshot(self, conn):
+        seq = self._last_seq(conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO inventory_snapshot_index (seq, taken_at) VALUES (?, ?)",
+            (seq, ledger_timestamp()),
+        )
+        conn.execute("DELETE FROM inventory_snapshots WHERE seq = ?", (seq,))
+        conn.execute(
+            "INSERT INTO inventory_snapshots (seq, material_name, quantity) "
+            "SELECT ?, material_name, quantity FROM inventory ORDER BY rowid",
+            (seq,),
+        )
+
+    def entries(self, material_name=None, limit=100, before_seq=None):
+        """최근 원장 항목 (최신순)"""
+        where, params = [], []
+        if material_name is not None:
+            where.append("material_name = ?")
+            params.append(material_name)
+        if before_seq is not None:
+            where.append("seq < ?")
+            params.append(before_seq)
+        sql = " ".join([
+            "SELECT seq, recorded_at, material_name, delta, kind, reference FROM inventory_ledger",
+            f"WHERE {' AND '.join(where)}" if where else "",
+            "ORDER BY seq DESC LIMIT ?",
+        ])
+        return [dict(row) for row in self.storage._connect().execute(sql, [*params, limit])]
+
+    def stock_at(self, moment):
+        """moment(날짜면 그날 마감) 시점 재고 (CsvInventoryLedger.stock_at과 같은 규약)"""
+        moment = ledger_timestamp(moment)
+        conn = self.storage._connect()
+        if conn.execute("SELECT 1 FROM inventory_snapshot_index LIMIT 1").fetchone() is None:
+            return {row[0]: row[1] for row in conn.execute(
+                "SELECT material_name, quantity FROM inventory ORDER BY rowid"
+            )}
+        snapshot = conn.execute(
+            "SELECT seq FROM inventory_snapshot_index WHERE taken_at <= ? ORDER BY seq DESC LIMIT 1", (moment,)
+        ).fetchone()
+        if snapshot is None:
+            return None
+        seq = snapshot[0]
+        stock = {row[0]: row[1] for row in conn.execute(
+            "SELECT material_name, quantity FROM inventory_snapshots WHERE seq = ? ORDER BY rowid", (seq,)
+        )}
+        replay = conn.execute(
+            "SELECT material_name, delta, kind FROM inventory_ledger WHERE seq > ? AND recorded_at <= ? "
+            "ORDER BY seq",
+            (seq, moment),
+        )
+        for name, delta, kind in replay:
+            apply_entry(stock, name, delta, kind)
+        return stock
+
+
+def import_csv(csv_dir, storage):
+    """CSV 파일들을 저장소로 가져오기 (테이블 단위로 전체 교체)"""
+    counts = {}
+    source = CsvStorage(csv_dir)  # 재고는 inventory.csv + 원장
+    for table, spec in TABLES.items():
+        path = Path(csv_dir) / spec["csv"]
+        if not path.exists():
+            continue
+        rows = source.read(table)
+        storage.replace_all(table, rows)
+        counts[table] = len(rows)
+    return counts
+
+def export_csv(storage, csv_dir):
+    """저장소 내용을 CSV 파일로 내보내기"""
+    counts = {}
+    for table, spec in TABLES.items():
+        rows = storage.read(table)
+        write_csv(Path(csv_dir) / spec["csv"], spec["fields"], rows)
+        counts[table] = len(rows)
+    return counts
+
+def open_storage(backend, csv_dir, db_path=None, snapshot_every=LEDGER_SNAPSHOT_EVERY):
+    """설정값으로 저장소 생성 - sqlite DB가 새로 만들어지면 CSV에서 가져옴"""
+    if backend == "csv":
+        return CsvStorage(csv_dir, snapshot_every)
+    if backend == "sqlite":
+        db_path = db_path or Path(csv_dir) / "patbingsu.db"
+        is_new = not os.path.exists(db_path)
+        storage = SqliteStorage(db_path, snapshot_every)
+        if is_new:
+            import_csv(csv_dir, storage)
+        return storage
+    raise ValueError(f"알 수 없는 저장소: {backend}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("import", "export"):
+        print("사용법: python storage.py import|export [DB 경로] [CSV 폴더]")
+        sys.exit(1)
+    here = Path(__file__).parent
+    db = sys.argv[2] if len(sys.argv) > 2 else here / "patbingsu.db"
+    folder = sys.argv[3] if len(sys.argv) > 3 else here
+    target = SqliteStorage(db)
+    if sys.argv[1] == "import":
+        print(import_csv(folder, target))
+    else:
+        print(export_csv(target, folder))
@@ -0,0 +1,51 @@
+"""단건 /production-plan N회 호출 vs /production-plan/batch 1회 호출 비교
+
+실행: python benchmarks/bench_batch.py [N]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+def make_requests(n):
+    products = list(main.get_bom().keys())
+    return [
+        {
+            "product": products[i % len(products)],
+            "plan_qty": 10 + i % 50,
+            "start_date": "2025-01-01",
+            "raw_defect_rate": 0.05,
+            "process_defect_rate": 0.03,
+            "rounding": True,
+        }
+        for i in range(n)
+    ]
+
+
+def run(n):
+    client = TestClient(main.app)
+    payloads = make_requests(n)
+
+    start = time.perf_counter()
+    singles = [client.post("/production-plan", json=p).json() for p in payloads]
+    single_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = client.post("/production-plan/batch", json={"requests": payloads}).json()
+    batch_sec = time.perf_counter() - start
+
+    assert batch["results"] == singles, "배치 결과가 단건 결과와 다릅니다"
+    print(f"N={n}")
+    print(f"  단건 호출 {n}회: {single_sec * 1000:.1f} ms")
+    print(f"  배치 호출 1회: {batch_sec * 1000:.1f} ms")
+    print(f"  속도 향상: {single_sec / batch_sec:.1f}x")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
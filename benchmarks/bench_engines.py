@@ -0,0 +1,80 @@
+"""python 엔진 vs numpy 엔진 비교 (기본: 제품 1,000 × 원재료 5,000)
+
+실행: python benchmarks/bench_engines.py [제품 수] [원재료 수] [제품당 원재료 수]
+"""
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import engine
+import main
+from common import synthetic_catalog
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(n_products, n_materials, per_product):
+    bom, raw_materials, inventory = synthetic_catalog(n_products, n_materials, per_product)
+    products = list(bom)
+    reqs = [
+        main.ProductionRequest(
+            product=products[i],
+            plan_qty=50 + i % 200,
+            start_date=date(2025, 1, 1),
+            raw_defect_rate=0.05,
+            process_defect_rate=0.03,
+            rounding=True,
+        )
+        for i in range(n_products)
+    ]
+
+    compile_sec, compiled = timed(lambda: engine.compile_bom(bom, raw_materials), repeat=1)
+    inventory_vec = engine.inventory_vector(compiled, inventory)
+
+    templates = main.compile_templates(bom, raw_materials)
+    py_sec, py_results = timed(lambda: [main.build_plan(r, templates, inventory) for r in reqs])
+    np_sec, np_results = timed(lambda: [main.build_plan_numpy(r, compiled, inventory_vec) for r in reqs])
+    assert py_results == np_results, "엔진 간 결과가 다릅니다"
+
+    # 전체 제품 수량 벡터에 대한 소요량/부족량/원가
+    quantities = {r.product: main.required_production(r)[0] for r in reqs}
+
+    def python_totals():
+        demand = {}
+        for product, qty in quantities.items():
+            for material, unit_qty in bom[product].items():
+                demand[material] = demand.get(material, 0) + unit_qty * qty
+        shortage = {m: d - inventory.get(m, 0) for m, d in demand.items() if d > inventory.get(m, 0)}
+        cost = sum(d * raw_materials[m]["price"] for m, d in demand.items())
+        return demand, shortage, cost
+
+    def numpy_totals():
+        demand = engine.demand_vector(compiled, engine.product_vector(compiled, quantities))
+        shortage = engine.shortage_vector(demand, inventory_vec)
+        return demand, shortage, engine.cost_of(compiled, demand)
+
+    py_tot_sec, (_, _, py_cost) = timed(python_totals)
+    np_tot_sec, (_, _, np_cost) = timed(numpy_totals)
+    assert abs(py_cost - np_cost) <= 1e-6 * max(1.0, abs(py_cost))
+
+    print(f"제품 {n_products} × 원재료 {n_materials} (제품당 {per_product}개, nnz={len(compiled.data)})")
+    print(f"  BOM 컴파일: {compile_sec * 1000:.1f} ms")
+    print(f"  단건 계획 {len(reqs)}회  python {py_sec * 1000:.1f} ms / numpy {np_sec * 1000:.1f} ms")
+    print(f"  전체 소요량·부족·원가  python {py_tot_sec * 1000:.2f} ms / numpy {np_tot_sec * 1000:.2f} ms"
+          f" ({py_tot_sec / np_tot_sec:.1f}x)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(*(args + [1000, 5000, 20][len(args):]))
@@ -0,0 +1,130 @@
+"""동시 /production-plan/commit 부하 테스트 - 재고 초과 사용(oversubscription) 여부 확인
+
+임시 폴더에 데이터를 복사하고 uvicorn 워커 여러 개를 띄운 뒤, 여러 클라이언트가
+같은 원재료를 동시에 확정 요청한다. 성공한 확정의 차감량 합계가 초기 재고를 넘지 않고
+최종 재고와 정확히 맞아떨어지는지 확인한다.
+
+실행: python benchmarks/bench_inventory_commit.py [--backend csv|sqlite] [--workers 4]
+      [--clients 32] [--requests 400]
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+PRODUCT = "클래식 팥빙수"
+SNAPSHOT_CHECK_INTERVAL = 0.5
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def post(url, payload):
+    data = json.dumps(payload).encode()
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=60) as res:
+        return json.loads(res.read())
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=60) as res:
+        return json.loads(res.read())
+
+
+def wait_ready(base_url, proc):
+    for _ in range(200):
+        if proc.poll() is not None:
+            raise RuntimeError("uvicorn 실행 실패")
+        try:
+            get(f"{base_url}/settings/products")
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("uvicorn 응답 없음")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", default="csv", choices=["csv", "sqlite"])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--stock", type=int, default=100000)
+    args = parser.parse_args()
+
+    data_dir = Path(tempfile.mkdtemp())
+    for name in ("products.csv", "raw_materials.csv", "bom.csv", "inventory.csv"):
+        shutil.copy(BACKEND_DIR / name, data_dir / name)
+    # 얼음 재고만 제한하고 나머지는 충분히
+    with open(data_dir / "inventory.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["material_name", "quantity"])
+        writer.writerow(["얼음", args.stock])
+        for name in ("팥", "연유", "딸기", "복숭아"):
+            writer.writerow([name, 10 ** 12])
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, DATA_DIR=str(data_dir), STORAGE_BACKEND=args.backend,
+               SNAPSHOT_CHECK_INTERVAL=str(SNAPSHOT_CHECK_INTERVAL))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", str(BACKEND_DIR),
+         "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        wait_ready(base_url, proc)
+        payload = {
+            "product": PRODUCT, "plan_qty": 1, "start_date": "2025-01-01",
+            "raw_defect_rate": 0.0, "process_defect_rate": 0.0, "rounding": True,
+        }
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.clients) as pool:
+            results = list(pool.map(
+                lambda _: post(f"{base_url}/production-plan/commit", payload),
+                range(args.requests),
+            ))
+        elapsed = time.perf_counter() - start
+
+        committed = [r for r in results if r.get("committed")]
+        consumed = sum(r["consumed"]["얼음"] for r in committed)
+        # 다른 워커가 쓴 재고는 변경 확인 주기(SNAPSHOT_CHECK_INTERVAL)가 지나야 보인다
+        time.sleep(SNAPSHOT_CHECK_INTERVAL)
+        final_stock = get(f"{base_url}/settings/inventory")["얼음"]
+        ok = consumed <= args.stock and final_stock == args.stock - consumed
+        print(json.dumps({
+            "backend": args.backend,
+            "workers": args.workers,
+            "clients": args.clients,
+            "requests": args.requests,
+            "committed": len(committed),
+            "rejected": len(results) - len(committed),
+            "initial_stock": args.stock,
+            "consumed": consumed,
+            "final_stock": final_stock,
+            "throughput_rps": round(args.requests / elapsed, 1),
+            "oversubscribed": not ok,
+        }, ensure_ascii=False, indent=2))
+        if not ok:
+            sys.exit(1)
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""읽기/쓰기 혼합 부하 테스트 - 요청 종류별 p50/p95/p99 지연 시간
+
+임시 폴더에 데이터를 복사하고 uvicorn을 띄운 뒤, 여러 클라이언트가 설정 조회·계획 계산(읽기)과
+재고 수정·계획 확정(쓰기)을 섞어 보낸다. 읽기 응답에 원재료가 빠져 있거나(반쯤 쓰인 파일)
+요청이 실패하면 errors로 집계한다.
+
+실행: python benchmarks/bench_mixed_load.py [--backend csv|sqlite] [--workers 1]
+      [--clients 32] [--requests 4000] [--write-ratio 0.1]
+"""
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from common import BACKEND_DIR, CSV_NAMES, percentiles, request, uvicorn_server
+
+MATERIALS = ("얼음", "팥", "연유", "딸기", "복숭아")
+PRODUCTS = ("클래식 팥빙수", "딸기 팥빙수", "복숭아 팥빙수")
+
+
+def plan_payload(rng):
+    return {
+        "product": rng.choice(PRODUCTS), "plan_qty": rng.randint(1, 20), "start_date": "2025-01-01",
+        "raw_defect_rate": 0.05, "process_defect_rate": 0.03, "rounding": True,
+    }
+
+
+def make_operation(base_url, rng, write_ratio):
+    """(종류, 호출 함수, 응답 확인 함수)"""
+    if rng.random() < write_ratio:
+        if rng.random() < 0.5:
+            params = urllib.parse.urlencode({"material_name": rng.choice(MATERIALS), "quantity": 10 ** 9})
+            return ("write:inventory_update",
+                    lambda: request(f"{base_url}/settings/inventory/update?{params}", method="POST"),
+                    lambda r: r["status"] == "success")
+        payload = plan_payload(rng)
+        return ("write:commit",
+                lambda: request(f"{base_url}/production-plan/commit", payload, method="POST"),
+                lambda r: "status" in r)
+
+    kind = rng.choice(("read:inventory", "read:bom", "read:plan"))
+    if kind == "read:inventory":
+        return (kind, lambda: request(f"{base_url}/settings/inventory"),
+                lambda r: all(m in r for m in MATERIALS))
+    if kind == "read:bom":
+        return (kind, lambda: request(f"{base_url}/settings/bom"),
+                lambda r: all(p in r for p in PRODUCTS))
+    payload = plan_payload(rng)
+    return (kind, lambda: request(f"{base_url}/production-plan", payload, method="POST"),
+            lambda r: r["status"] == "success")
+
+
+def timed_call(operation):
+    kind, call, check = operation
+    start = time.perf_counter()
+    try:
+        ok = check(call())
+    except (OSError, ValueError, KeyError):
+        ok = False
+    return kind, time.perf_counter() - start, ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", default="csv", choices=["csv", "sqlite"])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data_dir = Path(tempfile.mkdtemp())
+    for name in CSV_NAMES:
+        shutil.copy(BACKEND_DIR / name, data_dir / name)
+
+    try:
+        with uvicorn_server(data_dir, args.backend, args.workers) as base_url:
+            rng = random.Random(args.seed)
+            operations = [make_operation(base_url, rng, args.write_ratio) for _ in range(args.requests)]
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.clients) as pool:
+                results = list(pool.map(timed_call, operations))
+            elapsed = time.perf_counter() - start
+
+            by_kind = {}
+            errors = {}
+            for kind, seconds, ok in results:
+                by_kind.setdefault(kind, []).append(seconds)
+                if not ok:
+                    errors[kind] = errors.get(kind, 0) + 1
+            print(json.dumps({
+                "backend": args.backend,
+                "workers": args.workers,
+                "clients": args.clients,
+                "requests": args.requests,
+                "write_ratio": args.write_ratio,
+                "throughput_rps": round(args.requests / elapsed, 1),
+                "overall": percentiles([seconds for _, seconds, _ in results]),
+                "by_kind": {kind: percentiles(samples) for kind, samples in sorted(by_kind.items())},
+                "errors": errors,
+            }, ensure_ascii=False, indent=2))
+            if errors:
+                sys.exit(1)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""플래너 API 벤치마크 모음 - 결과는 JSON (릴리스 간 성능 회귀 추적용)
+
+1. 합성 카탈로그(제품 수, 원재료 수, 제품당 원재료 수)를 backend CSV 형식으로 임시 폴더에 생성
+2. 프로세스 안 (TestClient): 테이블 로더, 계획 계산, /production-plan, /settings/* 지연 시간
+3. uvicorn 부하 테스트: 동시 클라이언트의 처리량과 요청 종류별 지연 시간 백분위 (읽기 전용,
+   쓰기 혼합 부하는 bench_mixed_load.py)
+
+--baseline으로 이전 결과 JSON을 주면 p50이 --threshold 비율(그리고 --min-delta-ms) 이상
+느려진 항목을 regressions에 담고 종료 코드 1로 끝난다.
+
+실행: python benchmarks/bench_suite.py [--products 1000] [--materials 5000] [--per-product 10]
+      [--repeat 30] [--clients 16] [--requests 2000] [--output result.json] [--baseline old.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from common import BACKEND_DIR, percentiles, request, synthetic_catalog, uvicorn_server, write_catalog
+
+SETTINGS_PATHS = (
+    "/settings/products",
+    "/settings/bom",
+    "/settings/bom/exploded",
+    "/settings/raw-materials",
+    "/settings/inventory",
+    "/settings/snapshot",
+    "/settings/version",
+    "/settings/cache-stats",
+)
+
+
+def sample(fn, repeat):
+    """fn을 repeat번 호출한 시간 표본 (초)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def plan_payloads(products, n, seed):
+    rng = random.Random(seed)
+    return [
+        {
+            "product": rng.choice(products), "plan_qty": 1 + i, "start_date": "2025-01-01",
+            "raw_defect_rate": 0.05, "process_defect_rate": 0.03, "rounding": True,
+        }
+        for i in range(n)
+    ]
+
+
+def run_in_process(data_dir, args):
+    """TestClient로 프로세스 안에서 측정 (main은 환경 변수를 import 시점에 읽음)"""
+    os.environ.update(DATA_DIR=str(data_dir), STORAGE_BACKEND=args.backend, PLAN_ENGINE=args.engine)
+    from fastapi.testclient import TestClient
+
+    import main
+
+    client = TestClient(main.app)
+    results = {}
+
+    parsers = {
+        "products": main.parse_products,
+        "bom": main.parse_bom,
+        "raw_materials": main.parse_raw_materials,
+        "inventory": main.parse_inventory,
+    }
+    for table, parser in parsers.items():
+        results[f"load:{table}"] = sample(lambda: parser(main.default_site.storage.read(table)), args.repeat)
+        results[f"cached:{table}"] = sample(lambda: main.default_site.master_cache.get(table, parser), args.repeat)
+    results["explode_bom"] = sample(lambda: main.explode_bom(main.get_bom()), args.repeat)
+
+    # 계획 계산 자체 (결과 캐시를 거치지 않음)
+    bom = main.get_exploded_bom()
+    templates = main.compile_templates(bom, main.get_raw_materials())
+    inventory = main.get_inventory()
+    payloads = plan_payloads(list(bom), args.repeat, args.seed)
+    reqs = [main.ProductionRequest(**p) for p in payloads]
+    results["plan:compute"] = sample(lambda it=iter(reqs): main.build_plan(next(it), templates, inventory),
+                                     args.repeat)
+
+    # 엔드포인트: 처음 보는 요청(결과 캐시 miss) → 같은 요청 반복(hit)
+    for label in ("miss", "hit"):
+        it = iter(payloads)
+        results[f"POST /production-plan ({label})"] = sample(
+            lambda: client.post("/production-plan", json=next(it)).raise_for_status(), args.repeat
+        )
+    batch = {"requests": plan_payloads(list(bom), args.batch_size, args.seed + 1)}
+    results[f"POST /production-plan/batch ({args.batch_size})"] = sample(
+        lambda: client.post("/production-plan/batch", json=batch).raise_for_status(), max(3, args.repeat // 10)
+    )
+
+    for path in SETTINGS_PATHS:
+        results[f"GET {path}"] = sample(lambda: client.get(path).raise_for_status(), args.repeat)
+
+    return {name: percentiles(samples) for name, samples in results.items()}
+
+
+def run_load_test(data_dir, args, products):
+    """uvicorn에 동시 읽기 요청 - 처리량과 요청 종류별 지연 시간"""
+    rng = random.Random(args.seed)
+    payloads = plan_payloads(products, args.requests, args.seed)
+    kinds = ["POST /production-plan", *(f"GET {path}" for path in SETTINGS_PATHS[:5])]
+
+    with uvicorn_server(data_dir, args.backend, args.workers, env={"PLAN_ENGINE": args.engine}) as base_url:
+        operations = []
+        for i in range(args.requests):
+            kind = rng.choice(kinds)
+            if kind.startswith("POST"):
+                operations.append((kind, f"{base_url}/production-plan", payloads[i]))
+            else:
+                operations.append((kind, base_url + kind.split(" ", 1)[1], None))
+
+        def call(operation):
+            kind, url, payload = operation
+            start = time.perf_counter()
+            try:
+                request(url, payload, "POST" if payload else "GET")
+                ok = True
+            except (OSError, ValueError):
+                ok = False
+            return kind, time.perf_counter() - start, ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.clients) as pool:
+            results = list(pool.map(call, operations))
+        elapsed = time.perf_counter() - start
+
+    by_kind = {}
+    for kind, seconds, _ in results:
+        by_kind.setdefault(kind, []).append(seconds)
+    return {
+        "workers": args.workers,
+        "clients": args.clients,
+        "requests": args.requests,
+        "throughput_rps": round(args.requests / elapsed, 1),
+        "errors": sum(1 for _, _, ok in results if not ok),
+        "overall": percentiles([seconds for _, seconds, _ in results]),
+        "by_kind": {kind: percentiles(samples) for kind, samples in sorted(by_kind.items())},
+    }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                             capture_output=True, text=True, timeout=10)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def find_regressions(result, baseline, threshold, min_delta_ms):
+    """같은 이름의 측정값 p50이 baseline보다 threshold 비율 이상 느려진 항목
+
+    아주 짧은 측정값의 잡음을 거르기 위해 min_delta_ms 이상 차이 나는 것만 센다.
+    """
+    def flatten(data):
+        metrics = {name: stats["p50_ms"] for name, stats in data.get("in_process", {}).items()}
+        load = data.get("load_test") or {}
+        for kind, stats in load.get("by_kind", {}).items():
+            metrics[f"load {kind}"] = stats["p50_ms"]
+        return metrics
+
+    old, new = flatten(baseline), flatten(result)
+    regressions = []
+    for name, value in new.items():
+        if name not in old or old[name] <= 0 or value - old[name] < min_delta_ms:
+            continue
+        if value > old[name] * (1 + threshold):
+            regressions.append({"name": name, "baseline_p50_ms": old[name], "p50_ms": value,
+                                "change": round(value / old[name] - 1, 3)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--materials", type=int, default=5000)
+    parser.add_argument("--per-product", type=int, default=10)
+    parser.add_argument("--backend", default="csv", choices=["csv", "sqlite"])
+    parser.add_argument("--engine", default="python", choices=["python", "numpy"])
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000, help="0이면 부하 테스트 생략")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="결과 JSON 파일 (없으면 표준 출력)")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--min-delta-ms", type=float, default=0.05)
+    args = parser.parse_args()
+
+    data_dir = Path(tempfile.mkdtemp())
+    try:
+        bom, raw_materials, inventory = synthetic_catalog(
+            args.products, args.materials, args.per_product, seed=args.seed
+        )
+        write_catalog(data_dir, bom, raw_materials, inventory, seed=args.seed)
+
+        result = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "git_commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "catalog": {"products": args.products, "materials": args.materials,
+                            "per_product": args.per_product, "bom_rows": args.products * args.per_product},
+                "backend": args.backend,
+                "engine": args.engine,
+                "repeat": args.repeat,
+                "seed": args.seed,
+            },
+            "in_process": run_in_process(data_dir, args),
+            "load_test": run_load_test(data_dir, args, list(bom)) if args.requests > 0 else None,
+        }
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                result["regressions"] = find_regressions(
+                    result, json.load(f), args.threshold, args.min_delta_ms
+                )
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if result.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
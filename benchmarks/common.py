@@ -0,0 +1,105 @@
+"""벤치마크 공용 도구 - 합성 카탈로그, uvicorn 실행, 지연 시간 통계"""
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+CSV_NAMES = ("products.csv", "raw_materials.csv", "bom.csv", "inventory.csv")
+
+sys.path.insert(0, str(BACKEND_DIR))
+
+from storage import TABLES, write_csv  # noqa: E402
+
+
+def synthetic_catalog(n_products, n_materials, per_product, seed=0):
+    """제품당 per_product개 원재료를 무작위로 쓰는 BOM, 원재료 단가, 재고 (dict)"""
+    rng = random.Random(seed)
+    materials = [f"원재료{i}" for i in range(n_materials)]
+    bom = {
+        f"제품{p}": {m: float(rng.randint(1, 500)) for m in rng.sample(materials, per_product)}
+        for p in range(n_products)
+    }
+    raw_materials = {m: {"unit": "g", "price": rng.randint(1, 200)} for m in materials}
+    inventory = {m: rng.randint(0, 2_000_000) for m in materials}
+    return bom, raw_materials, inventory
+
+
+def write_catalog(data_dir, bom, raw_materials, inventory, seed=0):
+    """합성 카탈로그를 backend와 같은 CSV 형식으로 저장 (제품 판매가는 무작위)"""
+    rng = random.Random(seed)
+    data_dir = Path(data_dir)
+    rows = {
+        "products": [{"product_name": p, "price": rng.randint(5_000, 20_000)} for p in bom],
+        "raw_materials": [{"material_name": m, **info} for m, info in raw_materials.items()],
+        "bom": [
+            {"product_name": p, "material_name": m, "quantity": q}
+            for p, components in bom.items() for m, q in components.items()
+        ],
+        "inventory": [{"material_name": m, "quantity": q} for m, q in inventory.items()],
+    }
+    for table, spec in TABLES.items():
+        write_csv(data_dir / spec["csv"], spec["fields"], rows[table])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(url, payload=None, method="GET"):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, method=method,
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=60) as res:
+        return json.loads(res.read())
+
+
+def wait_ready(base_url, proc):
+    for _ in range(400):
+        if proc.poll() is not None:
+            raise RuntimeError("uvicorn 실행 실패")
+        try:
+            request(f"{base_url}/settings/version")
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("uvicorn 응답 없음")
+
+
+@contextmanager
+def uvicorn_server(data_dir, backend="csv", workers=1, env=None):
+    """data_dir의 데이터로 uvicorn을 띄우고 기본 URL을 넘김 (블록이 끝나면 종료)"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, DATA_DIR=str(data_dir), STORAGE_BACKEND=backend, **(env or {}))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", str(BACKEND_DIR),
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        wait_ready(base_url, proc)
+        yield base_url
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def percentiles(samples):
+    """초 단위 표본 → 밀리초 단위 평균/백분위 요약"""
+    samples = sorted(samples)
+
+    def at(p):
+        return round(samples[min(len(samples) - 1, int(p / 100 * len(samples)))] * 1000, 3)
+
+    return {"count": len(samples), "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+            "p50_ms": at(50), "p95_ms": at(95), "p99_ms": at(99),
+            "max_ms": round(samples[-1] * 1000, 3)}
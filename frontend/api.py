@@ -0,0 +1,151 @@
+"""백엔드 API 데이터 계층
+
+- 연결 재사용: 앱 전체에서 requests.Session 하나를 공유 (st.cache_resource)
+- 캐시: 설정 데이터는 백엔드의 테이블별 데이터 버전을 키로 st.cache_data에 보관
+  → 데이터가 그대로면 rerun 시 HTTP 요청은 버전 확인 1회(VERSION_TTL 안이면 0회)
+- 무효화: 데이터를 바꾸는 요청(post(..., mutates=True)) 뒤에는 버전 캐시를 비움
+- 큰 카탈로그: search()로 필요한 페이지만 받음 (검색·정렬·필터는 서버 색인에서 처리)
+- 오래 걸리는 계산: submit_job으로 백그라운드 작업을 제출하고 wait_job으로 진행률을 받으며 대기
+"""
+import time
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+BASE_URL = "http://localhost:8000"
+
+VERSION_TTL = 2  # 초 - 이 시간 안의 rerun은 버전 확인도 생략
+DATA_TTL = 600  # 초 - 버전이 같아도 이 시간이 지나면 다시 받음
+JOB_POLL_INTERVAL = 0.3  # 초 - 작업 상태 확인 주기
+PAGE_SIZE = 50  # 검색·페이지 조회 기본 행 수
+
+SETTINGS_TABLES = {
+    "products": "/settings/products",
+    "bom": "/settings/bom",
+    "raw_materials": "/settings/raw-materials",
+    "inventory": "/settings/inventory",
+}
+
+
+@st.cache_resource
+def get_session():
+    """연결 풀을 공유하는 HTTP 세션"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_data(ttl=VERSION_TTL, show_spinner=False)
+def data_versions():
+    """테이블별 데이터 버전"""
+    res = get_session().get(f"{BASE_URL}/settings/version")
+    res.raise_for_status()
+    return res.json()
+
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def _fetch(path, version):
+    """version은 캐시 키로만 사용 (버전이 바뀌면 새로 받음)"""
+    res = get_session().get(f"{BASE_URL}{path}")
+    res.raise_for_status()
+    return res.json()
+
+
+def get_settings(table):
+    """설정 데이터 (products, bom, raw_materials, inventory)"""
+    return _fetch(SETTINGS_TABLES[table], data_versions()[table])
+
+
+@st.cache_data(ttl=DATA_TTL, max_entries=256, show_spinner=False)
+def _fetch_page(path, params, version):
+    """params는 (이름, 값) 튜플 - 같은 조건·같은 데이터 버전이면 캐시된 페이지 사용"""
+    res = get_session().get(f"{BASE_URL}{path}", params=dict(params))
+    res.raise_for_status()
+    return res.json()
+
+
+def search(table, q="", offset=0, limit=PAGE_SIZE, **params):
+    """테이블 한 페이지 {"total", "items", ...} - params: mode, sort, order, 필드 값 필터, min_/max_<필드>"""
+    params.update(q=q, offset=offset, limit=limit)
+    query = tuple(sorted((name, value) for name, value in params.items() if value is not None))
+    return _fetch_page(f"{SETTINGS_TABLES[table]}/search", query, data_versions()[table])
+
+
+def search_all(table, page_size=500, **params):
+    """조건에 맞는 행 전체 (서버 최대 페이지 크기 단위로 나눠 받음) - 한 제품의 BOM처럼 결과가 작은 조회용"""
+    items = []
+    while True:
+        page = search(table, offset=len(items), limit=page_size, **params)
+        items.extend(page["items"])
+        if not page["items"] or len(items) >= page["total"]:
+            return items
+
+
+def get_products():
+    return get_settings("products")
+
+
+def get_bom():
+    return get_settings("bom")
+
+
+def get_raw_materials():
+    return get_settings("raw_materials")
+
+
+def get_inventory():
+    return get_settings("inventory")
+
+
+def invalidate():
+    """캐시된 데이터 버전 비우기
+
+    설정 데이터는 테이블별 버전을 키로 캐시되어 있으므로, 버전만 다시 받으면
+    실제로 바뀐 테이블만 새로 받는다.
+    """
+    data_versions.clear()
+
+
+def post(path, json=None, params=None, mutates=False):
+    """POST 요청 (mutates=True면 응답 후 캐시 무효화)"""
+    res = get_session().post(f"{BASE_URL}{path}", json=json, params=params)
+    if mutates:
+        invalidate()
+    return res
+
+
+def submit_job(kind, payload, params=None):
+    """계획 API를 백그라운드 작업으로 제출 - 응답의 job.id로 진행률·결과 조회"""
+    return post(f"/jobs/{kind}", json=payload, params=params).json()
+
+
+def wait_job(job_id, on_progress=None):
+    """작업이 끝날 때까지 상태를 확인하며 대기 (on_progress(작업 상태)) - 최종 결과 반환
+
+    취소·실패한 작업은 {"status": "error", ...}를 반환한다.
+    """
+    session = get_session()
+    while True:
+        res = session.get(f"{BASE_URL}/jobs/{job_id}")
+        res.raise_for_status()
+        body = res.json()
+        if body.get("status") != "success":
+            return body
+        job = body["job"]
+        if on_progress is not None:
+            on_progress(job)
+        if job["state"] == "succeeded":
+            res = session.get(f"{BASE_URL}/jobs/{job_id}/result")
+            res.raise_for_status()
+            return res.json()
+        if job["state"] in ("failed", "cancelled"):
+            message = "작업이 취소되었습니다" if job["state"] == "cancelled" else f"작업 실패: {job['error']}"
+            return {"status": "error", "message": message}
+        time.sleep(JOB_POLL_INTERVAL)
+
+
+def cancel_job(job_id):
+    return post(f"/jobs/{job_id}/cancel").json()
@@ -1,42 +1,46 @@
 import streamlit as st
-import requests
 from datetime import date
+import altair as alt
+import numpy as np
 import pandas as pd
 
+import api
+
 st.set_page_config(layout="wide")
 st.title("🍧 팥빙수 생산계획 시뮬레이터")
 
-BASE_URL = "http://localhost:8000"
 
 # 탭 상태 관리
 if 'selected_tab' not in st.session_state:
     st.session_state.selected_tab = 0
 
 # 탭 생성
-tab1, tab2 = st.tabs(["📊 생산 계획", "⚙️ 설정"])
+tab1, tab3, tab2 = st.tabs(["📊 생산 계획", "🗺️ 민감도 분석", "⚙️ 설정"])
 
 with tab1:
     # 입력 영역
     try:
         # 동적으로 제품 목록 로드
-        products_list = list(requests.get(f"{BASE_URL}/settings/products").json().keys())
+        products_list = list(api.get_products().keys())
         product = st.selectbox(
             "제품 선택",
             products_list if products_list else ["제품 없음"]
         )
     except:
+        products_list = ["클래식 팥빙수", "딸기 팥빙수"]
         product = st.selectbox(
             "제품 선택",
-            ["클래식 팥빙수", "딸기 팥빙수"]
+            products_list
         )
 
     plan_qty = st.number_input("생산 계획 수량", min_value=1, value=100)
     start_date = st.date_input("시작일", value=date.today())
 
-    raw_defect = st.number_input("원료 불량률", min_value=0.0, max_value=1.0, value=0.05)
-    process_defect = st.number_input("공정 불량률", min_value=0.0, max_value=1.0, value=0.05)
+    raw_defect = st.number_input("원료 불량률", min_value=0.0, max_value=0.99, value=0.05)
+    process_defect = st.number_input("공정 불량률", min_value=0.0, max_value=0.99, value=0.05)
 
     rounding = st.checkbox("소수 보정(올림)", value=True)
+    commit = st.checkbox("계획 확정 (재고 차감)", value=False)
 
     # 실행 버튼
     if st.button("생산 계획 생성"):
@@ -50,7 +54,8 @@ with tab1:
         }
 
         try:
-            res = requests.post(f"{BASE_URL}/production-plan", json=payload)
+            endpoint = "/production-plan/commit" if commit else "/production-plan"
+            res = api.post(endpoint, json=payload, mutates=commit)
 
             if res.status_code == 200:
                 result = res.json()
@@ -76,6 +81,8 @@ with tab1:
                     
                     st.info("💡 재고관리 탭에서 부족한 재료를 입고하세요!")
                 else:
+                    if result.get("committed"):
+                        st.success("✅ 생산 계획이 확정되어 재고에서 차감되었습니다")
                     st.subheader("📋 생산 계획 결과")
                     
                     # 기본 정보
@@ -129,6 +136,102 @@ with tab1:
         except Exception as e:
             st.error(f"오류: {str(e)}")
 
+with tab3:
+    st.subheader("🗺️ 계획 수량 × 불량률 민감도 분석")
+    st.caption("격자 전체를 백그라운드 작업으로 계산한 뒤, 화면 조작은 서버 호출 없이 처리합니다")
+
+    sweep_product = st.selectbox(
+        "제품 선택",
+        products_list if products_list else ["제품 없음"],
+        key="sweep_product"
+    )
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        qty_min = st.number_input("최소 수량", min_value=1, value=10, key="sweep_qty_min")
+        qty_max = st.number_input("최대 수량", min_value=1, value=2000, key="sweep_qty_max")
+        qty_steps = st.number_input("수량 구간 수", min_value=1, max_value=500, value=200, key="sweep_qty_steps")
+    with col2:
+        raw_max = st.number_input("원료 불량률 최대", min_value=0.0, max_value=0.95, value=0.2, key="sweep_raw_max")
+        raw_steps = st.number_input("원료 불량률 구간 수", min_value=1, max_value=100, value=20, key="sweep_raw_steps")
+    with col3:
+        process_max = st.number_input("공정 불량률 최대", min_value=0.0, max_value=0.95, value=0.2, key="sweep_process_max")
+        process_steps = st.number_input("공정 불량률 구간 수", min_value=1, max_value=100, value=20, key="sweep_process_steps")
+    sweep_rounding = st.checkbox("소수 보정(올림)", value=True, key="sweep_rounding")
+
+    if st.button("민감도 분석 실행"):
+        payload = {
+            "product": sweep_product,
+            "plan_qtys": sorted({int(q) for q in np.linspace(qty_min, max(qty_min, qty_max), int(qty_steps))}),
+            "raw_defect_rates": [round(r, 4) for r in np.linspace(0, raw_max, int(raw_steps))],
+            "process_defect_rates": [round(r, 4) for r in np.linspace(0, process_max, int(process_steps))],
+            "rounding": sweep_rounding
+        }
+        try:
+            submitted = api.submit_job("sweep", payload)
+            if submitted.get("status") == "success":
+                st.session_state.sweep_job = submitted["job"]["id"]
+            else:
+                st.error(f"❌ {submitted.get('message', '작업 제출 실패')}")
+        except Exception as e:
+            st.error(f"오류: {str(e)}")
+
+    # 진행 중인 작업은 다른 위젯을 조작해 rerun되어도 이어서 진행률을 표시
+    sweep_job = st.session_state.get("sweep_job")
+    if sweep_job:
+        if st.button("작업 취소", key="sweep_cancel"):
+            api.cancel_job(sweep_job)
+            del st.session_state.sweep_job
+            st.warning("민감도 분석을 취소했습니다")
+        else:
+            progress_bar = st.progress(0.0, text="대기 중...")
+
+            def show_progress(job):
+                text = "대기 중..." if job["state"] == "queued" else f"계산 중... {job['progress']:.0%}"
+                progress_bar.progress(job["progress"], text=text)
+
+            try:
+                result = api.wait_job(sweep_job, show_progress)
+                del st.session_state.sweep_job
+                progress_bar.empty()
+                if result.get("status") == "success":
+                    st.session_state.sweep_result = result
+                else:
+                    st.error(f"❌ {result.get('message', '계산 실패')}")
+            except Exception as e:
+                st.session_state.pop("sweep_job", None)
+                st.error(f"오류: {str(e)}")
+
+    sweep = st.session_state.get("sweep_result")
+    if sweep:
+        n_qty, n_raw, n_process = sweep["shape"]
+        unit_cost = np.array(sweep["unit_cost"]).reshape(n_qty, n_raw, n_process)
+        shortage = np.array(sweep["shortage"]).reshape(n_qty, n_raw, n_process)
+
+        qty_index = st.select_slider(
+            "계획 수량",
+            options=list(range(n_qty)),
+            format_func=lambda i: f"{sweep['plan_qtys'][i]:,}개",
+            key="sweep_qty_index"
+        )
+        raw_grid, process_grid = np.meshgrid(
+            sweep["raw_defect_rates"], sweep["process_defect_rates"], indexing="ij"
+        )
+        df_heat = pd.DataFrame({
+            "원료 불량률": raw_grid.ravel(),
+            "공정 불량률": process_grid.ravel(),
+            "객단가(원)": unit_cost[qty_index].ravel(),
+            "재고 부족": shortage[qty_index].ravel(),
+        })
+        heatmap = alt.Chart(df_heat).mark_rect().encode(
+            x=alt.X("원료 불량률:O", axis=alt.Axis(format=".2f")),
+            y=alt.Y("공정 불량률:O", axis=alt.Axis(format=".2f"), sort="descending"),
+            color=alt.Color("객단가(원):Q", scale=alt.Scale(scheme="orangered")),
+            opacity=alt.condition(alt.datum["재고 부족"], alt.value(0.35), alt.value(1.0)),
+            tooltip=["원료 불량률", "공정 불량률", "객단가(원)", "재고 부족"]
+        )
+        st.altair_chart(heatmap, use_container_width=True)
+        st.caption(f"{sweep['product']} · 흐리게 표시된 칸은 현재 재고로 생산할 수 없는 조합입니다")
+
 with tab2:
     st.subheader("⚙️ 설정 테이블")# test
     
@@ -141,7 +244,7 @@ with tab2:
     with settings_tab1:
         st.write("### 품목관리")
         try:
-            products = requests.get(f"{BASE_URL}/settings/products").json()
+            products = api.get_products()
             products_data = [
                 {"제품명": name, "가격(원)": price["price"]}
                 for name, price in products.items()
@@ -160,8 +263,9 @@ with tab2:
             if st.button("제품 추가", key="add_product"):
                 if new_product:
                     try:
-                        res = requests.post(
-                            f"{BASE_URL}/settings/products/add",
+                        res = api.post(
+                            "/settings/products/add",
+                            mutates=True,
                             params={"product_name": new_product, "price": new_price}
                         )
                         if res.status_code == 200:
@@ -182,58 +286,81 @@ with tab2:
     with settings_tab2:
         st.write("### BOM (Bill of Materials) 관리")
         try:
-            bom = requests.get(f"{BASE_URL}/settings/bom").json()
-            products = requests.get(f"{BASE_URL}/settings/products").json()
-            raw_materials = requests.get(f"{BASE_URL}/settings/raw-materials").json()
-            
-            # 모든 제품 표시 (BOM이 없는 새 제품도 포함)
-            for product in products.keys():
-                st.write(f"**{product}**")
-                
-                if product in bom and bom[product]:
-                    bom_data = [
-                        {"원재료": name, "수량(g)": qty}
-                        for name, qty in bom[product].items()
-                    ]
-                    df_bom = pd.DataFrame(bom_data)
+            # 제품이 많아도 검색 결과 한 페이지와 선택한 제품의 BOM만 받아서 표시
+            product_query = st.text_input(
+                "제품 검색 (이름 일부 또는 초성, 예: ㅍㅂㅅ)",
+                key="bom_product_query"
+            )
+            product_page = api.search("products", q=product_query, mode="fuzzy")
+            product_names = [item["product_name"] for item in product_page["items"]]
+
+            if not product_names:
+                st.info("검색 결과가 없습니다")
+            else:
+                if product_page["total"] > len(product_names):
+                    st.caption(
+                        f"검색 결과 {product_page['total']:,}개 중 {len(product_names)}개 표시 - 검색어를 더 입력하세요"
+                    )
+                product = st.selectbox("제품 선택", product_names, key="bom_product")
+
+                bom_rows = api.search_all("bom", product_name=product)
+                if bom_rows:
+                    df_bom = pd.DataFrame([
+                        {"원재료": row["material_name"], "수량(g)": row["quantity"]}
+                        for row in bom_rows
+                    ])
                     st.dataframe(df_bom, use_container_width=True)
                 else:
                     st.info("아직 구성된 원재료가 없습니다")
-                
+
                 st.write(f"*{product}에 원재료 추가*")
-                materials_list = list(raw_materials.keys())
-                
+                material_query = st.text_input("원재료 검색", key="bom_material_query")
+                # 다른 제품도 중간재(반제품)로 구성에 넣을 수 있음
+                materials_list = [
+                    item["material_name"]
+                    for item in api.search("raw_materials", q=material_query, mode="fuzzy")["items"]
+                ] + [
+                    item["product_name"]
+                    for item in api.search("products", q=material_query, mode="fuzzy")["items"]
+                    if item["product_name"] != product
+                ]
+
                 col1, col2 = st.columns([2, 1])
                 with col1:
                     sel_material = st.selectbox(
                         "원재료 선택",
                         materials_list,
-                        key=f"bom_material_{product}"
+                        key="bom_material"
                     )
                 with col2:
                     bom_qty = st.number_input(
                         "수량(g)",
                         min_value=0.0,
                         value=0.0,
-                        key=f"bom_qty_{product}"
+                        key="bom_qty"
                     )
-                
-                if st.button("BOM 추가", key=f"add_bom_{product}"):
-                    try:
-                        res = requests.post(
-                            f"{BASE_URL}/settings/bom/add",
-                            params={
-                                "product_name": product,
-                                "material_name": sel_material,
-                                "quantity": bom_qty
-                            }
-                        )
-                        if res.status_code == 200:
-                            st.success("✅ BOM이 추가되었습니다!")
-                            st.rerun()
-                    except Exception as e:
-                        st.error(f"오류: {str(e)}")
-                st.divider()
+
+                if st.button("BOM 추가", key="add_bom"):
+                    if not sel_material:
+                        st.warning("원재료를 선택하세요")
+                    else:
+                        try:
+                            res = api.post(
+                                "/settings/bom/add",
+                                mutates=True,
+                                params={
+                                    "product_name": product,
+                                    "material_name": sel_material,
+                                    "quantity": bom_qty
+                                }
+                            )
+                            if res.status_code == 200 and res.json().get("status") == "error":
+                                st.error(res.json()["message"])
+                            elif res.status_code == 200:
+                                st.success("✅ BOM이 추가되었습니다!")
+                                st.rerun()
+                        except Exception as e:
+                            st.error(f"오류: {str(e)}")
         except Exception as e:
             st.error(f"서버 연결 오류: {str(e)}")
     
@@ -241,7 +368,7 @@ with tab2:
     with settings_tab3:
         st.write("### 원재료 단가관리")
         try:
-            materials = requests.get(f"{BASE_URL}/settings/raw-materials").json()
+            materials = api.get_raw_materials()
             materials_data = [
                 {"원재료": name, "단위": info["unit"], "단가(원)": info["price"]}
                 for name, info in materials.items()
@@ -262,8 +389,9 @@ with tab2:
             if st.button("원재료 추가", key="add_material"):
                 if material_name:
                     try:
-                        res = requests.post(
-                            f"{BASE_URL}/settings/raw-materials/add",
+                        res = api.post(
+                            "/settings/raw-materials/add",
+                            mutates=True,
                             params={
                                 "material_name": material_name,
                                 "unit": unit,
@@ -286,13 +414,45 @@ with tab2:
     with settings_tab4:
         st.write("### 재고관리")
         try:
-            inventory = requests.get(f"{BASE_URL}/settings/inventory").json()
-            inventory_data = [
-                {"원재료": name, "현재재고(g)": qty}
-                for name, qty in inventory.items()
-            ]
-            df_inventory = pd.DataFrame(inventory_data)
-            st.dataframe(df_inventory, use_container_width=True)
+            # 검색·정렬은 서버에서 하고 현재 페이지만 받아서 표시
+            inventory_sorts = {
+                "이름순": (None, "asc"),
+                "재고 적은 순": ("quantity", "asc"),
+                "재고 많은 순": ("quantity", "desc"),
+            }
+            inventory_page_size = 50
+            col1, col2, col3 = st.columns([2, 1, 1])
+            with col1:
+                inventory_query = st.text_input("원재료 검색 (이름 일부 또는 초성)", key="inventory_query")
+            with col2:
+                inventory_sort = st.selectbox("정렬", list(inventory_sorts), key="inventory_sort")
+            with col3:
+                inventory_page_no = st.number_input("페이지", min_value=1, value=1, key="inventory_page")
+            sort, order = inventory_sorts[inventory_sort]
+            inventory_page = api.search(
+                "inventory",
+                q=inventory_query,
+                mode="fuzzy",
+                sort=sort,
+                order=order,
+                offset=(int(inventory_page_no) - 1) * inventory_page_size,
+                limit=inventory_page_size
+            )
+            inventory = {row["material_name"]: row["quantity"] for row in inventory_page["items"]}
+            page_count = max(1, -(-inventory_page["total"] // inventory_page_size))
+            if inventory:
+                inventory_data = [
+                    {"원재료": name, "현재재고(g)": qty}
+                    for name, qty in inventory.items()
+                ]
+                df_inventory = pd.DataFrame(inventory_data)
+                st.dataframe(df_inventory, use_container_width=True)
+            else:
+                st.info("표시할 재고가 없습니다")
+            st.caption(f"전체 {inventory_page['total']:,}개 · {int(inventory_page_no)}/{page_count} 페이지")
+
+            # 수정·삭제 대상은 현재 페이지가 아니라 전체 재고에서 고름
+            all_inventory = {row["material_name"]: row["quantity"] for row in api.search_all("inventory")}
             
             st.divider()
             st.write("**재고 입고/출고**")
@@ -300,11 +460,11 @@ with tab2:
             with col1:
                 inventory_item = st.selectbox(
                     "원재료 선택",
-                    list(inventory.keys()),
+                    list(all_inventory.keys()),
                     key="inventory_select"
                 )
             with col2:
-                current_qty = inventory.get(inventory_item, 0)
+                current_qty = all_inventory.get(inventory_item, 0)
                 st.metric("현재 재고", f"{current_qty}g")
             
             new_qty = st.number_input(
@@ -314,10 +474,11 @@ with tab2:
                 key="new_qty"
             )
             
-            if st.button("재고 수정", key="update_inventory"):
+            if st.button("재고 수정", key="update_inventory", disabled=inventory_item is None):
                 try:
-                    res = requests.post(
-                        f"{BASE_URL}/settings/inventory/update",
+                    res = api.post(
+                        "/settings/inventory/update",
+                        mutates=True,
                         params={
                             "material_name": inventory_item,
                             "quantity": int(new_qty)
@@ -347,8 +508,9 @@ with tab2:
             if st.button("재고 추가", key="add_inventory"):
                 if new_inventory_name:
                     try:
-                        res = requests.post(
-                            f"{BASE_URL}/settings/inventory/add",
+                        res = api.post(
+                            "/settings/inventory/add",
+                            mutates=True,
                             params={
                                 "material_name": new_inventory_name,
                                 "quantity": int(new_inventory_qty)
@@ -370,14 +532,15 @@ with tab2:
             with col1:
                 delete_item = st.selectbox(
                     "삭제할 원재료 선택",
-                    list(inventory.keys()),
+                    list(all_inventory.keys()),
                     key="delete_inventory_select"
                 )
             
-            if st.button("재고 삭제", key="delete_inventory"):
+            if st.button("재고 삭제", key="delete_inventory", disabled=delete_item is None):
                 try:
-                    res = requests.post(
-                        f"{BASE_URL}/settings/inventory/delete",
+                    res = api.post(
+                        "/settings/inventory/delete",
+                        mutates=True,
                         params={"material_name": delete_item}
                     )
                     if res.status_code == 200:
@@ -0,0 +1,27 @@
+"""API 테스트 공통 설정 - backend CSV를 임시 폴더에 복사해 그 데이터로 서버 앱을 띄움"""
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+DATA_DIR = Path(tempfile.mkdtemp(prefix="patbingsu-test-"))
+for name in ("products.csv", "raw_materials.csv", "bom.csv", "inventory.csv"):
+    shutil.copy(BACKEND_DIR / name, DATA_DIR)
+
+# main은 import할 때 DATA_DIR 데이터로 기본 사이트를 만들므로 먼저 환경 변수 지정
+os.environ["DATA_DIR"] = str(DATA_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
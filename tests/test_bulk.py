@@ -0,0 +1,46 @@
+import pytest
+
+
+def upload(client, table, text, **params):
+    return client.post(f"/settings/{table}/bulk", params={"format": "csv", **params},
+                       content=text.encode("utf-8")).json()
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", "NaN", "Infinity"])
+def test_non_finite_bom_quantity_rejected(client, value):
+    body = upload(client, "bom", f"product_name,material_name,quantity\n클래식 팥빙수,팥,{value}\n")
+    assert body["applied"] == 0
+    assert body["error_count"] == 1
+    assert body["errors"][0]["row"] == 1
+
+
+def test_reported_rows_leave_data_readable(client):
+    text = "product_name,material_name,quantity\n클래식 팥빙수,팥,nan\n딸기 팥빙수,팥,inf\n"
+    body = upload(client, "bom", text)
+    assert (body["applied"], body["error_count"]) == (0, 2)
+    assert client.get("/settings/bom").status_code == 200
+    snapshot = client.get("/settings/snapshot")
+    assert snapshot.status_code == 200
+    snapshot.json()
+
+
+@pytest.mark.parametrize("table, text", [
+    ("bom", "product_name,material_name,quantity\n클래식 팥빙수,팥,-3\n"),
+    ("inventory", "material_name,quantity\n팥,-100\n"),
+    ("inventory", "material_name,quantity\n팥,inf\n"),
+    ("raw-materials", "material_name,unit,price\n팥,g,-5\n"),
+])
+def test_negative_or_invalid_values_rejected(client, table, text):
+    body = upload(client, table, text, dry_run=True)
+    assert (body["applied"], body["error_count"]) == (0, 1)
+
+
+def test_jsonl_nan_rejected(client):
+    res = client.post("/settings/bom/bulk", params={"format": "jsonl", "dry_run": True},
+                      content='{"product_name": "클래식 팥빙수", "material_name": "팥", "quantity": NaN}\n'.encode())
+    assert res.json()["error_count"] == 1
+
+
+def test_valid_row_dry_run(client):
+    body = upload(client, "bom", "product_name,material_name,quantity\n클래식 팥빙수,팥,0.5\n", dry_run=True)
+    assert (body["status"], body["error_count"]) == ("success", 0)
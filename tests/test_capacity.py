@@ -0,0 +1,12 @@
+import pytest
+
+
+def test_capacity_success(client):
+    body = client.post("/production-capacity", json={"raw_defect_rate": 0.05, "optimize_mix": True}).json()
+    assert body["status"] == "success"
+    assert body["max_producible"]
+
+
+@pytest.mark.parametrize("changes", [{"raw_defect_rate": 1.0}, {"process_defect_rate": 1.2}, {"raw_defect_rate": -0.5}])
+def test_defect_rate_out_of_range(client, changes):
+    assert client.post("/production-capacity", json=changes).status_code == 422
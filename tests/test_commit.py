@@ -0,0 +1,48 @@
+import pytest
+
+REQUEST = {
+    "product": "클래식 팥빙수",
+    "plan_qty": 10,
+    "start_date": "2026-01-01",
+    "raw_defect_rate": 0.05,
+    "process_defect_rate": 0.03,
+    "rounding": True,
+}
+
+
+def stock(client):
+    return client.get("/settings/inventory").json()
+
+
+@pytest.mark.parametrize("changes", [
+    {"plan_qty": -500},
+    {"plan_qty": 0},
+    {"raw_defect_rate": 1.0},
+    {"raw_defect_rate": -0.1},
+    {"process_defect_rate": 1.5},
+])
+def test_invalid_request_rejected(client, changes):
+    before = stock(client)
+    res = client.post("/production-plan/commit", json={**REQUEST, **changes})
+    assert res.status_code == 422
+    assert stock(client) == before
+
+
+def test_zero_consumption_not_committed(client):
+    client.post("/settings/products/add", params={"product_name": "테스트 빙수", "price": 1000})
+    client.post("/settings/bom/add", params={"product_name": "테스트 빙수", "material_name": "얼음", "quantity": 0})
+    before = stock(client)
+    body = client.post("/production-plan/commit", json={**REQUEST, "product": "테스트 빙수"}).json()
+    assert body["status"] == "error"
+    assert body["invalid_consumption"] == {"얼음": 0}
+    assert stock(client) == before
+
+
+def test_commit_deducts(client):
+    before = stock(client)
+    body = client.post("/production-plan/commit", json=REQUEST).json()
+    assert body["status"] == "success" and body["committed"]
+    after = stock(client)
+    for name, qty in body["consumed"].items():
+        assert qty > 0
+        assert after[name] == before[name] - qty
@@ -0,0 +1,104 @@
+"""원가 테이블 - BOM·단가 변경을 증분 반영한 결과가 처음부터 다시 만든 결과와 같은지"""
+import pytest
+
+import costing
+import main
+
+BOM = {
+    "클래식 팥빙수": {"얼음": 200, "팥": 50, "연유": 20},
+    "딸기 팥빙수": {"얼음": 200, "딸기 토핑": 1, "연유": 20},
+    "딸기 토핑": {"딸기": 30, "설탕": 5},
+    "빙수 세트": {"클래식 팥빙수": 1, "딸기 팥빙수": 1, "컵": 2},
+}
+RAW_MATERIALS = {
+    "얼음": {"unit": "g", "price": 1}, "팥": {"unit": "g", "price": 12}, "연유": {"unit": "g", "price": 8},
+    "딸기": {"unit": "g", "price": 20}, "설탕": {"unit": "g", "price": 2},
+}
+
+
+def with_row(bom, product, component, qty):
+    new = {name: dict(row) for name, row in bom.items()}
+    if qty is None:
+        del new[product][component]
+    else:
+        new.setdefault(product, {})[component] = qty
+    return new
+
+
+def with_price(raw_materials, material, price):
+    new = dict(raw_materials)
+    if price is None:
+        del new[material]
+    else:
+        new[material] = {"unit": "g", "price": price}
+    return new
+
+
+def without_product(bom, product):
+    return {name: dict(row) for name, row in bom.items() if name != product}
+
+
+EDITS = [
+    ("수량 변경", lambda bom, raw: (with_row(bom, "클래식 팥빙수", "팥", 60), raw)),
+    ("중간재 구성 변경", lambda bom, raw: (with_row(bom, "딸기 토핑", "설탕", 8), raw)),
+    ("중간재에 원재료 추가", lambda bom, raw: (with_row(bom, "딸기 토핑", "레몬즙", 2), raw)),
+    ("미등록 원재료 단가 등록", lambda bom, raw: (bom, with_price(raw, "레몬즙", 30))),
+    ("단가 변경", lambda bom, raw: (bom, with_price(raw, "딸기", 25))),
+    ("구성품 삭제", lambda bom, raw: (with_row(bom, "클래식 팥빙수", "연유", None), raw)),
+    ("단가 삭제", lambda bom, raw: (bom, with_price(raw, "팥", None))),
+    ("새 제품", lambda bom, raw: (with_row(bom, "녹차 빙수", "얼음", 200), raw)),
+    ("제품 삭제", lambda bom, raw: (without_product(bom, "딸기 팥빙수"), raw)),
+    ("BOM·단가 동시 변경", lambda bom, raw: (with_row(bom, "빙수 세트", "컵", 3), with_price(raw, "설탕", 3))),
+]
+
+
+def rebuilt(bom, raw_materials):
+    table = costing.CostTable()
+    table.update(bom, main.explode_bom(bom), raw_materials)
+    return table
+
+
+def assert_same(table, expected, step):
+    assert table.costs() == expected.costs(), step
+    assert table.where_used == expected.where_used, step
+    assert table.material_users == expected.material_users, step
+
+
+def test_incremental_matches_rebuild():
+    bom, raw_materials = BOM, RAW_MATERIALS
+    table = rebuilt(bom, raw_materials)
+    for name, edit in EDITS:
+        bom, raw_materials = edit(bom, raw_materials)
+        table.update(bom, main.explode_bom(bom), raw_materials)
+        assert_same(table, rebuilt(bom, raw_materials), name)
+
+
+def test_price_change_recomputes_only_users():
+    table = rebuilt(BOM, RAW_MATERIALS)
+    affected = table.update(BOM, main.explode_bom(BOM), with_price(RAW_MATERIALS, "팥", 15))
+    assert affected == {"클래식 팥빙수", "빙수 세트"}
+
+
+def test_intermediate_change_recomputes_ancestors():
+    table = rebuilt(BOM, RAW_MATERIALS)
+    bom = with_row(BOM, "딸기 토핑", "딸기", 35)
+    assert table.update(bom, main.explode_bom(bom), RAW_MATERIALS) == {"딸기 토핑", "딸기 팥빙수", "빙수 세트"}
+    assert table.cost("빙수 세트") == rebuilt(bom, RAW_MATERIALS).cost("빙수 세트")
+
+
+def test_same_snapshot_is_noop():
+    exploded = main.explode_bom(BOM)
+    table = costing.CostTable()
+    table.update(BOM, exploded, RAW_MATERIALS)
+    assert table.update(BOM, exploded, RAW_MATERIALS) == set()
+
+
+@pytest.mark.parametrize("params", [{"raw_defect_rate": 1.0}, {"process_defect_rate": 1.5}, {"raw_defect_rate": -0.1}])
+def test_costs_defect_rate_out_of_range(client, params):
+    assert client.get("/costs", params=params).status_code == 422
+
+
+def test_costs_with_defect_rate(client):
+    body = client.get("/costs", params={"product": "클래식 팥빙수", "raw_defect_rate": 0.5}).json()
+    assert body["status"] == "success"
+    assert body["unit_cost"] == pytest.approx(body["unit_material_cost"] * 2)
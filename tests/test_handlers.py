@@ -0,0 +1,26 @@
+import inspect
+
+import pytest
+
+import main
+
+# 스냅샷 로드·파생 데이터 재계산을 하는 읽기 핸들러는 스레드 풀에서 실행되어야 한다 (async면 이벤트 루프를 막음)
+BLOCKING_READS = [
+    ("POST", "/production-plan"),
+    ("GET", "/settings/products"),
+    ("GET", "/settings/bom"),
+    ("GET", "/settings/bom/exploded"),
+    ("GET", "/settings/bom/where-used"),
+    ("GET", "/settings/raw-materials"),
+    ("GET", "/settings/inventory"),
+    ("GET", "/settings/snapshot"),
+    ("GET", "/settings/version"),
+    ("GET", "/settings/cache-stats"),
+]
+
+
+@pytest.mark.parametrize("method, path", BLOCKING_READS)
+def test_blocking_reads_are_sync(method, path):
+    route = next(r for r in main.app.routes if getattr(r, "path", None) == path and method in r.methods)
+    assert not inspect.iscoroutinefunction(route.endpoint)
+
@@ -0,0 +1,43 @@
+import time
+
+import pytest
+
+import jobs
+
+pytest.importorskip("numpy")
+
+
+def wait(client, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()["job"]
+        if job["state"] in jobs.FINAL_STATES:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"작업이 끝나지 않음: {job}")
+
+
+def submit(client, kind, payload):
+    body = client.post(f"/jobs/{kind}", json=payload).json()
+    assert body["status"] == "success", body
+    return body["job"]["id"]
+
+
+def test_unknown_product_job_fails(client):
+    job_id = submit(client, "sweep", {
+        "product": "없는 제품", "plan_qtys": [10], "raw_defect_rates": [0.0], "process_defect_rates": [0.0],
+    })
+    job = wait(client, job_id)
+    assert job["state"] == "failed"
+    assert "없는 제품" in job["error"]
+    assert client.get(f"/jobs/{job_id}/result").json()["status"] == "error"
+
+
+def test_batch_job_succeeds(client):
+    request = {"product": "클래식 팥빙수", "plan_qty": 10, "start_date": "2026-01-01",
+               "raw_defect_rate": 0.0, "process_defect_rate": 0.0, "rounding": True}
+    job_id = submit(client, "batch", {"requests": [request, request]})
+    job = wait(client, job_id)
+    assert job["state"] == "succeeded"
+    assert client.get(f"/jobs/{job_id}/result").json()["count"] == 2
+    assert len(client.get(f"/jobs/{job_id}/results").json()["results"]) == 2
@@ -0,0 +1,117 @@
+"""재고 원장 - 재생·시점 재고·재시작 후 복원 (CSV / SQLite 공통)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import storage
+
+START = datetime(2026, 1, 1, 9, 0, 0)
+INITIAL = {"팥": 1000, "얼음": 5000}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """원장 시각을 테스트가 정함 (clock[0]이 현재 시각, 1분씩 진행)"""
+    now = [START]
+    original = storage.ledger_timestamp
+    monkeypatch.setattr(storage, "ledger_timestamp", lambda moment=None: original(now[0] if moment is None else moment))
+    return now
+
+
+def open_at(backend, directory, snapshot_every=3):
+    return storage.open_storage(backend, directory, directory / "ledger.db", snapshot_every)
+
+
+def stock_of(store):
+    return {row["material_name"]: int(row["quantity"]) for row in store.read("inventory")}
+
+
+def run_history(store, clock):
+    """재고 변경 8건을 1분 간격으로 기록 - [(시각, 그 시각 마감 재고)]"""
+    changes = [
+        lambda: store.ledger.receive("팥", 500, "입고 1"),
+        lambda: store.deduct({"팥": 300, "얼음": 1000}, "클래식 팥빙수 10개"),
+        lambda: store.ledger.adjust("얼음", -50, "폐기"),
+        lambda: store.ledger.receive("연유", 200, "신규 원재료"),
+        lambda: store.deduct({"연유": 20}, "딸기 팥빙수 1개"),
+        lambda: store.ledger.set_quantities([{"material_name": "팥", "quantity": 900}], "실사"),
+        lambda: store.ledger.remove("얼음", "단종"),
+        lambda: store.ledger.receive("팥", 100, "입고 2"),
+    ]
+    history = []
+    for change in changes:
+        clock[0] += timedelta(minutes=1)
+        change()
+        history.append((clock[0], stock_of(store)))
+    return history
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def ledger_dir(request, tmp_path):
+    storage.write_csv(tmp_path / "inventory.csv", ["material_name", "quantity"],
+                      [{"material_name": name, "quantity": qty} for name, qty in INITIAL.items()])
+    return request.param, tmp_path
+
+
+def test_replay_matches_changes(ledger_dir, clock):
+    backend, directory = ledger_dir
+    store = open_at(backend, directory)
+    history = run_history(store, clock)
+    assert history[-1][1] == {"팥": 1000, "연유": 180}
+    entries = store.ledger.entries(limit=100)
+    seqs = [e["seq"] for e in entries]
+    assert seqs == list(range(seqs[0], seqs[0] - len(seqs), -1))
+    # set_quantities는 차이만큼 조정 1건 (팥 1200 → 900)
+    assert [(e["material_name"], e["delta"], e["kind"]) for e in entries[:4]] == [
+        ("팥", 100, "receipt"), ("얼음", -3950, "delete"), ("팥", -300, "adjustment"), ("연유", -20, "consumption"),
+    ]
+
+
+def test_stock_at_between_snapshots(ledger_dir, clock):
+    backend, directory = ledger_dir
+    store = open_at(backend, directory)
+    history = run_history(store, clock)
+    assert store.ledger.stock_at(START - timedelta(minutes=1)) is None
+    for moment, expected in history:
+        assert store.ledger.stock_at(moment) == expected
+        assert store.ledger.stock_at(moment + timedelta(seconds=30)) == expected
+    assert store.ledger.stock_at(moment.date()) == history[-1][1]
+
+
+def test_restart_restores_stock(ledger_dir, clock):
+    backend, directory = ledger_dir
+    history = run_history(open_at(backend, directory), clock)
+    reopened = open_at(backend, directory)
+    assert stock_of(reopened) == history[-1][1]
+    for moment, expected in history:
+        assert reopened.ledger.stock_at(moment) == expected
+
+    # 재시작 후 이어서 기록해도 seq와 재고가 이어짐
+    clock[0] += timedelta(minutes=1)
+    reopened.ledger.receive("팥", 1, "재시작 후")
+    assert stock_of(open_at(backend, directory))["팥"] == history[-1][1]["팥"] + 1
+    assert reopened.ledger.entries(limit=1)[0]["reference"] == "재시작 후"
+
+
+def test_other_writer_changes_are_replayed(ledger_dir, clock):
+    backend, directory = ledger_dir
+    reader = open_at(backend, directory)
+    assert stock_of(reader) == INITIAL
+    history = run_history(open_at(backend, directory), clock)
+    assert stock_of(reader) == history[-1][1]
+
+
+def test_entries_paging(ledger_dir, clock):
+    backend, directory = ledger_dir
+    store = open_at(backend, directory)
+    run_history(store, clock)
+    everything = store.ledger.entries(limit=100)
+    pages, before_seq = [], None
+    while True:
+        page = store.ledger.entries(limit=2, before_seq=before_seq)
+        if not page:
+            break
+        pages.extend(page)
+        before_seq = page[-1]["seq"]
+    assert pages == everything
+    assert [e["reference"] for e in store.ledger.entries("팥", limit=4)] == ["입고 2", "실사", "클래식 팥빙수 10개", "입고 1"]
@@ -0,0 +1,30 @@
+import pytest
+
+ORDER = {"product": "클래식 팥빙수", "plan_qty": 10, "due_date": "2026-01-05"}
+REQUEST = {"start_date": "2026-01-01", "daily_capacity": 50, "orders": [ORDER]}
+
+
+def schedule(client, order=None, **changes):
+    return client.post("/production-schedule", json={**REQUEST, "orders": [{**ORDER, **(order or {})}], **changes})
+
+
+def test_schedule_success(client):
+    res = schedule(client)
+    assert res.status_code == 200
+    assert res.json()["status"] == "success"
+
+
+@pytest.mark.parametrize("horizon_days", [0, -3, 100_000_000])
+def test_horizon_out_of_range(client, horizon_days):
+    assert schedule(client, horizon_days=horizon_days).status_code == 422
+
+
+@pytest.mark.parametrize("order", [{"raw_defect_rate": 1.0}, {"process_defect_rate": -0.1}, {"plan_qty": 0}])
+def test_invalid_order_rejected(client, order):
+    assert schedule(client, order).status_code == 422
+
+
+def test_end_date_overflow(client):
+    res = schedule(client, start_date="9999-12-01", horizon_days=365)
+    assert res.status_code == 200
+    assert res.json()["status"] == "error"
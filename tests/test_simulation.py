@@ -0,0 +1,73 @@
+import pytest
+
+import main
+
+pytest.importorskip("numpy")
+
+REQUEST = {
+    "product": "클래식 팥빙수",
+    "plan_qty": 100,
+    "raw_defect": {"kind": "fixed", "mean": 0.05},
+    "process_defect": {"kind": "fixed", "mean": 0.03},
+    "trials": 1000,
+    "seed": 1,
+}
+
+
+def simulate(client, **changes):
+    return client.post("/production-plan/simulate", json={**REQUEST, **changes})
+
+
+def test_simulate_success(client):
+    res = simulate(client)
+    assert res.status_code == 200
+    assert res.json()["status"] == "success"
+
+
+@pytest.mark.parametrize("percentiles", [[150], [-1], [5, 101]])
+def test_percentiles_out_of_range(client, percentiles):
+    res = simulate(client, percentiles=percentiles)
+    assert res.status_code == 200
+    assert res.json()["status"] == "error"
+
+
+@pytest.mark.parametrize("trials", [0, -5, main.MAX_SIMULATION_TRIALS + 1, 10**10])
+def test_trials_out_of_range(client, trials):
+    res = simulate(client, trials=trials)
+    assert res.status_code == 200
+    assert res.json()["status"] == "error"
+
+
+@pytest.mark.parametrize("workers", [0, -1, 10_000])
+def test_workers_out_of_range(client, workers):
+    res = simulate(client, workers=workers)
+    assert res.status_code == 200
+    assert res.json()["status"] == "error"
+
+
+@pytest.mark.parametrize("dist", [
+    {"kind": "uniform", "low": 0.3, "high": 0.1},
+    {"kind": "uniform", "low": -0.1, "high": 0.1},
+    {"kind": "uniform", "low": 0.5, "high": 1.0},
+    {"kind": "normal", "mean": 0.05, "std": -1},
+    {"kind": "normal", "mean": 0.05, "std": 0},
+    {"kind": "normal", "mean": 1.5, "std": 0.01},
+    {"kind": "triangular", "low": 0.1, "mode": 0.05, "high": 0.2},
+    {"kind": "triangular", "low": 0.1, "mode": 0.3, "high": 0.2},
+    {"kind": "triangular", "low": 0.1, "mode": 0.1, "high": 0.1},
+    {"kind": "fixed", "mean": 1.0},
+    {"kind": "fixed", "mean": -0.05},
+])
+def test_invalid_distribution(client, dist):
+    res = simulate(client, raw_defect=dist)
+    assert res.status_code == 200
+    assert res.json()["status"] == "error"
+
+
+@pytest.mark.parametrize("dist", [
+    {"kind": "uniform", "low": 0.0, "high": 0.1},
+    {"kind": "normal", "mean": 0.05, "std": 0.02},
+    {"kind": "triangular", "low": 0.0, "mode": 0.05, "high": 0.2},
+])
+def test_valid_distribution(client, dist):
+    assert simulate(client, raw_defect=dist).json()["status"] == "success"
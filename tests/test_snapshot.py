@@ -0,0 +1,36 @@
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", True),
+    ("gzip, deflate, br", True),
+    ("deflate, gzip;q=0.5", True),
+    ("gzip;q=0", False),
+    ("gzip; q=0.0, *;q=1", False),
+    ("*", True),
+    ("*;q=0", False),
+    ("br, *;q=0.1", True),
+    ("identity", False),
+    ("", False),
+    (None, False),
+    ("GZIP;Q=1", True),
+])
+def test_accepts_gzip(header, expected):
+    assert main.accepts_gzip(header) is expected
+
+
+@pytest.fixture
+def always_compress(monkeypatch):
+    # 예시 데이터는 압축 기준보다 작으므로 기준을 낮추고 스냅샷을 새로 만들게 함
+    monkeypatch.setattr(main, "GZIP_MIN_SIZE", 0)
+    monkeypatch.setattr(main.default_site, "snapshots", main.DerivedData(main.build_snapshot))
+
+
+@pytest.mark.parametrize("header, encoding", [("gzip", "gzip"), ("gzip;q=0", None), ("br, *;q=0", None)])
+def test_snapshot_content_encoding(client, always_compress, header, encoding):
+    res = client.get("/settings/snapshot", headers={"Accept-Encoding": header})
+    assert res.status_code == 200
+    assert res.headers.get("content-encoding") == encoding
+    assert "products" in res.json()
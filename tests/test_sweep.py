@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+REQUEST = {
+    "product": "클래식 팥빙수",
+    "plan_qtys": [10, 20],
+    "raw_defect_rates": [0.0, 0.1],
+    "process_defect_rates": [0.05],
+}
+
+
+def sweep(client, **changes):
+    return client.post("/production-plan/sweep", json={**REQUEST, **changes})
+
+
+def test_sweep_success(client):
+    body = sweep(client).json()
+    assert body["status"] == "success"
+    assert body["shape"] == [2, 2, 1]
+    assert min(body["required_production"]) >= 10
+
+
+@pytest.mark.parametrize("changes", [
+    {"raw_defect_rates": [0.1, 1.0]},
+    {"raw_defect_rates": [1.5]},
+    {"process_defect_rates": [-0.1]},
+    {"plan_qtys": [-20]},
+])
+def test_invalid_grid(client, changes):
+    res = sweep(client, **changes)
+    assert res.status_code == 200
+    assert res.json()["status"] == "error"